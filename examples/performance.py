@@ -23,11 +23,8 @@ T = 1E3    # length of spike trains
 
 print("%d spike trains with %d spikes" % (M, int(r*T)))
 
-spike_trains = []
-
 t_start = datetime.now()
-for i in range(M):
-    spike_trains.append(spk.generate_poisson_spikes(r, T))
+spike_trains = spk.generate_poisson_spike_trains(r, T, M)
 t_end = datetime.now()
 runtime = (t_end-t_start).total_seconds()
 
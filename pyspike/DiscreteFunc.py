@@ -5,8 +5,12 @@
 from __future__ import absolute_import, print_function
 
 import numpy as np
-import collections
-import pyspike
+from pyspike.backends import get_kernel
+
+try:
+    from collections.abc import Sequence
+except ImportError:  # python 2
+    from collections import Sequence
 
 
 ##############################################################
@@ -155,11 +159,11 @@ class DiscreteFunc(object):
             multiplicity = np.sum(self.mp[1:-1])
         else:
             # check if interval is as sequence
-            assert isinstance(interval, collections.Sequence), \
+            assert isinstance(interval, Sequence), \
                 "Invalid value for `interval`. None, Sequence or Tuple \
 expected."
             # check if interval is a sequence of intervals
-            if not isinstance(interval[0], collections.Sequence):
+            if not isinstance(interval[0], Sequence):
                 # find the indices corresponding to the interval
                 start_ind, end_ind = get_indices(interval)
                 value = np.sum(self.y[start_ind:end_ind])
@@ -194,6 +198,51 @@ expected."
         else:
             return val
 
+    def integral_many(self, intervals):
+        """ Returns the integrals over many intervals at once. As in
+        :meth:`integral`, each integral consists of the summed values and the
+        summed multiplicity of the points inside the interval, and an interval
+        without any points gives (1, 1).
+
+        :param intervals: integration intervals given as a sequence of pairs
+                          of floats or an array of shape (M, 2).
+        :returns: the summed values and the summed multiplicities
+        :rtype: pair of np.array of length M
+        """
+        intervals = np.array(intervals, dtype=float).reshape(-1, 2)
+        start_ind = np.searchsorted(self.x, intervals[:, 0], side='right')
+        end_ind = np.searchsorted(self.x, intervals[:, 1], side='left')
+        assert np.all(start_ind > 0) and np.all(end_ind < len(self.x)), \
+            "Invalid averaging interval"
+        # cumulative sums, such that the sum over [start:end] is given by
+        # the difference of the entries end and start
+        value = np.zeros(len(self.x)+1)
+        value[1:] = np.cumsum(self.y)
+        multiplicity = np.zeros(len(self.x)+1)
+        multiplicity[1:] = np.cumsum(self.mp)
+        value = value[end_ind] - value[start_ind]
+        multiplicity = multiplicity[end_ind] - multiplicity[start_ind]
+        # empty intervals, return spike sync of 1
+        empty = multiplicity == 0.0
+        value[empty] = 1.0
+        multiplicity[empty] = 1.0
+        return value, multiplicity
+
+    def avrg_many(self, intervals, normalize=True):
+        """ Computes the averages over many intervals at once, one value for
+        each interval.
+
+        :param intervals: averaging intervals given as a sequence of pairs of
+                          floats or an array of shape (M, 2).
+        :returns: the averages of all intervals.
+        :rtype: np.array of length M
+        """
+        val, mp = self.integral_many(intervals)
+        if normalize:
+            return val/mp
+        else:
+            return val
+
     def add(self, f):
         """ Adds another `DiscreteFunc` function to this function.
         Note: only functions defined on the same interval can be summed.
@@ -204,20 +253,7 @@ expected."
         assert self.x[0] == f.x[0], "The functions have different intervals"
         assert self.x[-1] == f.x[-1], "The functions have different intervals"
 
-        # cython version
-        try:
-            from .cython.cython_add import add_discrete_function_cython as \
-                add_discrete_function_impl
-        except ImportError:
-            if not(pyspike.disable_backend_warning):
-                print("Warning: add_discrete_function_cython not found. Make \
-sure that PySpike is installed by running\n\
-'python setup.py build_ext --inplace'! \
-\n Falling back to slow python backend.")
-            # use python backend
-            from .cython.python_backend import add_discrete_function_python as \
-                add_discrete_function_impl
-
+        add_discrete_function_impl = get_kernel("add_discrete_function")
         self.x, self.y, self.mp = \
             add_discrete_function_impl(self.x, self.y, self.mp,
                                        f.x, f.y, f.mp)
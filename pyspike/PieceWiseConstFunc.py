@@ -5,8 +5,12 @@
 from __future__ import absolute_import, print_function
 
 import numpy as np
-import collections
-import pyspike
+from pyspike.backends import get_kernel
+
+try:
+    from collections.abc import Sequence
+except ImportError:  # python 2
+    from collections import Sequence
 
 
 ##############################################################
@@ -26,6 +30,8 @@ class PieceWiseConstFunc(object):
         # convert parameters to arrays, also ensures copying
         self.x = np.array(x)
         self.y = np.array(y)
+        # cumulative integral, computed on demand
+        self._cumulative = None
 
     def __call__(self, t):
         """ Returns the function value for the given time t. If t is a list of
@@ -39,7 +45,7 @@ class PieceWiseConstFunc(object):
 
         ind = np.searchsorted(self.x, t, side='right')
 
-        if isinstance(t, collections.Sequence):
+        if isinstance(t, Sequence):
             # t is a sequence of values
             # correct the cases t == x[0], t == x[-1]
             ind[ind == 0] = 1
@@ -116,6 +122,37 @@ class PieceWiseConstFunc(object):
 
         return x_plot, y_plot
 
+    def _get_cumulative_integral(self):
+        """ Returns the integrals from x[0] to each value in x. They are
+        computed on the first call and reused until the function changes.
+        """
+        if self._cumulative is None or self._cumulative[0] is not self.x \
+                or self._cumulative[1] is not self.y:
+            from pyspike.generic import _cumsum_compensated
+            c = np.zeros(len(self.x))
+            if len(self.y) > 0:
+                c[1:] = _cumsum_compensated((self.x[1:]-self.x[:-1]) * self.y)
+            self._cumulative = (self.x, self.y, c)
+        return self._cumulative[2]
+
+    def _integrals(self, a, b):
+        """ Returns the integrals over the intervals [a[i], b[i]] using the
+        cumulative integral.
+        """
+        # find the indices corresponding to the intervals
+        start_ind = np.searchsorted(self.x, a, side='right')
+        end_ind = np.searchsorted(self.x, b, side='left')-1
+        assert np.all(start_ind > 0) and np.all(end_ind < len(self.y)), \
+            "Invalid averaging interval"
+        c = self._get_cumulative_integral()
+        # first the contribution from between the indices
+        integral = c[end_ind] - c[start_ind]
+        # correction from start to first index
+        integral += (self.x[start_ind]-a) * self.y[start_ind-1]
+        # correction from last index to end
+        integral += (b-self.x[end_ind]) * self.y[end_ind]
+        return integral
+
     def integral(self, interval=None):
         """ Returns the integral over the given interval.
 
@@ -129,19 +166,8 @@ class PieceWiseConstFunc(object):
             # no interval given, integrate over the whole spike train
             a = np.sum((self.x[1:]-self.x[:-1]) * self.y)
         else:
-            # find the indices corresponding to the interval
-            start_ind = np.searchsorted(self.x, interval[0], side='right')
-            end_ind = np.searchsorted(self.x, interval[1], side='left')-1
-            assert start_ind > 0 and end_ind < len(self.x), \
-                "Invalid averaging interval"
-            # first the contribution from between the indices
-            a = np.sum((self.x[start_ind+1:end_ind+1] -
-                        self.x[start_ind:end_ind]) *
-                       self.y[start_ind:end_ind])
-            # correction from start to first index
-            a += (self.x[start_ind]-interval[0]) * self.y[start_ind-1]
-            # correction from last index to end
-            a += (interval[1]-self.x[end_ind]) * self.y[end_ind]
+            a = self._integrals(np.array([interval[0]], dtype=float),
+                                np.array([interval[1]], dtype=float))[0]
         return a
 
     def avrg(self, interval=None):
@@ -161,22 +187,34 @@ class PieceWiseConstFunc(object):
             return self.integral() / (self.x[-1]-self.x[0])
 
         # check if interval is as sequence
-        assert isinstance(interval, collections.Sequence), \
+        assert isinstance(interval, Sequence), \
             "Invalid value for `interval`. None, Sequence or Tuple expected."
         # check if interval is a sequence of intervals
-        if not isinstance(interval[0], collections.Sequence):
+        if not isinstance(interval[0], Sequence):
             # just one interval
             a = self.integral(interval) / (interval[1]-interval[0])
         else:
             # several intervals
-            a = 0.0
-            int_length = 0.0
-            for ival in interval:
-                a += self.integral(ival)
-                int_length += ival[1] - ival[0]
-            a /= int_length
+            interval = np.array(interval, dtype=float)
+            a = np.sum(self._integrals(interval[:, 0], interval[:, 1])) / \
+                np.sum(interval[:, 1] - interval[:, 0])
         return a
 
+    def avrg_many(self, intervals):
+        """ Computes the averages of the function over many intervals at once.
+        In contrast to :meth:`avrg` with a sequence of intervals, which
+        returns the average over the union of the intervals, this returns one
+        average for each interval.
+
+        :param intervals: averaging intervals given as a sequence of pairs of
+                          floats or an array of shape (M, 2).
+        :returns: the averages of all intervals.
+        :rtype: np.array of length M
+        """
+        intervals = np.array(intervals, dtype=float).reshape(-1, 2)
+        return self._integrals(intervals[:, 0], intervals[:, 1]) / \
+            (intervals[:, 1] - intervals[:, 0])
+
     def add(self, f):
         """ Adds another PieceWiseConst function to this function.
         Note: only functions defined on the same interval can be summed.
@@ -187,20 +225,7 @@ class PieceWiseConstFunc(object):
         assert self.x[0] == f.x[0], "The functions have different intervals"
         assert self.x[-1] == f.x[-1], "The functions have different intervals"
 
-        # cython version
-        try:
-            from .cython.cython_add import add_piece_wise_const_cython as \
-                add_piece_wise_const_impl
-        except ImportError:
-            if not(pyspike.disable_backend_warning):
-                print("Warning: add_piece_wise_const_cython not found. Make \
-sure that PySpike is installed by running\n \
-'python setup.py build_ext --inplace'! \
-\n Falling back to slow python backend.")
-            # use python backend
-            from .cython.python_backend import add_piece_wise_const_python as \
-                add_piece_wise_const_impl
-
+        add_piece_wise_const_impl = get_kernel("add_piece_wise_const")
         self.x, self.y = add_piece_wise_const_impl(self.x, self.y, f.x, f.y)
 
     def mul_scalar(self, fac):
@@ -211,3 +236,4 @@ sure that PySpike is installed by running\n \
         :rtype: None
         """
         self.y *= fac
+        self._cumulative = None
@@ -5,8 +5,12 @@
 from __future__ import absolute_import, print_function
 
 import numpy as np
-import collections
-import pyspike
+from pyspike.backends import get_kernel
+
+try:
+    from collections.abc import Sequence
+except ImportError:  # python 2
+    from collections import Sequence
 
 
 ##############################################################
@@ -29,6 +33,8 @@ class PieceWiseLinFunc:
         self.x = np.array(x)
         self.y1 = np.array(y1)
         self.y2 = np.array(y2)
+        # cumulative integral, computed on demand
+        self._cumulative = None
 
     def __call__(self, t):
         """ Returns the function value for the given time t. If t is a list of
@@ -46,7 +52,7 @@ class PieceWiseLinFunc:
 
         ind = np.searchsorted(self.x, t, side='right')
 
-        if isinstance(t, collections.Sequence):
+        if isinstance(t, Sequence):
             # t is a sequence of values
             # correct the cases t == x[0], t == x[-1]
             ind[ind == 0] = 1
@@ -130,6 +136,54 @@ class PieceWiseLinFunc:
         y_plot[1::2] = self.y2
         return x_plot, y_plot
 
+    def _get_cumulative_integral(self):
+        """ Returns the integrals from x[0] to each value in x. They are
+        computed on the first call and reused until the function changes.
+        """
+        if self._cumulative is None or self._cumulative[0] is not self.x \
+                or self._cumulative[1] is not self.y1 \
+                or self._cumulative[2] is not self.y2:
+            from pyspike.generic import _cumsum_compensated
+            c = np.zeros(len(self.x))
+            if len(self.y1) > 0:
+                c[1:] = _cumsum_compensated((self.x[1:]-self.x[:-1]) *
+                                            0.5*(self.y1+self.y2))
+            self._cumulative = (self.x, self.y1, self.y2, c)
+        return self._cumulative[3]
+
+    def _integrals(self, a, b):
+        """ Returns the integrals over the intervals [a[i], b[i]] using the
+        cumulative integral.
+        """
+
+        def intermediate_value(x0, x1, y0, y1, x):
+            """ computes the intermediate value of a linear function """
+            return y0 + (y1-y0)*(x-x0)/(x1-x0)
+
+        # find the indices corresponding to the intervals
+        start_ind = np.searchsorted(self.x, a, side='right')
+        end_ind = np.searchsorted(self.x, b, side='left')-1
+        assert np.all(start_ind > 0) and np.all(end_ind < len(self.y1)), \
+            "Invalid averaging interval"
+        c = self._get_cumulative_integral()
+        # first the contribution from between the indices
+        integral = c[end_ind] - c[start_ind]
+        # correction from start to first index
+        integral += (self.x[start_ind]-a) * 0.5 * \
+                    (self.y2[start_ind-1] +
+                     intermediate_value(self.x[start_ind-1],
+                                        self.x[start_ind],
+                                        self.y1[start_ind-1],
+                                        self.y2[start_ind-1],
+                                        a))
+        # correction from last index to end
+        integral += (b-self.x[end_ind]) * 0.5 * \
+                    (self.y1[end_ind] +
+                     intermediate_value(self.x[end_ind], self.x[end_ind+1],
+                                        self.y1[end_ind], self.y2[end_ind],
+                                        b))
+        return integral
+
     def integral(self, interval=None):
         """ Returns the integral over the given interval.
 
@@ -139,41 +193,12 @@ class PieceWiseLinFunc:
         :returns: the integral
         :rtype: float
         """
-
-        def intermediate_value(x0, x1, y0, y1, x):
-            """ computes the intermediate value of a linear function """
-            return y0 + (y1-y0)*(x-x0)/(x1-x0)
-
         if interval is None:
             # no interval given, integrate over the whole spike train
             integral = np.sum((self.x[1:]-self.x[:-1]) * 0.5*(self.y1+self.y2))
         else:
-            # find the indices corresponding to the interval
-            start_ind = np.searchsorted(self.x, interval[0], side='right')
-            end_ind = np.searchsorted(self.x, interval[1], side='left')-1
-            assert start_ind > 0 and end_ind < len(self.x), \
-                "Invalid averaging interval"
-            # first the contribution from between the indices
-            integral = np.sum((self.x[start_ind+1:end_ind+1] -
-                               self.x[start_ind:end_ind]) *
-                              0.5*(self.y1[start_ind:end_ind] +
-                                   self.y2[start_ind:end_ind]))
-            # correction from start to first index
-            integral += (self.x[start_ind]-interval[0]) * 0.5 * \
-                        (self.y2[start_ind-1] +
-                         intermediate_value(self.x[start_ind-1],
-                                            self.x[start_ind],
-                                            self.y1[start_ind-1],
-                                            self.y2[start_ind-1],
-                                            interval[0]
-                                            ))
-            # correction from last index to end
-            integral += (interval[1]-self.x[end_ind]) * 0.5 * \
-                        (self.y1[end_ind] +
-                         intermediate_value(self.x[end_ind], self.x[end_ind+1],
-                                            self.y1[end_ind], self.y2[end_ind],
-                                            interval[1]
-                                            ))
+            integral = self._integrals(np.array([interval[0]], dtype=float),
+                                       np.array([interval[1]], dtype=float))[0]
         return integral
 
     def avrg(self, interval=None):
@@ -195,22 +220,34 @@ class PieceWiseLinFunc:
             return self.integral() / (self.x[-1]-self.x[0])
 
         # check if interval is as sequence
-        assert isinstance(interval, collections.Sequence), \
+        assert isinstance(interval, Sequence), \
             "Invalid value for `interval`. None, Sequence or Tuple expected."
         # check if interval is a sequence of intervals
-        if not isinstance(interval[0], collections.Sequence):
+        if not isinstance(interval[0], Sequence):
             # just one interval
             a = self.integral(interval) / (interval[1]-interval[0])
         else:
             # several intervals
-            a = 0.0
-            int_length = 0.0
-            for ival in interval:
-                a += self.integral(ival)
-                int_length += ival[1] - ival[0]
-            a /= int_length
+            interval = np.array(interval, dtype=float)
+            a = np.sum(self._integrals(interval[:, 0], interval[:, 1])) / \
+                np.sum(interval[:, 1] - interval[:, 0])
         return a
 
+    def avrg_many(self, intervals):
+        """ Computes the averages of the function over many intervals at once.
+        In contrast to :meth:`avrg` with a sequence of intervals, which
+        returns the average over the union of the intervals, this returns one
+        average for each interval.
+
+        :param intervals: averaging intervals given as a sequence of pairs of
+                          floats or an array of shape (M, 2).
+        :returns: the averages of all intervals.
+        :rtype: np.array of length M
+        """
+        intervals = np.array(intervals, dtype=float).reshape(-1, 2)
+        return self._integrals(intervals[:, 0], intervals[:, 1]) / \
+            (intervals[:, 1] - intervals[:, 0])
+
     def add(self, f):
         """ Adds another PieceWiseLin function to this function.
         Note: only functions defined on the same interval can be summed.
@@ -226,20 +263,7 @@ class PieceWiseLinFunc:
         # self.x, self.y1, self.y2 = add_piece_wise_lin_python(
         #     self.x, self.y1, self.y2, f.x, f.y1, f.y2)
 
-        # cython version
-        try:
-            from .cython.cython_add import add_piece_wise_lin_cython as \
-                add_piece_wise_lin_impl
-        except ImportError:
-            if not(pyspike.disable_backend_warning):
-                print("Warning: add_piece_wise_lin_cython not found. Make \
-sure that PySpike is installed by running\n \
-'python setup.py build_ext --inplace'! \n \
-Falling back to slow python backend.")
-            # use python backend
-            from .cython.python_backend import add_piece_wise_lin_python as \
-                add_piece_wise_lin_impl
-
+        add_piece_wise_lin_impl = get_kernel("add_piece_wise_lin")
         self.x, self.y1, self.y2 = add_piece_wise_lin_impl(
             self.x, self.y1, self.y2, f.x, f.y1, f.y2)
 
@@ -252,3 +276,4 @@ Falling back to slow python backend.")
         """
         self.y1 *= fac
         self.y2 *= fac
+        self._cumulative = None
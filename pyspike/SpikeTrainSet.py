@@ -0,0 +1,146 @@
+# Module containing the class representing sets of spike trains for PySpike.
+# Copyright 2016, Mario Mulansky <mario.mulansky@gmx.net>
+# Distributed under the BSD License
+
+import numpy as np
+from pyspike import SpikeTrain
+
+
+class SpikeTrainSet(object):
+    """ Class representing a set of spike trains defined on the same interval.
+    All spike times are stored in one contiguous array `spikes` and the
+    spike train `n` is given by `spikes[offsets[n]:offsets[n+1]]`. A
+    :class:`SpikeTrainSet` can be used wherever a list of :class:`.SpikeTrain`
+    is expected, e.g. in the multivariate and matrix functions or in
+    :func:`.psth`.
+    """
+
+    def __init__(self, spike_times, edges, offsets=None, is_sorted=True):
+        """ Constructs the SpikeTrainSet.
+
+        :param spike_times: either a sequence of spike time arrays or
+                            :class:`.SpikeTrain`, one for each spike train,
+                            or a flat array of all spike times, in which case
+                            `offsets` has to be given.
+        :param edges: The edges of the spike trains. Given as a pair of floats
+                      (T0, T1) or a single float T1, where then T0=0 is
+                      assumed.
+        :param offsets: array of length N+1 defining the start and end index
+                        of each of the N spike trains in the flat array of
+                        spike times. Only required if `spike_times` is a flat
+                        array.
+        :param is_sorted: If `False`, the spike times of each spike train will
+                          be sorted.
+
+        """
+        if offsets is None:
+            # sequence of spike trains, concatenate them
+            trains = [np.asarray(getattr(st, 'spikes', st), dtype=float)
+                      for st in spike_times]
+            offsets = np.zeros(len(trains)+1, dtype=np.intp)
+            offsets[1:] = np.cumsum([len(t) for t in trains])
+            if len(trains) > 0:
+                spikes = np.concatenate(trains)
+            else:
+                spikes = np.empty(0)
+        else:
+            spikes = np.array(spike_times, dtype=float)
+            offsets = np.array(offsets, dtype=np.intp)
+            assert len(offsets) > 0 and offsets[0] == 0 and \
+                offsets[-1] == len(spikes) and np.all(np.diff(offsets) >= 0), \
+                "Invalid offsets."
+
+        if not is_sorted:
+            # sort by spike train first and by spike time second
+            train_ids = np.repeat(np.arange(len(offsets)-1), np.diff(offsets))
+            spikes = spikes[np.lexsort((spikes, train_ids))]
+
+        self.spikes = spikes
+        self.offsets = offsets
+
+        try:
+            self.t_start = float(edges[0])
+            self.t_end = float(edges[1])
+        except (TypeError, IndexError):
+            self.t_start = 0.0
+            self.t_end = float(edges)
+
+    def __len__(self):
+        """ Returns the number of spike trains.
+
+        :return: Number of spike trains.
+        """
+        return len(self.offsets)-1
+
+    def __getitem__(self, index):
+        """ Returns the spike train given by index. The spike times of the
+        returned :class:`.SpikeTrain` are a view into this set, no data is
+        copied.
+
+        :param index: Index of the spike train.
+        :return: :class:`.SpikeTrain`
+        """
+        st = SpikeTrain([], [self.t_start, self.t_end])
+        st.spikes = self.get_spikes(index)
+        return st
+
+    def get_spikes(self, index):
+        """ Returns the spike times of the spike train given by index as a view
+        into the array of all spikes.
+
+        :param index: Index of the spike train.
+        :return: array of spike times.
+        """
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("SpikeTrainSet index out of range")
+        return self.spikes[self.offsets[index]:self.offsets[index+1]]
+
+    def get_spike_counts(self):
+        """ Returns the number of spikes in each spike train.
+
+        :return: array with the spike counts.
+        """
+        return np.diff(self.offsets)
+
+    def copy(self):
+        """ Returns a copy of this spike train set.
+
+        :return: :class:`SpikeTrainSet` copy of this set.
+        """
+        return SpikeTrainSet(self.spikes.copy(), [self.t_start, self.t_end],
+                             self.offsets.copy())
+
+    def to_list(self):
+        """ Returns the spike trains of this set as a list of independent
+        :class:`.SpikeTrain`, i.e. the spike times are copied.
+
+        :return: list of :class:`.SpikeTrain`
+        """
+        return [SpikeTrain(self.get_spikes(n), [self.t_start, self.t_end])
+                for n in range(len(self))]
+
+    def get_spikes_non_empty(self):
+        """ Returns the spike times and offsets of this set where empty spike
+        trains are replaced by their auxiliary spikes, see
+        :meth:`.SpikeTrain.get_spikes_non_empty`. If no spike train is empty,
+        the data of this set is returned without copying.
+
+        :return: (spikes, offsets)
+        """
+        counts = self.get_spike_counts()
+        if np.all(counts > 0):
+            return self.spikes, self.offsets
+        empty = np.nonzero(counts == 0)[0]
+        # two auxiliary spikes for each empty spike train (one if the
+        # interval is degenerate)
+        aux = np.unique([self.t_start, self.t_end])
+        spikes = np.insert(self.spikes, np.repeat(self.offsets[empty],
+                                                  len(aux)),
+                           np.tile(aux, len(empty)))
+        counts[empty] = len(aux)
+        offsets = np.zeros_like(self.offsets)
+        offsets[1:] = np.cumsum(counts)
+        return spikes, offsets
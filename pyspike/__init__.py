@@ -7,41 +7,141 @@ Distributed under the BSD License
 from __future__ import absolute_import
 
 __all__ = ["isi_distance", "spike_distance", "spike_sync", "psth",
-           "spikes", "SpikeTrain", "PieceWiseConstFunc", "PieceWiseLinFunc",
-           "DiscreteFunc", "directionality"]
-
-from .PieceWiseConstFunc import PieceWiseConstFunc
-from .PieceWiseLinFunc import PieceWiseLinFunc
-from .DiscreteFunc import DiscreteFunc
-from .SpikeTrain import SpikeTrain
-
-from .isi_distance import isi_profile, isi_distance, isi_profile_multi,\
-    isi_distance_multi, isi_distance_matrix
-from .spike_distance import spike_profile, spike_distance, spike_profile_multi,\
-    spike_distance_multi, spike_distance_matrix
-from .spike_sync import spike_sync_profile, spike_sync,\
-    spike_sync_profile_multi, spike_sync_multi, spike_sync_matrix
-from .psth import psth
-
-from .spikes import load_spike_trains_from_txt, spike_train_from_string, \
-    merge_spike_trains, generate_poisson_spikes
-
-# define the __version__ following
-# http://stackoverflow.com/questions/17583443
-from pkg_resources import get_distribution, DistributionNotFound
-import os.path
+           "spikes", "SpikeTrain", "SpikeTrainSet", "PieceWiseConstFunc",
+           "PieceWiseLinFunc", "DiscreteFunc", "directionality", "backends",
+           "surrogates"]
 
-try:
-    _dist = get_distribution('pyspike')
+import sys
+import types
+from importlib import import_module
+
+from .backends import set_backend, get_backend, register_backend, \
+    unregister_backend
+
+# the functions and classes of the public interface are imported lazily on
+# first access, which keeps `import pyspike` cheap for short-lived processes:
+# attribute name -> submodule that defines it
+_lazy_attributes = {}
+for _module, _names in [
+        ("PieceWiseConstFunc", ["PieceWiseConstFunc"]),
+        ("PieceWiseLinFunc", ["PieceWiseLinFunc"]),
+        ("DiscreteFunc", ["DiscreteFunc"]),
+        ("SpikeTrain", ["SpikeTrain"]),
+        ("SpikeTrainSet", ["SpikeTrainSet"]),
+        ("isi_distance", ["isi_profile", "isi_distance", "isi_profile_multi",
+                          "isi_distance_multi", "isi_distance_matrix",
+                          "isi_distance_cross", "isi_distance_series",
+                          "isi_distance_series_multi",
+                          "isi_distance_matrix_series"]),
+        ("spike_distance", ["spike_profile", "spike_distance",
+                            "spike_profile_multi", "spike_distance_multi",
+                            "spike_distance_matrix", "spike_distance_cross",
+                            "spike_distance_series",
+                            "spike_distance_series_multi",
+                            "spike_distance_matrix_series"]),
+        ("spike_sync", ["spike_sync_profile", "spike_sync",
+                        "spike_sync_profile_multi", "spike_sync_multi",
+                        "spike_sync_matrix", "spike_sync_cross",
+                        "spike_sync_series", "spike_sync_series_multi",
+                        "spike_sync_matrix_series"]),
+        ("distance_matrix", ["DistanceMatrixBuilder", "distance_matrix_memmap",
+                             "load_distance_matrix",
+                             "sparse_distance_matrix"]),
+        ("online", ["OnlineDistance"]),
+        ("psth", ["psth", "psth_smoothed"]),
+        ("spikes", ["load_spike_trains_from_txt", "spike_train_from_string",
+                    "merge_spike_trains", "generate_poisson_spikes",
+                    "generate_poisson_spike_trains"]),
+        ("surrogates", ["generate_surrogates", "spike_sync_significance",
+                        "spike_distance_significance"])]:
+    for _name in _names:
+        _lazy_attributes[_name] = _module
+# submodules that are not shadowed by an attribute of the same name
+_lazy_submodules = ("generic", "spikes", "surrogates", "directionality")
+
+
+def _get_version():
+    """ Returns the version of the installed pyspike distribution, if this
+    copy of pyspike is the installed one.
+    """
+    import os.path
+    try:
+        from importlib.metadata import distribution, PackageNotFoundError
+    except ImportError:  # python < 3.8
+        from pkg_resources import get_distribution, DistributionNotFound
+        try:
+            dist = get_distribution('pyspike')
+        except DistributionNotFound:
+            return 'Please install this project with setup.py'
+        locations = [dist.location]
+    else:
+        try:
+            dist = distribution('pyspike')
+        except PackageNotFoundError:
+            return 'Please install this project with setup.py'
+        locations = [str(dist.locate_file(''))]
+        # editable installs record the location of the source directory
+        direct_url = dist.read_text('direct_url.json')
+        if direct_url:
+            import json
+            from urllib.parse import urlparse
+            from urllib.request import url2pathname
+            url = urlparse(json.loads(direct_url).get("url", ""))
+            if url.scheme == "file":
+                locations.append(url2pathname(url.path))
     # Normalize case for Windows systems
-    dist_loc = os.path.normcase(_dist.location)
-    here = os.path.normcase(__file__)
-    if not here.startswith(os.path.join(dist_loc, 'pyspike')):
-        # not installed, but there is another version that *is*
-        raise DistributionNotFound
-except DistributionNotFound:
-    __version__ = 'Please install this project with setup.py'
-else:
-    __version__ = _dist.version
+    here = os.path.normcase(os.path.abspath(__file__))
+    for location in locations:
+        location = os.path.normcase(os.path.abspath(location))
+        if here.startswith(os.path.join(location, 'pyspike')):
+            return dist.version
+    # not installed, but there is another version that *is*
+    return 'Please install this project with setup.py'
+
+
+def _load_attribute(name):
+    """ Imports the lazy attribute `name` and stores it in the package.
+    """
+    if name in _lazy_attributes:
+        value = getattr(import_module("." + _lazy_attributes[name], __name__),
+                        name)
+    elif name in _lazy_submodules:
+        value = import_module("." + name, __name__)
+    elif name == "__version__":
+        value = _get_version()
+    else:
+        raise AttributeError("module %r has no attribute %r" %
+                             (__name__, name))
+    globals()[name] = value
+    return value
+
+
+class _LazyModule(types.ModuleType):
+    """ Module type of the pyspike package that imports the public functions
+    and classes on first access.
+    """
+
+    def __getattr__(self, name):
+        return _load_attribute(name)
+
+    def __setattr__(self, name, value):
+        # importing a submodule binds it to the package namespace, keep the
+        # function or class of the same name instead (e.g. isi_distance)
+        if name in _lazy_attributes and isinstance(value, types.ModuleType) \
+                and value.__name__ == __name__ + "." + name:
+            value = getattr(value, name)
+        super(_LazyModule, self).__setattr__(name, value)
+
+    def __dir__(self):
+        return sorted(set(globals()) | set(_lazy_attributes) |
+                      set(_lazy_submodules) | set(["__version__"]))
+
+
+try:
+    sys.modules[__name__].__class__ = _LazyModule
+except TypeError:
+    # python < 3.5 does not allow to change the module type, import eagerly
+    for _name in list(_lazy_attributes) + ["__version__"]:
+        _load_attribute(_name)
 
 disable_backend_warning = False
@@ -0,0 +1,280 @@
+"""
+
+Registry of the computational backends of PySpike. The kernels used by the
+profile, distance and function classes are resolved once and cached, so the
+functions only perform a dictionary lookup on each call.
+
+Copyright 2015, Mario Mulansky <mario.mulansky@gmx.net>
+
+Distributed under the BSD License
+"""
+
+from __future__ import absolute_import, print_function
+
+from functools import partial
+
+import pyspike
+
+# names of the kernels a backend can provide, the kernels marked as required
+# are provided by the python backend and are hence always available. The
+# remaining kernels are optional, if no backend provides them the functions
+# fall back to computing and averaging the profiles.
+REQUIRED_KERNELS = ("isi_profile", "isi_profile_multi", "spike_profile",
+                    "coincidence_profile", "add_piece_wise_const",
+                    "add_piece_wise_lin", "add_discrete_function",
+                    "spike_directionality_profiles",
+                    "spike_train_order_profile", "simulated_annealing")
+OPTIONAL_KERNELS = ("isi_distance", "spike_distance", "coincidence_value",
+                    "isi_distance_interval", "spike_distance_interval",
+                    "coincidence_interval", "isi_distance_matrix",
+                    "spike_distance_matrix", "spike_sync_matrix",
+                    "spike_directionality_matrix", "isi_distance_cross",
+                    "spike_distance_cross", "spike_sync_cross",
+                    "isi_distance_condensed", "spike_distance_condensed",
+                    "spike_sync_condensed")
+
+
+############################################################
+# built-in backends
+############################################################
+def _load_cython():
+    """ Loads the kernels of the cython backend. Each extension module is
+    loaded separately, such that a partial build still provides its kernels.
+    """
+    modules = []
+    for name in ("cython_profiles", "cython_distances", "cython_add",
+                 "cython_directionality"):
+        try:
+            modules.append(__import__("pyspike.cython." + name,
+                                      fromlist=[name]))
+        except ImportError:
+            pass
+    if len(modules) == 0:
+        raise ImportError("No cython extension modules found.")
+    kernels = {}
+    for kernel in REQUIRED_KERNELS + OPTIONAL_KERNELS:
+        for module in modules:
+            if hasattr(module, kernel + "_cython"):
+                kernels[kernel] = getattr(module, kernel + "_cython")
+    return kernels
+
+
+def _load_numba():
+    """ Loads the kernels of the numba backend, which requires numba to be
+    installed.
+    """
+    from .cython import numba_backend
+    return dict((kernel, getattr(numba_backend, kernel + "_numba"))
+                for kernel in REQUIRED_KERNELS + OPTIONAL_KERNELS
+                if hasattr(numba_backend, kernel + "_numba"))
+
+
+def _load_numpy():
+    """ Loads the kernels of the vectorized numpy backend.
+    """
+    from .cython import numpy_backend
+    return dict((kernel, getattr(numpy_backend, kernel + "_numpy"))
+                for kernel in REQUIRED_KERNELS + OPTIONAL_KERNELS
+                if hasattr(numpy_backend, kernel + "_numpy"))
+
+
+def _load_python():
+    """ Loads the kernels of the pure python backend.
+    """
+    from .cython import python_backend
+    return {"isi_profile": python_backend.isi_distance_python,
+            "isi_profile_multi": python_backend.isi_profile_multi_python,
+            "spike_profile": python_backend.spike_distance_python,
+            "coincidence_profile": python_backend.coincidence_python,
+            "add_piece_wise_const": python_backend.add_piece_wise_const_python,
+            "add_piece_wise_lin": python_backend.add_piece_wise_lin_python,
+            "add_discrete_function":
+            python_backend.add_discrete_function_python,
+            "spike_directionality_profiles":
+            python_backend.spike_directionality_profiles_python,
+            "spike_train_order_profile":
+            python_backend.spike_train_order_profile_python,
+            "simulated_annealing": python_backend.simulated_annealing_python}
+
+
+# registered backends: name -> loader function returning the kernel dict
+_loaders = {"cython": _load_cython, "numba": _load_numba,
+            "numpy": _load_numpy, "python": _load_python}
+# order in which the built-in backends are tried, the last entry has to
+# provide all required kernels
+_order = ["cython", "numba", "numpy", "python"]
+# cache of the loaded kernels of each backend, None if not available
+_loaded = {}
+# the backend selected by set_backend, None means automatic selection
+_selected = None
+# cache of the resolved kernels: kernel name -> function or None
+_kernels = {}
+
+
+def _load_backend(name):
+    """ Returns the kernels of the given backend, or None if the backend can
+    not be loaded. The result is cached.
+    """
+    if name not in _loaded:
+        try:
+            _loaded[name] = dict(_loaders[name]())
+        except ImportError:
+            _loaded[name] = None
+    return _loaded[name]
+
+
+def _get_chain():
+    """ Returns the list of backends in the order they are used to look up
+    kernels. A selected backend is followed by the built-in backends of lower
+    priority, such that kernels it does not provide are still available.
+    """
+    if _selected is None:
+        # automatic selection: use the first backend that can be loaded
+        for i, name in enumerate(_order):
+            if _load_backend(name) is not None:
+                if i > 0 and not(pyspike.disable_backend_warning):
+                    print("Warning: %s backend not found. Make sure that \
+PySpike is installed by running\n 'python setup.py build_ext --inplace'!\n \
+Falling back to %s backend." % (_order[0], name))
+                return _order[i:]
+        raise ImportError("No PySpike backend available.")
+    elif _selected in _order:
+        return _order[_order.index(_selected):]
+    else:
+        return [_selected] + _order
+
+
+def _resolve_kernel(name):
+    """ Looks up the given kernel in the backend chain and caches it.
+    """
+    assert name in REQUIRED_KERNELS or name in OPTIONAL_KERNELS, \
+        "Unknown kernel: " + str(name)
+    if len(_kernels) == 0:
+        # first lookup after a change of the backend: resolve the whole chain
+        chain = [n for n in _get_chain() if _load_backend(n) is not None]
+        for kernel in REQUIRED_KERNELS + OPTIONAL_KERNELS:
+            _kernels[kernel] = None
+            for backend in chain:
+                if kernel in _loaded[backend]:
+                    _kernels[kernel] = _loaded[backend][kernel]
+                    break
+    return _kernels[name]
+
+
+############################################################
+# get_kernel
+############################################################
+def get_kernel(name):
+    """ Returns the implementation of the kernel `name` provided by the
+    current backend. If the backend does not provide the kernel, the
+    implementation of the next backend in the fallback order is returned. For
+    optional kernels, None is returned if no backend provides them.
+
+    :param name: name of the kernel, e.g. "isi_profile".
+    :returns: the kernel function, or None
+    """
+    try:
+        return _kernels[name]
+    except KeyError:
+        return _resolve_kernel(name)
+
+
+############################################################
+# set_backend
+############################################################
+def set_backend(name=None):
+    """ Selects the backend used for all following computations. Kernels the
+    backend does not provide are taken from the built-in backends of lower
+    priority ("cython", "numba", "numpy", then "python").
+
+    :param name: name of a registered backend, e.g. "cython", "numba",
+                 "numpy" or "python". If None, the fastest available backend
+                 is chosen automatically.
+    :type name: str or None
+    """
+    global _selected
+    if name is not None:
+        if name not in _loaders:
+            raise ValueError("Unknown backend: %s. Available backends: %s"
+                             % (name, ", ".join(sorted(_loaders))))
+        if _load_backend(name) is None:
+            raise ImportError("The %s backend could not be loaded." % name)
+    _selected = name
+    _kernels.clear()
+
+
+############################################################
+# get_backend
+############################################################
+def get_backend():
+    """ Returns the name of the backend currently in use.
+
+    :returns: name of the backend
+    :rtype: str
+    """
+    if _selected is not None:
+        return _selected
+    get_kernel("isi_profile")  # make sure the chain is resolved
+    for name in _order:
+        if _loaded.get(name) is not None:
+            return name
+
+
+############################################################
+# available_backends
+############################################################
+def available_backends():
+    """ Returns the names of the registered backends that can be loaded.
+
+    :returns: names of the available backends
+    :rtype: list of str
+    """
+    return [name for name in _order + sorted(set(_loaders) - set(_order))
+            if _load_backend(name) is not None]
+
+
+############################################################
+# register_backend
+############################################################
+def register_backend(name, kernels):
+    """ Registers a new backend, which can then be selected with
+    :func:`set_backend`. A backend does not have to provide all kernels,
+    missing kernels are taken from the built-in backends.
+
+    :param name: name of the backend.
+    :type name: str
+    :param kernels: dictionary mapping kernel names to functions, or a
+                    function returning such a dictionary, which is only
+                    called when the backend is used. The function may raise
+                    an ImportError if the backend is not available. The
+                    kernels need to have the same signatures as their cython
+                    counterparts.
+    :type kernels: dict or callable
+    """
+    if not callable(kernels):
+        for kernel in kernels:
+            assert kernel in REQUIRED_KERNELS or kernel in OPTIONAL_KERNELS, \
+                "Unknown kernel: " + str(kernel)
+        kernels = partial(dict, kernels)
+    _loaders[name] = kernels
+    _loaded.pop(name, None)
+    _kernels.clear()
+
+
+############################################################
+# unregister_backend
+############################################################
+def unregister_backend(name):
+    """ Removes a backend registered with :func:`register_backend`. If it is
+    the selected backend, the fastest available backend is used again.
+
+    :param name: name of the backend.
+    :type name: str
+    """
+    global _selected
+    assert name not in _order, "Built-in backends can not be removed."
+    del _loaders[name]
+    _loaded.pop(name, None)
+    if _selected == name:
+        _selected = None
+    _kernels.clear()
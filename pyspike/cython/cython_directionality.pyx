@@ -0,0 +1,210 @@
+#cython: boundscheck=False
+#cython: wraparound=False
+#cython: cdivision=True
+
+"""
+cython_directionality.pyx
+
+cython implementation of the spike directionality and spike train order
+profiles and of the simulated annealing used to find the optimal order of
+spike trains
+
+Copyright 2015, Mario Mulansky <mario.mulansky@gmx.net>
+
+Distributed under the BSD License
+
+"""
+
+import numpy as np
+cimport numpy as np
+
+from libc.math cimport exp
+from libc.math cimport fmin
+
+
+############################################################
+# get_tau
+############################################################
+cdef inline double get_tau(double[:] spikes1, double[:] spikes2,
+                           int i, int j, double interval, double max_tau):
+    cdef double m = interval   # use interval as initial tau
+    cdef int N1 = spikes1.shape[0]-1  # len(spikes1)-1
+    cdef int N2 = spikes2.shape[0]-1  # len(spikes2)-1
+    if i < N1 and i > -1:
+        m = fmin(m, spikes1[i+1]-spikes1[i])
+    if j < N2 and j > -1:
+        m = fmin(m, spikes2[j+1]-spikes2[j])
+    if i > 0:
+        m = fmin(m, spikes1[i]-spikes1[i-1])
+    if j > 0:
+        m = fmin(m, spikes2[j]-spikes2[j-1])
+    m *= 0.5
+    if max_tau > 0.0:
+        m = fmin(m, max_tau)
+    return m
+
+
+############################################################
+# spike_directionality_profiles_cython
+############################################################
+def spike_directionality_profiles_cython(double[:] spikes1,
+                                         double[:] spikes2,
+                                         double t_start, double t_end,
+                                         double max_tau):
+    """ Computes the spike directionality value of each spike of the two
+    spike trains: +1 if the spike leads its coincident spike in the other
+    spike train, -1 if it follows, and 0 if it has no coincident spike or
+    both spikes are at the same time. The coincidences are detected exactly
+    as in coincidence_profile_cython.
+    """
+    cdef int N1 = len(spikes1)
+    cdef int N2 = len(spikes2)
+    cdef int i = -1
+    cdef int j = -1
+    cdef double[:] d1 = np.zeros(N1)
+    cdef double[:] d2 = np.zeros(N2)
+    cdef double interval = t_end - t_start
+    cdef double tau
+    while i + j < N1 + N2 - 2:
+        if (i < N1-1) and (j == N2-1 or spikes1[i+1] < spikes2[j+1]):
+            i += 1
+            tau = get_tau(spikes1, spikes2, i, j, interval, max_tau)
+            if j > -1 and spikes1[i]-spikes2[j] < tau:
+                # coincidence with the previous spike of spike train 2
+                d1[i] = -1
+                d2[j] = 1
+        elif (j < N2-1) and (i == N1-1 or spikes1[i+1] > spikes2[j+1]):
+            j += 1
+            tau = get_tau(spikes1, spikes2, i, j, interval, max_tau)
+            if i > -1 and spikes2[j]-spikes1[i] < tau:
+                # coincidence with the previous spike of spike train 1
+                d1[i] = 1
+                d2[j] = -1
+        else:   # spikes1[i+1] = spikes2[j+1]
+            # simultaneous spikes: no order
+            j += 1
+            i += 1
+
+    return np.asarray(d1), np.asarray(d2)
+
+
+############################################################
+# spike_train_order_profile_cython
+############################################################
+def spike_train_order_profile_cython(double[:] spikes1, double[:] spikes2,
+                                     double t_start, double t_end,
+                                     double max_tau):
+    """ Computes the spike train order profile of the two spike trains: both
+    spikes of a coincidence get the value +1 if the spike of spike train 1
+    leads and -1 if the spike of spike train 2 leads. Spikes without
+    coincidence have the value 0, as simultaneous spikes, which form one
+    event of multiplicity 2. The first and last entries are the edges t_start
+    and t_end, as in coincidence_profile_cython.
+    """
+    cdef int N1 = len(spikes1)
+    cdef int N2 = len(spikes2)
+    cdef int i = -1
+    cdef int j = -1
+    cdef int n = 0
+    cdef double[:] st = np.zeros(N1 + N2 + 2)  # spike times
+    cdef double[:] e = np.zeros(N1 + N2 + 2)   # spike train order values
+    cdef double[:] mp = np.ones(N1 + N2 + 2)   # multiplicity
+    cdef double interval = t_end - t_start
+    cdef double tau
+    while i + j < N1 + N2 - 2:
+        if (i < N1-1) and (j == N2-1 or spikes1[i+1] < spikes2[j+1]):
+            i += 1
+            n += 1
+            tau = get_tau(spikes1, spikes2, i, j, interval, max_tau)
+            st[n] = spikes1[i]
+            if j > -1 and spikes1[i]-spikes2[j] < tau:
+                # spike train 2 leads
+                e[n] = -1
+                e[n-1] = -1
+        elif (j < N2-1) and (i == N1-1 or spikes1[i+1] > spikes2[j+1]):
+            j += 1
+            n += 1
+            tau = get_tau(spikes1, spikes2, i, j, interval, max_tau)
+            st[n] = spikes2[j]
+            if i > -1 and spikes2[j]-spikes1[i] < tau:
+                # spike train 1 leads
+                e[n] = 1
+                e[n-1] = 1
+        else:   # spikes1[i+1] = spikes2[j+1]
+            # advance in both spike trains
+            j += 1
+            i += 1
+            n += 1
+            # add only one event with multiplicity 2 and no order
+            st[n] = spikes1[i]
+            mp[n] = 2
+
+    st = st[:n+2]
+    e = e[:n+2]
+    mp = mp[:n+2]
+
+    st[0] = t_start
+    st[len(st)-1] = t_end
+    if N1 + N2 > 0:
+        e[0] = e[1]
+        e[len(e)-1] = e[len(e)-2]
+        mp[0] = mp[1]
+        mp[len(mp)-1] = mp[len(mp)-2]
+
+    return np.asarray(st), np.asarray(e), np.asarray(mp)
+
+
+############################################################
+# simulated_annealing_cython
+############################################################
+def simulated_annealing_cython(double[:, :] D, Py_ssize_t[:] p_init,
+                               double T_start, double T_end, double alpha,
+                               rng):
+    """ Maximizes the sum of the upper triangle of the permuted matrix,
+    :math:`A = \\sum_{k<l} D_{p_k, p_l}`, over the permutations p by
+    simulated annealing, starting from p_init. Each step swaps two neighbors
+    in the permutation, which changes A by -2 D_{p_k, p_{k+1}}, so the cost
+    is updated in constant time. At each temperature N^2 swaps are tried,
+    then the temperature is reduced by the factor alpha until it falls below
+    T_end. The random numbers are drawn from rng.
+    Returns the best permutation found, its value A and the number of
+    iterations.
+    """
+    cdef int N = len(p_init)
+    cdef Py_ssize_t[:] p = np.array(p_init, dtype=np.intp)
+    best_p = np.array(p_init, dtype=np.intp)
+    cdef double A = 0.0
+    cdef double best_A, dA
+    cdef double T = T_start
+    cdef long iterations = 0
+    cdef long it, n_steps = N*N
+    cdef int k, l
+    cdef Py_ssize_t tmp
+    cdef double[:] u_swap, u_accept
+
+    for k in range(N):
+        for l in range(k+1, N):
+            A += D[p[k], p[l]]
+    best_A = A
+    if N < 2:
+        return best_p, best_A, iterations
+
+    while T > T_end:
+        u_swap = rng.random(n_steps)
+        u_accept = rng.random(n_steps)
+        with nogil:
+            for it in range(n_steps):
+                k = <int>(u_swap[it]*(N-1))
+                dA = -2.0*D[p[k], p[k+1]]
+                if dA > 0.0 or u_accept[it] < exp(dA/T):
+                    tmp = p[k]
+                    p[k] = p[k+1]
+                    p[k+1] = tmp
+                    A += dA
+        iterations += n_steps
+        if A > best_A:
+            best_A = A
+            best_p[:] = p
+        T *= alpha
+
+    return best_p, best_A, iterations
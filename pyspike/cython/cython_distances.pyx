@@ -35,24 +35,30 @@ from libc.math cimport fabs
 from libc.math cimport fmax
 from libc.math cimport fmin
 
+from cython.parallel cimport prange, threadid
+
 DTYPE = np.float
 ctypedef np.float_t DTYPE_t
 
+# output type of the condensed distance matrices
+ctypedef fused real_t:
+    float
+    double
+
 
 ############################################################
-# isi_distance_cython
+# isi_distance_c
 ############################################################
-def isi_distance_cython(double[:] s1, double[:] s2,
-                        double t_start, double t_end):
-
+cdef double isi_distance_c(double* s1, int N1, double* s2, int N2,
+                           double t_start, double t_end) nogil:
+    """ Computes the isi-distance of the spike trains s1 and s2 with N1 and N2
+    spikes. Both spike trains have to contain at least one spike.
+    """
     cdef double isi_value
     cdef int index1, index2, index
-    cdef int N1, N2
     cdef double nu1, nu2
     cdef double last_t, curr_t, curr_isi
     isi_value = 0.0
-    N1 = len(s1)
-    N2 = len(s2)
 
     # first interspike interval - check if a spike exists at the start time
     # and also account for spike trains with single spikes
@@ -82,67 +88,85 @@ def isi_distance_cython(double[:] s1, double[:] s2,
     curr_isi = fabs(nu1-nu2)/fmax(nu1, nu2)
     index = 1
 
-    with nogil: # release the interpreter to allow multithreading
-        while index1+index2 < N1+N2-2:
-            # check which spike is next, only if there are spikes left in 1
-            # next spike in 1 is earlier, or there are no spikes left in 2
-            if (index1 < N1-1) and ((index2 == N2-1) or
-                                    (s1[index1+1] < s2[index2+1])):
-                index1 += 1
-                curr_t = s1[index1]
-                if index1 < N1-1:
-                    nu1 = s1[index1+1]-s1[index1]
-                else:
-                    # edge correction for the last ISI: 
-                    # take the max of the distance of the last
-                    # spike to the end and the previous ISI. If there was only
-                    # one spike, always take the distance to the end.
-                    nu1 = fmax(t_end-s1[index1], nu1) if N1 > 1 \
-                          else t_end-s1[index1]
-            elif (index2 < N2-1) and ((index1 == N1-1) or
-                                      (s1[index1+1] > s2[index2+1])):
-                index2 += 1
-                curr_t = s2[index2]
-                if index2 < N2-1:
-                    nu2 = s2[index2+1]-s2[index2]
-                else:
-                    # edge correction for the end as above
-                    nu2 = fmax(t_end-s2[index2], nu2) if N2 > 1 \
-                          else t_end-s2[index2]
-            else: # s1[index1+1] == s2[index2+1]
-                index1 += 1
-                index2 += 1
-                curr_t = s1[index1]
-                if index1 < N1-1:
-                    nu1 = s1[index1+1]-s1[index1]
-                else:
-                    # edge correction for the end as above
-                    nu1 = fmax(t_end-s1[index1], nu1) if N1 > 1 \
-                          else t_end-s1[index1]
-                if index2 < N2-1:
-                    nu2 = s2[index2+1]-s2[index2]
-                else:
-                    # edge correction for the end as above
-                    nu2 = fmax(t_end-s2[index2], nu2) if N2 > 1 \
-                          else t_end-s2[index2]
-            # compute the corresponding isi-distance
+    while index1+index2 < N1+N2-2:
+        # check which spike is next, only if there are spikes left in 1
+        # next spike in 1 is earlier, or there are no spikes left in 2
+        if (index1 < N1-1) and ((index2 == N2-1) or
+                                (s1[index1+1] < s2[index2+1])):
+            index1 += 1
+            curr_t = s1[index1]
+            if index1 < N1-1:
+                nu1 = s1[index1+1]-s1[index1]
+            else:
+                # edge correction for the last ISI: 
+                # take the max of the distance of the last
+                # spike to the end and the previous ISI. If there was only
+                # one spike, always take the distance to the end.
+                nu1 = fmax(t_end-s1[index1], nu1) if N1 > 1 \
+                      else t_end-s1[index1]
+        elif (index2 < N2-1) and ((index1 == N1-1) or
+                                  (s1[index1+1] > s2[index2+1])):
+            index2 += 1
+            curr_t = s2[index2]
+            if index2 < N2-1:
+                nu2 = s2[index2+1]-s2[index2]
+            else:
+                # edge correction for the end as above
+                nu2 = fmax(t_end-s2[index2], nu2) if N2 > 1 \
+                      else t_end-s2[index2]
+        else: # s1[index1+1] == s2[index2+1]
+            index1 += 1
+            index2 += 1
+            curr_t = s1[index1]
+            if index1 < N1-1:
+                nu1 = s1[index1+1]-s1[index1]
+            else:
+                # edge correction for the end as above
+                nu1 = fmax(t_end-s1[index1], nu1) if N1 > 1 \
+                      else t_end-s1[index1]
+            if index2 < N2-1:
+                nu2 = s2[index2+1]-s2[index2]
+            else:
+                # edge correction for the end as above
+                nu2 = fmax(t_end-s2[index2], nu2) if N2 > 1 \
+                      else t_end-s2[index2]
+        # compute the corresponding isi-distance
+        # zero length segments, e.g. a spike at t_end, do not contribute
+        if curr_t > last_t:
             isi_value += curr_isi * (curr_t - last_t)
-            curr_isi = fabs(nu1 - nu2) / fmax(nu1, nu2)
-            last_t = curr_t
-            index += 1
+        curr_isi = fabs(nu1 - nu2) / fmax(nu1, nu2)
+        last_t = curr_t
+        index += 1
 
+    if t_end > last_t:
         isi_value += curr_isi * (t_end - last_t)
-    # end nogil
 
     return isi_value / (t_end-t_start)
 
 
+############################################################
+# isi_distance_cython
+############################################################
+def isi_distance_cython(double[:] s1, double[:] s2,
+                        double t_start, double t_end):
+
+    cdef double isi_value
+    cdef int N1 = len(s1)
+    cdef int N2 = len(s2)
+
+    with nogil: # release the interpreter to allow multithreading
+        isi_value = isi_distance_c(&s1[0], N1, &s2[0], N2, t_start, t_end)
+    # end nogil
+
+    return isi_value
+
+
 ############################################################
 # get_min_dist_cython
 ############################################################
 cdef inline double get_min_dist_cython(double spike_time, 
-                                       double[:] spike_train,
-                                       # use memory view to ensure inlining
+                                       double* spike_train,
+                                       # use plain pointer to ensure inlining
                                        # np.ndarray[DTYPE_t,ndim=1] spike_train,
                                        int N,
                                        int start_index,
@@ -181,200 +205,218 @@ cdef inline double isi_avrg_cython(double isi1, double isi2) nogil:
 
 
 ############################################################
-# spike_distance_cython
+# spike_distance_c
 ############################################################
-def spike_distance_cython(double[:] t1, double[:] t2,
-                          double t_start, double t_end):
-
-    cdef int N1, N2, index1, index2, index
+cdef double spike_distance_c(double* t1, int N1, double* t2, int N2,
+                             double t_start, double t_end) nogil:
+    """ Computes the spike-distance of the spike trains t1 and t2 with N1 and
+    N2 spikes. Both spike trains have to contain at least one spike.
+    """
+    cdef int index1, index2, index
     cdef double t_p1, t_f1, t_p2, t_f2, dt_p1, dt_p2, dt_f1, dt_f2
     cdef double isi1, isi2, s1, s2
-    cdef double y_start, y_end, t_last, t_current, spike_value
-    cdef double[:] t_aux1 = np.empty(2)
-    cdef double[:] t_aux2 = np.empty(2)
+    cdef double y_start, y_end, t_last, t_curr, spike_value
+    cdef double t_aux1[2]
+    cdef double t_aux2[2]
     
     spike_value = 0.0
 
-    N1 = len(t1)
-    N2 = len(t2)
-
-    # we can assume at least one spikes per spike train
-    assert N1 > 0
-    assert N2 > 0
+    t_last = t_start
+    # auxiliary spikes for edge correction - consistent with first/last ISI 
+    t_aux1[0] = fmin(t_start, 2*t1[0]-t1[1]) if N1 > 1 else t_start
+    t_aux1[1] = fmax(t_end, 2*t1[N1-1]-t1[N1-2]) if N1 > 1 else t_end
+    t_aux2[0] = fmin(t_start, 2*t2[0]-t2[1]) if N2 > 1 else t_start
+    t_aux2[1] = fmax(t_end, 2*t2[N2-1]+-t2[N2-2]) if N2 > 1 else t_end
+    # print "aux spikes %.15f, %.15f ; %.15f, %.15f" % (t_aux1[0], t_aux1[1], t_aux2[0], t_aux2[1])
+    t_p1 = t_start if (t1[0] == t_start) else t_aux1[0]
+    t_p2 = t_start if (t2[0] == t_start) else t_aux2[0]
+    if t1[0] > t_start:
+        # dt_p1 = t2[0]-t_start
+        t_f1 = t1[0]
+        dt_f1 = get_min_dist_cython(t_f1, t2, N2, 0, t_aux2[0], t_aux2[1])
+        isi1 = fmax(t_f1-t_start, t1[1]-t1[0]) if N1 > 1 else t_f1-t_start
+        dt_p1 = dt_f1
+        # s1 = dt_p1*(t_f1-t_start)/isi1
+        s1 = dt_p1
+        index1 = -1
+    else:  # t1[0] == t_start
+        t_f1 = t1[1] if N1 > 1 else t_end
+        dt_f1 = get_min_dist_cython(t_f1, t2, N2, 0, t_aux2[0], t_aux2[1])
+        dt_p1 = get_min_dist_cython(t_p1, t2, N2, 0, t_aux2[0], t_aux2[1])
+        isi1 = t_f1-t1[0]
+        s1 = dt_p1
+        index1 = 0
+    if t2[0] > t_start:
+        # dt_p1 = t2[0]-t_start
+        t_f2 = t2[0]
+        dt_f2 = get_min_dist_cython(t_f2, t1, N1, 0, t_aux1[0], t_aux1[1])
+        dt_p2 = dt_f2
+        isi2 = fmax(t_f2-t_start, t2[1]-t2[0]) if N2 > 1 else t_f2-t_start
+        # s2 = dt_p2*(t_f2-t_start)/isi2
+        s2 = dt_p2
+        index2 = -1
+    else:  # t2[0] == t_start
+        t_f2 = t2[1] if N2 > 1 else t_end
+        dt_f2 = get_min_dist_cython(t_f2, t1, N1, 0, t_aux1[0], t_aux1[1])
+        # dt_p2 = t_start-t_p1  # 0.0
+        dt_p2 = get_min_dist_cython(t_p2, t1, N1, 0, t_aux1[0], t_aux1[1])
+        isi2 = t_f2-t2[0]
+        s2 = dt_p2
+        index2 = 0
 
+    y_start = (s1*isi2 + s2*isi1) / isi_avrg_cython(isi1, isi2)
+    index = 1
 
-    with nogil: # release the interpreter to allow multithreading
-        t_last = t_start
-        # auxiliary spikes for edge correction - consistent with first/last ISI 
-        t_aux1[0] = fmin(t_start, 2*t1[0]-t1[1]) if N1 > 1 else t_start
-        t_aux1[1] = fmax(t_end, 2*t1[N1-1]-t1[N1-2]) if N1 > 1 else t_end
-        t_aux2[0] = fmin(t_start, 2*t2[0]-t2[1]) if N2 > 1 else t_start
-        t_aux2[1] = fmax(t_end, 2*t2[N2-1]+-t2[N2-2]) if N2 > 1 else t_end
-        # print "aux spikes %.15f, %.15f ; %.15f, %.15f" % (t_aux1[0], t_aux1[1], t_aux2[0], t_aux2[1])
-        t_p1 = t_start if (t1[0] == t_start) else t_aux1[0]
-        t_p2 = t_start if (t2[0] == t_start) else t_aux2[0]
-        if t1[0] > t_start:
-            # dt_p1 = t2[0]-t_start
-            t_f1 = t1[0]
-            dt_f1 = get_min_dist_cython(t_f1, t2, N2, 0, t_aux2[0], t_aux2[1])
-            isi1 = fmax(t_f1-t_start, t1[1]-t1[0]) if N1 > 1 else t_f1-t_start
+    while index1+index2 < N1+N2-2:
+        # print(index, index1, index2)
+        if (index1 < N1-1) and (t_f1 < t_f2 or index2 == N2-1):
+            index1 += 1
+            # first calculate the previous interval end value
+            s1 = dt_f1*(t_f1-t_p1) / isi1
+            # the previous time now was the following time before:
             dt_p1 = dt_f1
-            # s1 = dt_p1*(t_f1-t_start)/isi1
-            s1 = dt_p1
-            index1 = -1
-        else:  # t1[0] == t_start
-            t_f1 = t1[1] if N1 > 1 else t_end
-            dt_f1 = get_min_dist_cython(t_f1, t2, N2, 0, t_aux2[0], t_aux2[1])
-            dt_p1 = get_min_dist_cython(t_p1, t2, N2, 0, t_aux2[0], t_aux2[1])
-            isi1 = t_f1-t1[0]
-            s1 = dt_p1
-            index1 = 0
-        if t2[0] > t_start:
-            # dt_p1 = t2[0]-t_start
-            t_f2 = t2[0]
-            dt_f2 = get_min_dist_cython(t_f2, t1, N1, 0, t_aux1[0], t_aux1[1])
-            dt_p2 = dt_f2
-            isi2 = fmax(t_f2-t_start, t2[1]-t2[0]) if N2 > 1 else t_f2-t_start
-            # s2 = dt_p2*(t_f2-t_start)/isi2
-            s2 = dt_p2
-            index2 = -1
-        else:  # t2[0] == t_start
-            t_f2 = t2[1] if N2 > 1 else t_end
-            dt_f2 = get_min_dist_cython(t_f2, t1, N1, 0, t_aux1[0], t_aux1[1])
-            # dt_p2 = t_start-t_p1  # 0.0
-            dt_p2 = get_min_dist_cython(t_p2, t1, N1, 0, t_aux1[0], t_aux1[1])
-            isi2 = t_f2-t2[0]
-            s2 = dt_p2
-            index2 = 0
-
-        y_start = (s1*isi2 + s2*isi1) / isi_avrg_cython(isi1, isi2)
-        index = 1
-
-        while index1+index2 < N1+N2-2:
-            # print(index, index1, index2)
-            if (index1 < N1-1) and (t_f1 < t_f2 or index2 == N2-1):
-                index1 += 1
-                # first calculate the previous interval end value
-                s1 = dt_f1*(t_f1-t_p1) / isi1
-                # the previous time now was the following time before:
-                dt_p1 = dt_f1
-                t_p1 = t_f1    # t_p1 contains the current time point
-                # get the next time
-                if index1 < N1-1:
-                    t_f1 = t1[index1+1]
-                else:
-                    t_f1 = t_aux1[1]
-                t_curr =  t_p1
-                s2 = (dt_p2*(t_f2-t_p1) + dt_f2*(t_p1-t_p2)) / isi2
-                y_end = (s1*isi2 + s2*isi1)/isi_avrg_cython(isi1, isi2)
+            t_p1 = t_f1    # t_p1 contains the current time point
+            # get the next time
+            if index1 < N1-1:
+                t_f1 = t1[index1+1]
+            else:
+                t_f1 = t_aux1[1]
+            t_curr =  t_p1
+            s2 = (dt_p2*(t_f2-t_p1) + dt_f2*(t_p1-t_p2)) / isi2
+            y_end = (s1*isi2 + s2*isi1)/isi_avrg_cython(isi1, isi2)
 
+            if t_curr > t_last:
                 spike_value += 0.5*(y_start + y_end) * (t_curr - t_last)
 
-                # now the next interval start value
-                if index1 < N1-1:
-                    dt_f1 = get_min_dist_cython(t_f1, t2, N2, index2,
-                                                t_aux2[0], t_aux2[1])
-                    isi1 = t_f1-t_p1
-                    s1 = dt_p1
-                else:
-                    dt_f1 = dt_p1
-                    isi1 = fmax(t_end-t1[N1-1], t1[N1-1]-t1[N1-2]) if N1 > 1 \
-                           else t_end-t1[N1-1]
-                    # s1 needs adjustment due to change of isi1
-                    # s1 = dt_p1*(t_end-t1[N1-1])/isi1
-                    # Eero's correction: no adjustment
-                    s1 = dt_p1
-                # s2 is the same as above, thus we can compute y2 immediately
-                y_start = (s1*isi2 + s2*isi1)/isi_avrg_cython(isi1, isi2)
-            elif (index2 < N2-1) and (t_f1 > t_f2 or index1 == N1-1):
-                index2 += 1
-                # first calculate the previous interval end value
-                s2 = dt_f2*(t_f2-t_p2) / isi2
-                # the previous time now was the following time before:
-                dt_p2 = dt_f2
-                t_p2 = t_f2    # t_p2 contains the current time point
-                # get the next time
-                if index2 < N2-1:
-                    t_f2 = t2[index2+1]
-                else:
-                    t_f2 = t_aux2[1]
-                t_curr = t_p2
-                s1 = (dt_p1*(t_f1-t_p2) + dt_f1*(t_p2-t_p1)) / isi1
-                y_end = (s1*isi2 + s2*isi1) / isi_avrg_cython(isi1, isi2)
+            # now the next interval start value
+            if index1 < N1-1:
+                dt_f1 = get_min_dist_cython(t_f1, t2, N2, index2,
+                                            t_aux2[0], t_aux2[1])
+                isi1 = t_f1-t_p1
+                s1 = dt_p1
+            else:
+                dt_f1 = dt_p1
+                isi1 = fmax(t_end-t1[N1-1], t1[N1-1]-t1[N1-2]) if N1 > 1 \
+                       else t_end-t1[N1-1]
+                # s1 needs adjustment due to change of isi1
+                # s1 = dt_p1*(t_end-t1[N1-1])/isi1
+                # Eero's correction: no adjustment
+                s1 = dt_p1
+            # s2 is the same as above, thus we can compute y2 immediately
+            y_start = (s1*isi2 + s2*isi1)/isi_avrg_cython(isi1, isi2)
+        elif (index2 < N2-1) and (t_f1 > t_f2 or index1 == N1-1):
+            index2 += 1
+            # first calculate the previous interval end value
+            s2 = dt_f2*(t_f2-t_p2) / isi2
+            # the previous time now was the following time before:
+            dt_p2 = dt_f2
+            t_p2 = t_f2    # t_p2 contains the current time point
+            # get the next time
+            if index2 < N2-1:
+                t_f2 = t2[index2+1]
+            else:
+                t_f2 = t_aux2[1]
+            t_curr = t_p2
+            s1 = (dt_p1*(t_f1-t_p2) + dt_f1*(t_p2-t_p1)) / isi1
+            y_end = (s1*isi2 + s2*isi1) / isi_avrg_cython(isi1, isi2)
 
+            if t_curr > t_last:
                 spike_value += 0.5*(y_start + y_end) * (t_curr - t_last)
 
-                # now the next interval start value
-                if index2 < N2-1:
-                    dt_f2 = get_min_dist_cython(t_f2, t1, N1, index1,
-                                                t_aux1[0], t_aux1[1])
-                    isi2 = t_f2-t_p2
-                    s2 = dt_p2
-                else:
-                    dt_f2 = dt_p2
-                    isi2 = fmax(t_end-t2[N2-1], t2[N2-1]-t2[N2-2]) if N2 > 1 \
-                           else t_end-t2[N2-1]
-                    # s2 needs adjustment due to change of isi2
-                    # s2 = dt_p2*(t_end-t2[N2-1])/isi2
-                    # Eero's correction: no adjustment
-                    s2 = dt_p2
-                # s1 is the same as above, thus we can compute y2 immediately
-                y_start = (s1*isi2 + s2*isi1)/isi_avrg_cython(isi1, isi2)
-            else: # t_f1 == t_f2 - generate only one event
-                index1 += 1
-                index2 += 1
-                t_p1 = t_f1
-                t_p2 = t_f2
-                dt_p1 = 0.0
-                dt_p2 = 0.0
-                t_curr = t_f1
-                y_end = 0.0
+            # now the next interval start value
+            if index2 < N2-1:
+                dt_f2 = get_min_dist_cython(t_f2, t1, N1, index1,
+                                            t_aux1[0], t_aux1[1])
+                isi2 = t_f2-t_p2
+                s2 = dt_p2
+            else:
+                dt_f2 = dt_p2
+                isi2 = fmax(t_end-t2[N2-1], t2[N2-1]-t2[N2-2]) if N2 > 1 \
+                       else t_end-t2[N2-1]
+                # s2 needs adjustment due to change of isi2
+                # s2 = dt_p2*(t_end-t2[N2-1])/isi2
+                # Eero's correction: no adjustment
+                s2 = dt_p2
+            # s1 is the same as above, thus we can compute y2 immediately
+            y_start = (s1*isi2 + s2*isi1)/isi_avrg_cython(isi1, isi2)
+        else: # t_f1 == t_f2 - generate only one event
+            index1 += 1
+            index2 += 1
+            t_p1 = t_f1
+            t_p2 = t_f2
+            dt_p1 = 0.0
+            dt_p2 = 0.0
+            t_curr = t_f1
+            y_end = 0.0
+            if t_curr > t_last:
                 spike_value += 0.5*(y_start + y_end) * (t_curr - t_last)
-                y_start = 0.0
-                if index1 < N1-1:
-                    t_f1 = t1[index1+1]
-                    dt_f1 = get_min_dist_cython(t_f1, t2, N2, index2,
-                                                t_aux2[0], t_aux2[1])
-                    isi1 = t_f1 - t_p1
-                else:
-                    t_f1 = t_aux1[1]
-                    dt_f1 = dt_p1
-                    isi1 = fmax(t_end-t1[N1-1], t1[N1-1]-t1[N1-2]) if N1 > 1 \
-                           else t_end-t1[N1-1]
-                if index2 < N2-1:
-                    t_f2 = t2[index2+1]
-                    dt_f2 = get_min_dist_cython(t_f2, t1, N1, index1,
-                                                t_aux1[0], t_aux1[1])
-                    isi2 = t_f2 - t_p2
-                else:
-                    t_f2 = t_aux2[1]
-                    dt_f2 = dt_p2
-                    isi2 = fmax(t_end-t2[N2-1], t2[N2-1]-t2[N2-2]) if N2 > 1 \
-                           else t_end-t2[N2-1]
-            index += 1
-            t_last = t_curr
-        # isi1 = max(t_end-t1[N1-1], t1[N1-1]-t1[N1-2])
-        # isi2 = max(t_end-t2[N2-1], t2[N2-1]-t2[N2-2])
-        s1 = dt_f1 # *(t_end-t1[N1-1])/isi1
-        s2 = dt_f2 # *(t_end-t2[N2-1])/isi2
-        y_end = (s1*isi2 + s2*isi1) / isi_avrg_cython(isi1, isi2)
+            y_start = 0.0
+            if index1 < N1-1:
+                t_f1 = t1[index1+1]
+                dt_f1 = get_min_dist_cython(t_f1, t2, N2, index2,
+                                            t_aux2[0], t_aux2[1])
+                isi1 = t_f1 - t_p1
+            else:
+                t_f1 = t_aux1[1]
+                dt_f1 = dt_p1
+                isi1 = fmax(t_end-t1[N1-1], t1[N1-1]-t1[N1-2]) if N1 > 1 \
+                       else t_end-t1[N1-1]
+            if index2 < N2-1:
+                t_f2 = t2[index2+1]
+                dt_f2 = get_min_dist_cython(t_f2, t1, N1, index1,
+                                            t_aux1[0], t_aux1[1])
+                isi2 = t_f2 - t_p2
+            else:
+                t_f2 = t_aux2[1]
+                dt_f2 = dt_p2
+                isi2 = fmax(t_end-t2[N2-1], t2[N2-1]-t2[N2-2]) if N2 > 1 \
+                       else t_end-t2[N2-1]
+        index += 1
+        t_last = t_curr
+    # isi1 = max(t_end-t1[N1-1], t1[N1-1]-t1[N1-2])
+    # isi2 = max(t_end-t2[N2-1], t2[N2-1]-t2[N2-2])
+    s1 = dt_f1 # *(t_end-t1[N1-1])/isi1
+    s2 = dt_f2 # *(t_end-t2[N2-1])/isi2
+    y_end = (s1*isi2 + s2*isi1) / isi_avrg_cython(isi1, isi2)
+    if t_end > t_last:
         spike_value += 0.5*(y_start + y_end) * (t_end - t_last)
-    # end nogil
 
     # use only the data added above 
     # could be less than original length due to equal spike times
     return spike_value / (t_end-t_start)
 
 
+############################################################
+# spike_distance_cython
+############################################################
+def spike_distance_cython(double[:] t1, double[:] t2,
+                          double t_start, double t_end):
+
+    cdef double spike_value
+    cdef int N1 = len(t1)
+    cdef int N2 = len(t2)
+
+    # we can assume at least one spikes per spike train
+    assert N1 > 0
+    assert N2 > 0
+
+    with nogil: # release the interpreter to allow multithreading
+        spike_value = spike_distance_c(&t1[0], N1, &t2[0], N2,
+                                       t_start, t_end)
+    # end nogil
+
+    return spike_value
+
+
 
 ############################################################
 # get_tau
 ############################################################
-cdef inline double get_tau(double[:] spikes1, double[:] spikes2,
-                           int i, int j, double interval, double max_tau):
+cdef inline double get_tau(double* spikes1, int N1, double* spikes2, int N2,
+                           int i, int j, double interval,
+                           double max_tau) nogil:
     cdef double m = interval   # use interval length as initial tau
-    cdef int N1 = spikes1.shape[0]-1  # len(spikes1)-1
-    cdef int N2 = spikes2.shape[0]-1  # len(spikes2)-1
+    # N1, N2 are the index of the last spike, i.e. len(spikes)-1
     if i < N1 and i > -1:
         m = fmin(m, spikes1[i+1]-spikes1[i])
     if j < N2 and j > -1:
@@ -390,13 +432,16 @@ cdef inline double get_tau(double[:] spikes1, double[:] spikes2,
     
 
 ############################################################
-# coincidence_value_cython
+# coincidence_value_c
 ############################################################
-def coincidence_value_cython(double[:] spikes1, double[:] spikes2,
-                             double t_start, double t_end, double max_tau):
-
-    cdef int N1 = len(spikes1)
-    cdef int N2 = len(spikes2)
+cdef void coincidence_value_c(double* spikes1, int N1,
+                              double* spikes2, int N2,
+                              double t_start, double t_end, double max_tau,
+                              double* coinc_out, double* mp_out) nogil:
+    """ Computes the summed coincidences and multiplicity of the spike trains
+    spikes1 and spikes2 with N1 and N2 spikes and writes them to coinc_out and
+    mp_out. The spike trains might be empty.
+    """
     cdef int i = -1
     cdef int j = -1
     cdef double coinc = 0.0
@@ -407,7 +452,8 @@ def coincidence_value_cython(double[:] spikes1, double[:] spikes2,
         if (i < N1-1) and (j == N2-1 or spikes1[i+1] < spikes2[j+1]):
             i += 1
             mp += 1
-            tau = get_tau(spikes1, spikes2, i, j, interval, max_tau)
+            tau = get_tau(spikes1, N1-1, spikes2, N2-1, i, j,
+                          interval, max_tau)
             if j > -1 and spikes1[i]-spikes2[j] < tau:
                 # coincidence between the current spike and the previous spike
                 # both get marked with 1
@@ -415,7 +461,8 @@ def coincidence_value_cython(double[:] spikes1, double[:] spikes2,
         elif (j < N2-1) and (i == N1-1 or spikes1[i+1] > spikes2[j+1]):
             j += 1
             mp += 1
-            tau = get_tau(spikes1, spikes2, i, j, interval, max_tau)
+            tau = get_tau(spikes1, N1-1, spikes2, N2-1, i, j,
+                          interval, max_tau)
             if i > -1 and spikes2[j]-spikes1[i] < tau:
                 # coincidence between the current spike and the previous spike
                 # both get marked with 1
@@ -433,4 +480,803 @@ def coincidence_value_cython(double[:] spikes1, double[:] spikes2,
         coinc = 1
         mp = 1
 
+    coinc_out[0] = coinc
+    mp_out[0] = mp
+
+
+############################################################
+# coincidence_value_cython
+############################################################
+def coincidence_value_cython(double[:] spikes1, double[:] spikes2,
+                             double t_start, double t_end, double max_tau):
+
+    cdef int N1 = len(spikes1)
+    cdef int N2 = len(spikes2)
+    cdef double coinc, mp
+    # empty spike trains are allowed here, so don't index into them
+    cdef double* p1 = &spikes1[0] if N1 > 0 else NULL
+    cdef double* p2 = &spikes2[0] if N2 > 0 else NULL
+
+    with nogil: # release the interpreter to allow multithreading
+        coincidence_value_c(p1, N1, p2, N2, t_start, t_end, max_tau,
+                            &coinc, &mp)
+    # end nogil
+
+    return coinc, mp
+
+
+############################################################
+# isi_distance_matrix_cython
+############################################################
+def isi_distance_matrix_cython(double[:] spikes, Py_ssize_t[:] offsets,
+                               double t_start, double t_end,
+                               int num_threads):
+    """ Computes the isi-distances of all pairs of spike trains given as one
+    flat array of spike times, where spike train n consists of
+    spikes[offsets[n]:offsets[n+1]]. All spike trains have to contain at least
+    one spike. The rows of the matrix are distributed over num_threads
+    threads, which requires the extension to be compiled with OpenMP support,
+    otherwise the computation runs serially.
+    """
+    cdef int N = len(offsets)-1
+    cdef int i, j
+    cdef double d
+    cdef double[:, :] distances = np.zeros((N, N))
+
+    for i in prange(N, nogil=True, schedule='dynamic',
+                    num_threads=num_threads):
+        for j in range(i+1, N):
+            d = isi_distance_c(&spikes[offsets[i]], offsets[i+1]-offsets[i],
+                               &spikes[offsets[j]], offsets[j+1]-offsets[j],
+                               t_start, t_end)
+            distances[i, j] = d
+            distances[j, i] = d
+
+    return np.asarray(distances)
+
+
+############################################################
+# spike_distance_matrix_cython
+############################################################
+def spike_distance_matrix_cython(double[:] spikes, Py_ssize_t[:] offsets,
+                                 double t_start, double t_end,
+                                 int num_threads):
+    """ Computes the spike-distances of all pairs of spike trains, see
+    isi_distance_matrix_cython for the format of the spike trains.
+    """
+    cdef int N = len(offsets)-1
+    cdef int i, j
+    cdef double d
+    cdef double[:, :] distances = np.zeros((N, N))
+
+    for i in prange(N, nogil=True, schedule='dynamic',
+                    num_threads=num_threads):
+        for j in range(i+1, N):
+            d = spike_distance_c(&spikes[offsets[i]],
+                                 offsets[i+1]-offsets[i],
+                                 &spikes[offsets[j]],
+                                 offsets[j+1]-offsets[j],
+                                 t_start, t_end)
+            distances[i, j] = d
+            distances[j, i] = d
+
+    return np.asarray(distances)
+
+
+############################################################
+# coincidence_sweep_cython
+############################################################
+def coincidence_sweep_cython(double[:] spikes, Py_ssize_t[:] offsets,
+                             double t_start, double t_end, double max_tau,
+                             int num_threads):
+    """ Detects the coincidences of all pairs of spike trains, see
+    isi_distance_matrix_cython for the format of the spike trains, which might
+    be empty here. Instead of scanning every pair, all spikes are merged into
+    one sorted event stream and the coincidence window of each spike, i.e.
+    half its minimal neighboring ISI, is computed once. For every spike, the
+    preceding spikes of the other spike trains are then found by scanning
+    backwards in the stream up to the window size. This detects the same
+    coincidences as coincidence_value_c applied to each pair. The spike
+    trains are distributed over num_threads threads.
+    Returns two matrices: the coincidences counted from the spikes of spike
+    train b with spike train a in entry [b, a], without symmetrization, and
+    the number of spikes of b that follow a coincident spike of a.
+    """
+    cdef int N = len(offsets)-1
+    cdef Py_ssize_t M = len(spikes)
+    cdef int i, a, b, tid
+    cdef Py_ssize_t k, p, q
+    cdef double t, tau
+
+    spikes_np = np.asarray(spikes)
+    offsets_np = np.asarray(offsets)
+    train_ids = np.repeat(np.arange(N, dtype=np.intp), np.diff(offsets_np))
+    # half of the minimal neighboring ISI of each spike, bounded by the
+    # interval length and max_tau, as in get_tau
+    half_isi = np.full(M, t_end-t_start)
+    if M > 1:
+        isi = np.diff(spikes_np)
+        same = train_ids[1:] == train_ids[:-1]
+        half_isi[:-1] = np.where(same, np.fmin(half_isi[:-1], isi),
+                                 half_isi[:-1])
+        half_isi[1:] = np.where(same, np.fmin(half_isi[1:], isi),
+                                half_isi[1:])
+    half_isi *= 0.5
+    if max_tau > 0.0:
+        half_isi = np.fmin(half_isi, max_tau)
+    # the merged event stream, coinciding spikes ordered by spike train
+    order = np.argsort(spikes_np, kind='mergesort')
+    position_np = np.empty(M, dtype=np.intp)
+    position_np[order] = np.arange(M, dtype=np.intp)
+
+    cdef double[:] times = spikes_np[order]
+    cdef double[:] taus = half_isi[order]
+    cdef Py_ssize_t[:] trains = train_ids[order]
+    cdef Py_ssize_t[:] position = position_np
+    cdef double[:] tau_spikes = half_isi
+    # last spike that visited each spike train, one row per thread
+    cdef Py_ssize_t[:, :] visited = np.full((max(num_threads, 1), N), -1,
+                                            dtype=np.intp)
+    coinc_np = np.zeros((N, N))
+    follow_np = np.zeros((N, N))
+    cdef double[:, :] coinc = coinc_np
+    cdef double[:, :] follow = follow_np
+
+    for b in prange(N, nogil=True, schedule='dynamic',
+                    num_threads=num_threads):
+        tid = threadid()
+        for k in range(offsets[b], offsets[b+1]):
+            p = position[k]
+            t = times[p]
+            tau = tau_spikes[k]
+            # spikes at the same time are coincident, count each such pair
+            # once from its later spike in the stream
+            q = p - 1
+            while q >= 0 and times[q] == t:
+                a = trains[q]
+                if a != b and visited[tid, a] != p:
+                    visited[tid, a] = p
+                    coinc[b, a] += 2
+                q = q - 1
+            # no predecessor check for spike trains with a spike at this time
+            i = 1
+            while p + i < M and times[p+i] == t:
+                visited[tid, trains[p+i]] = p
+                i = i + 1
+            # the first spike of each spike train found scanning backwards is
+            # the preceding spike of that train
+            while q >= 0 and t - times[q] < tau:
+                a = trains[q]
+                if a != b and visited[tid, a] != p:
+                    visited[tid, a] = p
+                    if t - times[q] < taus[q]:
+                        coinc[b, a] += 2
+                        follow[b, a] += 1
+                q = q - 1
+
+    return coinc_np, follow_np
+
+
+############################################################
+# coincidence_matrix_cython
+############################################################
+def coincidence_matrix_cython(double[:] spikes, Py_ssize_t[:] offsets,
+                              double t_start, double t_end, double max_tau,
+                              int num_threads):
+    """ Computes the summed coincidences and multiplicities of all pairs of
+    spike trains in one sweep, see coincidence_sweep_cython.
+    Returns the matrices of the coincidences and multiplicities.
+    """
+    coinc, follow = coincidence_sweep_cython(spikes, offsets, t_start, t_end,
+                                             max_tau, num_threads)
+    coinc += coinc.T
+    # the multiplicity is the total number of spikes of the pair
+    counts = np.diff(np.asarray(offsets))
+    mp = (counts[:, None] + counts[None, :]).astype(float)
+    # empty spike trains -> spike sync = 1 by definition
+    empty = mp == 0.0
+    coinc[empty] = 1.0
+    mp[empty] = 1.0
+    return coinc, mp
+
+
+############################################################
+# spike_directionality_matrix_cython
+############################################################
+def spike_directionality_matrix_cython(double[:] spikes,
+                                       Py_ssize_t[:] offsets,
+                                       double t_start, double t_end,
+                                       double max_tau, int num_threads):
+    """ Computes the antisymmetric matrix of the summed spike directionality
+    values of all pairs of spike trains, i.e. entry [n, m] is the number of
+    spikes of n leading a coincident spike of m minus the number of spikes
+    of n following a coincident spike of m. See coincidence_sweep_cython.
+    """
+    coinc, follow = coincidence_sweep_cython(spikes, offsets, t_start, t_end,
+                                             max_tau, num_threads)
+    return follow.T - follow
+
+
+############################################################
+# spike_sync_matrix_cython
+############################################################
+def spike_sync_matrix_cython(double[:] spikes, Py_ssize_t[:] offsets,
+                             double t_start, double t_end, double max_tau,
+                             int num_threads):
+    """ Computes the spike synchronization values of all pairs of spike
+    trains from the coincidence matrix, see coincidence_matrix_cython.
+    """
+    coinc, mp = coincidence_matrix_cython(spikes, offsets, t_start, t_end,
+                                          max_tau, num_threads)
+    sync = coinc/mp
+    np.fill_diagonal(sync, 0.0)
+    return sync
+
+
+############################################################
+# isi_distance_cross_cython
+############################################################
+def isi_distance_cross_cython(double[:] spikes_a, Py_ssize_t[:] offsets_a,
+                              double[:] spikes_b, Py_ssize_t[:] offsets_b,
+                              double t_start, double t_end, int num_threads):
+    """ Computes the isi-distances between all spike trains of the set a and
+    all spike trains of the set b, each given in the format of
+    isi_distance_matrix_cython. The N_a*N_b pairs are enumerated row by row
+    and distributed in chunks over num_threads threads.
+    """
+    cdef Py_ssize_t N_a = len(offsets_a)-1
+    cdef Py_ssize_t N_b = len(offsets_b)-1
+    cdef Py_ssize_t i, j, k
+    cdef double[:, :] distances = np.zeros((N_a, N_b))
+
+    for k in prange(N_a*N_b, nogil=True, schedule='guided',
+                    num_threads=num_threads):
+        i = k // N_b
+        j = k % N_b
+        distances[i, j] = isi_distance_c(
+            &spikes_a[offsets_a[i]], offsets_a[i+1]-offsets_a[i],
+            &spikes_b[offsets_b[j]], offsets_b[j+1]-offsets_b[j],
+            t_start, t_end)
+
+    return np.asarray(distances)
+
+
+############################################################
+# spike_distance_cross_cython
+############################################################
+def spike_distance_cross_cython(double[:] spikes_a, Py_ssize_t[:] offsets_a,
+                                double[:] spikes_b, Py_ssize_t[:] offsets_b,
+                                double t_start, double t_end,
+                                int num_threads):
+    """ Computes the spike-distances between all spike trains of the set a
+    and all spike trains of the set b, see isi_distance_cross_cython.
+    """
+    cdef Py_ssize_t N_a = len(offsets_a)-1
+    cdef Py_ssize_t N_b = len(offsets_b)-1
+    cdef Py_ssize_t i, j, k
+    cdef double[:, :] distances = np.zeros((N_a, N_b))
+
+    for k in prange(N_a*N_b, nogil=True, schedule='guided',
+                    num_threads=num_threads):
+        i = k // N_b
+        j = k % N_b
+        distances[i, j] = spike_distance_c(
+            &spikes_a[offsets_a[i]], offsets_a[i+1]-offsets_a[i],
+            &spikes_b[offsets_b[j]], offsets_b[j+1]-offsets_b[j],
+            t_start, t_end)
+
+    return np.asarray(distances)
+
+
+############################################################
+# spike_sync_cross_cython
+############################################################
+def spike_sync_cross_cython(double[:] spikes_a, Py_ssize_t[:] offsets_a,
+                            double[:] spikes_b, Py_ssize_t[:] offsets_b,
+                            double t_start, double t_end, double max_tau,
+                            int num_threads):
+    """ Computes the spike synchronization values between all spike trains of
+    the set a and all spike trains of the set b, see
+    isi_distance_cross_cython. The spike trains might be empty here.
+    """
+    cdef Py_ssize_t N_a = len(offsets_a)-1
+    cdef Py_ssize_t N_b = len(offsets_b)-1
+    cdef Py_ssize_t i, j, k
+    cdef int N1, N2
+    cdef double coinc, mp
+    cdef double* p1
+    cdef double* p2
+    cdef double[:, :] sync = np.zeros((N_a, N_b))
+    # pointers to the first spikes, empty sets have no valid first element
+    cdef double* first_a = &spikes_a[0] if len(spikes_a) > 0 else NULL
+    cdef double* first_b = &spikes_b[0] if len(spikes_b) > 0 else NULL
+
+    for k in prange(N_a*N_b, nogil=True, schedule='guided',
+                    num_threads=num_threads):
+        i = k // N_b
+        j = k % N_b
+        N1 = offsets_a[i+1]-offsets_a[i]
+        N2 = offsets_b[j+1]-offsets_b[j]
+        p1 = first_a + offsets_a[i] if N1 > 0 else NULL
+        p2 = first_b + offsets_b[j] if N2 > 0 else NULL
+        coincidence_value_c(p1, N1, p2, N2, t_start, t_end, max_tau,
+                            &coinc, &mp)
+        sync[i, j] = coinc/mp
+
+    return np.asarray(sync)
+
+
+############################################################
+# isi_distance_condensed_cython
+############################################################
+def isi_distance_condensed_cython(double[:] spikes, Py_ssize_t[:] offsets,
+                                  double t_start, double t_end,
+                                  real_t[:] out, int num_threads):
+    """ Computes the isi-distances of all pairs of spike trains, see
+    isi_distance_matrix_cython, and writes them to the float or double array
+    out of length N*(N-1)/2 in the layout of scipy.spatial.distance.pdist,
+    i.e. the upper triangle row by row.
+    """
+    cdef Py_ssize_t N = len(offsets)-1
+    cdef Py_ssize_t i, j, k
+
+    for i in prange(N, nogil=True, schedule='dynamic',
+                    num_threads=num_threads):
+        # index of the pair (i, i+1)
+        k = N*i - i*(i+1)//2
+        for j in range(i+1, N):
+            out[k+j-i-1] = isi_distance_c(
+                &spikes[offsets[i]], offsets[i+1]-offsets[i],
+                &spikes[offsets[j]], offsets[j+1]-offsets[j],
+                t_start, t_end)
+
+
+############################################################
+# spike_distance_condensed_cython
+############################################################
+def spike_distance_condensed_cython(double[:] spikes, Py_ssize_t[:] offsets,
+                                    double t_start, double t_end,
+                                    real_t[:] out, int num_threads):
+    """ Computes the spike-distances of all pairs of spike trains in the
+    condensed layout, see isi_distance_condensed_cython.
+    """
+    cdef Py_ssize_t N = len(offsets)-1
+    cdef Py_ssize_t i, j, k
+
+    for i in prange(N, nogil=True, schedule='dynamic',
+                    num_threads=num_threads):
+        k = N*i - i*(i+1)//2
+        for j in range(i+1, N):
+            out[k+j-i-1] = spike_distance_c(
+                &spikes[offsets[i]], offsets[i+1]-offsets[i],
+                &spikes[offsets[j]], offsets[j+1]-offsets[j],
+                t_start, t_end)
+
+
+############################################################
+# spike_sync_condensed_cython
+############################################################
+def spike_sync_condensed_cython(double[:] spikes, Py_ssize_t[:] offsets,
+                                double t_start, double t_end, double max_tau,
+                                real_t[:] out, int num_threads):
+    """ Computes the spike synchronization values of all pairs of spike
+    trains in the condensed layout, see isi_distance_condensed_cython. The
+    spike trains might be empty here. The sweep of coincidence_sweep_cython
+    needs dense N x N accumulators, so the pairs are evaluated one by one
+    with coincidence_value_c instead.
+    """
+    cdef Py_ssize_t N = len(offsets)-1
+    cdef Py_ssize_t i, j, k
+    cdef int N1, N2
+    cdef double coinc, mp
+    cdef double* p1
+    cdef double* p2
+    cdef double* first = &spikes[0] if len(spikes) > 0 else NULL
+
+    for i in prange(N, nogil=True, schedule='dynamic',
+                    num_threads=num_threads):
+        k = N*i - i*(i+1)//2
+        N1 = offsets[i+1]-offsets[i]
+        p1 = first + offsets[i] if N1 > 0 else NULL
+        for j in range(i+1, N):
+            N2 = offsets[j+1]-offsets[j]
+            p2 = first + offsets[j] if N2 > 0 else NULL
+            coincidence_value_c(p1, N1, p2, N2, t_start, t_end, max_tau,
+                                &coinc, &mp)
+            out[k+j-i-1] = coinc/mp
+
+
+############################################################
+# bisect_left_c, bisect_right_c
+############################################################
+cdef inline int bisect_left_c(double* s, int N, double t) nogil:
+    """ Returns the number of spikes s[i] < t. """
+    cdef int lo = 0
+    cdef int hi = N
+    cdef int mid
+    while lo < hi:
+        mid = (lo+hi)/2
+        if s[mid] < t:
+            lo = mid+1
+        else:
+            hi = mid
+    return lo
+
+
+cdef inline int bisect_right_c(double* s, int N, double t) nogil:
+    """ Returns the number of spikes s[i] <= t. """
+    cdef int lo = 0
+    cdef int hi = N
+    cdef int mid
+    while lo < hi:
+        mid = (lo+hi)/2
+        if s[mid] <= t:
+            lo = mid+1
+        else:
+            hi = mid
+    return lo
+
+
+############################################################
+# isi_nu_c
+############################################################
+cdef inline double isi_nu_c(double* s, int N, int i,
+                            double t_start, double t_end) nogil:
+    """ Returns the interspike interval after the i-th spike (i=-1: before the
+    first spike) including the edge corrections of isi_distance_c.
+    """
+    if i < 0:
+        return fmax(s[0]-t_start, s[1]-s[0]) if N > 1 else s[0]-t_start
+    elif i < N-1:
+        return s[i+1]-s[i]
+    else:
+        return fmax(t_end-s[i], s[i]-s[i-1]) if N > 1 else t_end-s[i]
+
+
+############################################################
+# isi_integral_c
+############################################################
+cdef double isi_integral_c(double* s1, int N1, double* s2, int N2,
+                           double t_start, double t_end,
+                           double a, double b) nogil:
+    """ Computes the integral of the isi-profile of the spike trains s1 and s2
+    over the interval [a, b]. Only the spikes around the interval are visited,
+    which are found by binary search.
+    """
+    cdef int index1, index2
+    cdef double nu1, nu2, t_curr, t_next
+    cdef double isi_value = 0.0
+
+    # last spikes before the interval, spikes at the start time are not
+    # events of the profile (see isi_distance_c)
+    index1 = bisect_right_c(s1, N1, a)-1
+    index2 = bisect_right_c(s2, N2, a)-1
+    nu1 = isi_nu_c(s1, N1, index1, t_start, t_end)
+    nu2 = isi_nu_c(s2, N2, index2, t_start, t_end)
+
+    t_curr = a
+    while True:
+        # next event, or the end of the interval
+        t_next = b
+        if index1 < N1-1 and s1[index1+1] < t_next:
+            t_next = s1[index1+1]
+        if index2 < N2-1 and s2[index2+1] < t_next:
+            t_next = s2[index2+1]
+        if t_next > t_curr:
+            isi_value += fabs(nu1-nu2)/fmax(nu1, nu2) * (t_next-t_curr)
+        if t_next >= b:
+            break
+        if index1 < N1-1 and s1[index1+1] == t_next:
+            index1 += 1
+            nu1 = isi_nu_c(s1, N1, index1, t_start, t_end)
+        if index2 < N2-1 and s2[index2+1] == t_next:
+            index2 += 1
+            nu2 = isi_nu_c(s2, N2, index2, t_start, t_end)
+        t_curr = t_next
+
+    return isi_value
+
+
+############################################################
+# isi_distance_interval_cython
+############################################################
+def isi_distance_interval_cython(double[:] s1, double[:] s2,
+                                 double t_start, double t_end,
+                                 double[:, :] intervals):
+    """ Returns the integral of the isi-profile over the given intervals,
+    an array of shape (M, 2), without constructing the profile.
+    """
+    cdef double isi_value = 0.0
+    cdef int N1 = len(s1)
+    cdef int N2 = len(s2)
+    cdef int k
+
+    with nogil: # release the interpreter to allow multithreading
+        for k in range(intervals.shape[0]):
+            isi_value += isi_integral_c(&s1[0], N1, &s2[0], N2,
+                                        t_start, t_end,
+                                        intervals[k, 0], intervals[k, 1])
+    # end nogil
+
+    return isi_value
+
+
+############################################################
+# min_dist_c
+############################################################
+cdef inline double min_dist_c(double spike_time, double* spike_train, int N,
+                              double t_aux0, double t_aux1) nogil:
+    """ Returns the minimal distance of spike_time to the spikes of
+    spike_train and its auxiliary spikes, same as get_min_dist_cython but
+    using binary search.
+    """
+    cdef double d = fmin(fabs(spike_time-t_aux0), fabs(t_aux1-spike_time))
+    cdef int k = bisect_left_c(spike_train, N, spike_time)
+    if k < N:
+        d = fmin(d, fabs(spike_train[k]-spike_time))
+    if k > 0:
+        d = fmin(d, fabs(spike_time-spike_train[k-1]))
+    return d
+
+
+############################################################
+# spike_state_c
+############################################################
+cdef inline void spike_state_c(double* t, int N, int i, double* t_aux,
+                               double* t_other, int N_other,
+                               double* t_aux_other,
+                               double t_start, double t_end,
+                               double* state) nogil:
+    """ Computes the state of the spike train t after its i-th spike (i=-1:
+    before the first spike) as used in spike_distance_c, i.e. the previous
+    and following spike times, their distances to the other spike train and
+    the current interspike interval: state = [t_p, t_f, dt_p, dt_f, isi].
+    """
+    if i < 0:
+        state[0] = t_aux[0]
+        state[1] = t[0]
+        state[3] = min_dist_c(t[0], t_other, N_other,
+                              t_aux_other[0], t_aux_other[1])
+        state[2] = state[3]
+        state[4] = fmax(t[0]-t_start, t[1]-t[0]) if N > 1 else t[0]-t_start
+    else:
+        state[0] = t[i]
+        state[2] = min_dist_c(t[i], t_other, N_other,
+                              t_aux_other[0], t_aux_other[1])
+        if i < N-1:
+            state[1] = t[i+1]
+            state[3] = min_dist_c(t[i+1], t_other, N_other,
+                                  t_aux_other[0], t_aux_other[1])
+            state[4] = t[i+1]-t[i]
+        elif N > 1:
+            # edge correction after the last spike
+            state[1] = t_aux[1]
+            state[3] = state[2]
+            state[4] = fmax(t_end-t[i], t[i]-t[i-1])
+        else:
+            state[1] = t_end
+            state[4] = t_end-t[i]
+            if t[i] > t_start:
+                state[3] = state[2]
+            else:
+                # single spike at the start time
+                state[3] = min_dist_c(t_end, t_other, N_other,
+                                      t_aux_other[0], t_aux_other[1])
+
+
+############################################################
+# spike_value_c
+############################################################
+cdef inline double spike_value_c(double t_curr, double* state1,
+                                 double* state2) nogil:
+    """ Returns the value of the spike-profile at time t_curr for the given
+    states of the two spike trains, see spike_state_c.
+    """
+    cdef double s1, s2
+    s1 = (state1[2]*(state1[1]-t_curr) + state1[3]*(t_curr-state1[0])) / \
+         state1[4]
+    s2 = (state2[2]*(state2[1]-t_curr) + state2[3]*(t_curr-state2[0])) / \
+         state2[4]
+    return (s1*state2[4] + s2*state1[4]) / isi_avrg_cython(state1[4],
+                                                           state2[4])
+
+
+############################################################
+# spike_integral_c
+############################################################
+cdef double spike_integral_c(double* t1, int N1, double* t2, int N2,
+                             double t_start, double t_end,
+                             double a, double b) nogil:
+    """ Computes the integral of the spike-profile of the spike trains t1 and
+    t2 over the interval [a, b]. Only the spikes around the interval are
+    visited, which are found by binary search.
+    """
+    cdef int index1, index2
+    cdef double t_curr, t_next, y_start, y_end
+    cdef double spike_value = 0.0
+    cdef double t_aux1[2]
+    cdef double t_aux2[2]
+    cdef double state1[5]
+    cdef double state2[5]
+
+    # auxiliary spikes for edge correction, as in spike_distance_c
+    t_aux1[0] = fmin(t_start, 2*t1[0]-t1[1]) if N1 > 1 else t_start
+    t_aux1[1] = fmax(t_end, 2*t1[N1-1]-t1[N1-2]) if N1 > 1 else t_end
+    t_aux2[0] = fmin(t_start, 2*t2[0]-t2[1]) if N2 > 1 else t_start
+    t_aux2[1] = fmax(t_end, 2*t2[N2-1]-t2[N2-2]) if N2 > 1 else t_end
+
+    # last spikes before the interval
+    index1 = bisect_right_c(t1, N1, a)-1
+    index2 = bisect_right_c(t2, N2, a)-1
+    spike_state_c(t1, N1, index1, t_aux1, t2, N2, t_aux2, t_start, t_end,
+                  state1)
+    spike_state_c(t2, N2, index2, t_aux2, t1, N1, t_aux1, t_start, t_end,
+                  state2)
+
+    t_curr = a
+    y_start = spike_value_c(t_curr, state1, state2)
+    while True:
+        # next event, or the end of the interval
+        t_next = b
+        if index1 < N1-1 and t1[index1+1] < t_next:
+            t_next = t1[index1+1]
+        if index2 < N2-1 and t2[index2+1] < t_next:
+            t_next = t2[index2+1]
+        y_end = spike_value_c(t_next, state1, state2)
+        if t_next > t_curr:
+            spike_value += 0.5*(y_start + y_end) * (t_next-t_curr)
+        if t_next >= b:
+            break
+        if index1 < N1-1 and t1[index1+1] == t_next:
+            index1 += 1
+            spike_state_c(t1, N1, index1, t_aux1, t2, N2, t_aux2,
+                          t_start, t_end, state1)
+        if index2 < N2-1 and t2[index2+1] == t_next:
+            index2 += 1
+            spike_state_c(t2, N2, index2, t_aux2, t1, N1, t_aux1,
+                          t_start, t_end, state2)
+        t_curr = t_next
+        y_start = spike_value_c(t_curr, state1, state2)
+
+    return spike_value
+
+
+############################################################
+# spike_distance_interval_cython
+############################################################
+def spike_distance_interval_cython(double[:] t1, double[:] t2,
+                                   double t_start, double t_end,
+                                   double[:, :] intervals):
+    """ Returns the integral of the spike-profile over the given intervals,
+    an array of shape (M, 2), without constructing the profile.
+    """
+    cdef double spike_value = 0.0
+    cdef int N1 = len(t1)
+    cdef int N2 = len(t2)
+    cdef int k
+
+    # we can assume at least one spikes per spike train
+    assert N1 > 0
+    assert N2 > 0
+
+    with nogil: # release the interpreter to allow multithreading
+        for k in range(intervals.shape[0]):
+            spike_value += spike_integral_c(&t1[0], N1, &t2[0], N2,
+                                            t_start, t_end,
+                                            intervals[k, 0], intervals[k, 1])
+    # end nogil
+
+    return spike_value
+
+
+############################################################
+# is_coincident_c
+############################################################
+cdef inline bint is_coincident_c(double* spikes1, int N1,
+                                 double* spikes2, int N2, int i,
+                                 double interval, double max_tau) nogil:
+    """ Checks whether the i-th spike of spikes1 is marked as coincident in
+    coincidence_value_c, i.e. whether it coincides with the previous or the
+    next spike of spikes2.
+    """
+    cdef double t = spikes1[i]
+    # number of spikes in spikes2 before t
+    cdef int k = bisect_left_c(spikes2, N2, t)
+    if k < N2 and spikes2[k] == t:
+        # equal spike times are always coincident
+        return True
+    # previous spike in spikes2
+    if k > 0 and t-spikes2[k-1] < get_tau(spikes1, N1-1, spikes2, N2-1,
+                                          i, k-1, interval, max_tau):
+        return True
+    # next spike in spikes2, if no other spike of spikes1 lies in between
+    if k < N2 and (i == N1-1 or spikes1[i+1] > spikes2[k]) and \
+       spikes2[k]-t < get_tau(spikes1, N1-1, spikes2, N2-1,
+                              i, k, interval, max_tau):
+        return True
+    return False
+
+
+############################################################
+# is_coincident_c2
+############################################################
+cdef inline bint is_coincident_c2(double* spikes1, int N1,
+                                  double* spikes2, int N2, int j,
+                                  double interval, double max_tau) nogil:
+    """ Checks whether the j-th spike of spikes2 is marked as coincident in
+    coincidence_value_c, see is_coincident_c.
+    """
+    cdef double t = spikes2[j]
+    # number of spikes in spikes1 before t
+    cdef int k = bisect_left_c(spikes1, N1, t)
+    if k < N1 and spikes1[k] == t:
+        return True
+    if k > 0 and t-spikes1[k-1] < get_tau(spikes1, N1-1, spikes2, N2-1,
+                                          k-1, j, interval, max_tau):
+        return True
+    if k < N1 and (j == N2-1 or spikes2[j+1] > spikes1[k]) and \
+       spikes1[k]-t < get_tau(spikes1, N1-1, spikes2, N2-1,
+                              k, j, interval, max_tau):
+        return True
+    return False
+
+
+############################################################
+# coincidence_interval_c
+############################################################
+cdef void coincidence_interval_c(double* spikes1, int N1,
+                                 double* spikes2, int N2,
+                                 double t_start, double t_end, double max_tau,
+                                 double a, double b,
+                                 double* coinc_out, double* mp_out) nogil:
+    """ Computes the summed coincidences and multiplicity of the spikes of
+    spikes1 and spikes2 that lie within the interval (a, b). The spike trains
+    might be empty.
+    """
+    cdef double interval = t_end - t_start
+    cdef int i, start, end
+
+    # spikes of the first spike train inside the interval
+    start = bisect_right_c(spikes1, N1, a)
+    end = bisect_left_c(spikes1, N1, b)
+    for i in range(start, end):
+        mp_out[0] += 1
+        if is_coincident_c(spikes1, N1, spikes2, N2, i, interval, max_tau):
+            coinc_out[0] += 1
+    # spikes of the second spike train inside the interval, the order of the
+    # spike trains has to be kept for get_tau
+    start = bisect_right_c(spikes2, N2, a)
+    end = bisect_left_c(spikes2, N2, b)
+    for i in range(start, end):
+        mp_out[0] += 1
+        if is_coincident_c2(spikes1, N1, spikes2, N2, i, interval, max_tau):
+            coinc_out[0] += 1
+
+
+############################################################
+# coincidence_interval_cython
+############################################################
+def coincidence_interval_cython(double[:] spikes1, double[:] spikes2,
+                                double t_start, double t_end, double max_tau,
+                                double[:, :] intervals):
+    """ Returns the summed coincidences and multiplicity of the spikes within
+    the given intervals, an array of shape (M, 2), without constructing the
+    profile.
+    """
+    cdef int N1 = len(spikes1)
+    cdef int N2 = len(spikes2)
+    cdef double coinc = 0.0
+    cdef double mp = 0.0
+    cdef int k
+    # empty spike trains are allowed here, so don't index into them
+    cdef double* p1 = &spikes1[0] if N1 > 0 else NULL
+    cdef double* p2 = &spikes2[0] if N2 > 0 else NULL
+
+    with nogil: # release the interpreter to allow multithreading
+        for k in range(intervals.shape[0]):
+            coincidence_interval_c(p1, N1, p2, N2, t_start, t_end, max_tau,
+                                   intervals[k, 0], intervals[k, 1],
+                                   &coinc, &mp)
+    # end nogil
+
     return coinc, mp
@@ -133,6 +133,107 @@ def isi_profile_cython(double[:] s1, double[:] s2,
     return spike_events[:index+1], isi_values[:index]
 
 
+############################################################
+# isi_profile_multi_cython
+############################################################
+def isi_profile_multi_cython(double[:] spikes, Py_ssize_t[:] offsets,
+                             double t_start, double t_end):
+
+    cdef int N = len(offsets)-1
+    cdef int S = len(spikes)
+    cdef double M = 0.5*N*(N-1)
+    cdef double[:] spike_events
+    cdef double[:] isi_values
+    cdef double[:] nu = np.empty(N)
+    cdef Py_ssize_t[:] current = np.empty(N, dtype=np.intp)
+    cdef Py_ssize_t[:] order
+    cdef Py_ssize_t[:] trains
+    cdef Py_ssize_t i, k, n, j, start, stop
+    cdef int index, updates
+    cdef double nu_new, delta, total
+
+    # all spikes in temporal order together with their spike train
+    order_np = np.argsort(spikes, kind='mergesort').astype(np.intp)
+    order = order_np
+    trains = np.repeat(np.arange(N, dtype=np.intp),
+                       np.diff(offsets))[order_np]
+
+    spike_events = np.empty(S+2)
+    isi_values = np.empty(S+1)
+
+    with nogil: # release the interpreter to allow multithreading
+        # first interspike intervals - check if a spike exists at the start
+        for n in range(N):
+            start = offsets[n]
+            stop = offsets[n+1]
+            if spikes[start] > t_start:
+                # edge correction
+                nu[n] = fmax(spikes[start]-t_start,
+                             spikes[start+1]-spikes[start]) \
+                        if stop-start > 1 else spikes[start]-t_start
+                current[n] = start-1
+            else:
+                nu[n] = spikes[start+1]-spikes[start] if stop-start > 1 \
+                        else t_end-spikes[start]
+                current[n] = start
+
+        total = 0.0
+        for n in range(N):
+            for j in range(n+1, N):
+                total += fabs(nu[n]-nu[j])/fmax(nu[n], nu[j])
+        spike_events[0] = t_start
+        isi_values[0] = total/M
+        index = 1
+        updates = 0
+
+        for i in range(S):
+            k = order[i]
+            n = trains[i]
+            if k <= current[n]:
+                # spike at the start time, already considered above
+                continue
+            current[n] = k
+            if k < offsets[n+1]-1:
+                nu_new = spikes[k+1]-spikes[k]
+            elif offsets[n+1]-offsets[n] > 1:
+                # edge correction
+                nu_new = fmax(t_end-spikes[k], spikes[k]-spikes[k-1])
+            else:
+                nu_new = t_end-spikes[k]
+            # only the pairs with spike train n change their isi-distance
+            delta = 0.0
+            for j in range(N):
+                if j != n:
+                    delta += fabs(nu_new-nu[j])/fmax(nu_new, nu[j]) - \
+                             fabs(nu[n]-nu[j])/fmax(nu[n], nu[j])
+            total += delta
+            nu[n] = nu_new
+            updates += 1
+            if i < S-1 and spikes[order[i+1]] == spikes[k]:
+                # further spikes at the same time
+                continue
+            if 2*updates >= N:
+                # recompute the sum from time to time to avoid the
+                # accumulation of round-off errors
+                total = 0.0
+                for n in range(N):
+                    for j in range(n+1, N):
+                        total += fabs(nu[n]-nu[j])/fmax(nu[n], nu[j])
+                updates = 0
+            spike_events[index] = spikes[k]
+            isi_values[index] = total/M
+            index += 1
+
+        # the last event is the interval end
+        if spike_events[index-1] == t_end:
+            index -= 1
+        else:
+            spike_events[index] = t_end
+    # end nogil
+
+    return spike_events[:index+1], isi_values[:index]
+
+
 ############################################################
 # get_min_dist_cython
 ############################################################
@@ -0,0 +1,1051 @@
+""" numba_backend.py
+
+Collection of numba functions that can be used instead of the cython
+implementation. The functions are translations of the cython code, they are
+compiled on their first use and the compiled code is cached on disk.
+
+Numba is an optional dependency: importing this module raises an ImportError
+if numba is not installed, in which case the backend is not available.
+
+Copyright 2015, Mario Mulansky <mario.mulansky@gmx.net>
+
+Distributed under the BSD License
+
+"""
+
+import numpy as np
+import numba
+from numba import njit, prange
+
+
+############################################################
+# isi_profile_numba
+############################################################
+@njit(cache=True, error_model='numpy')
+def isi_profile_numba(s1, s2, t_start, t_end):
+    N1 = len(s1)
+    N2 = len(s2)
+
+    spike_events = np.empty(N1+N2+2)
+    # the values have one entry less as they are defined at the intervals
+    isi_values = np.empty(N1+N2+1)
+
+    # first x-value of the profile
+    spike_events[0] = t_start
+
+    # first interspike interval - check if a spike exists at the start time
+    if s1[0] > t_start:
+        # edge correction
+        nu1 = max(s1[0]-t_start, s1[1]-s1[0]) if N1 > 1 else s1[0]-t_start
+        index1 = -1
+    else:
+        nu1 = s1[1]-s1[0] if N1 > 1 else t_end-s1[0]
+        index1 = 0
+
+    if s2[0] > t_start:
+        # edge correction
+        nu2 = max(s2[0]-t_start, s2[1]-s2[0]) if N2 > 1 else s2[0]-t_start
+        index2 = -1
+    else:
+        nu2 = s2[1]-s2[0] if N2 > 1 else t_end-s2[0]
+        index2 = 0
+
+    isi_values[0] = abs(nu1-nu2)/max(nu1, nu2)
+    index = 1
+
+    while index1+index2 < N1+N2-2:
+        # check which spike is next, only if there are spikes left in 1
+        # next spike in 1 is earlier, or there are no spikes left in 2
+        if (index1 < N1-1) and ((index2 == N2-1) or
+                                (s1[index1+1] < s2[index2+1])):
+            index1 += 1
+            spike_events[index] = s1[index1]
+            if index1 < N1-1:
+                nu1 = s1[index1+1]-s1[index1]
+            else:
+                # edge correction
+                nu1 = max(t_end-s1[index1], nu1) if N1 > 1 \
+                    else t_end-s1[index1]
+        elif (index2 < N2-1) and ((index1 == N1-1) or
+                                  (s1[index1+1] > s2[index2+1])):
+            index2 += 1
+            spike_events[index] = s2[index2]
+            if index2 < N2-1:
+                nu2 = s2[index2+1]-s2[index2]
+            else:
+                # edge correction
+                nu2 = max(t_end-s2[index2], nu2) if N2 > 1 \
+                    else t_end-s2[index2]
+        else:  # s1[index1+1] == s2[index2+1]
+            index1 += 1
+            index2 += 1
+            spike_events[index] = s1[index1]
+            if index1 < N1-1:
+                nu1 = s1[index1+1]-s1[index1]
+            else:
+                # edge correction
+                nu1 = max(t_end-s1[index1], nu1) if N1 > 1 \
+                    else t_end-s1[index1]
+            if index2 < N2-1:
+                nu2 = s2[index2+1]-s2[index2]
+            else:
+                # edge correction
+                nu2 = max(t_end-s2[index2], nu2) if N2 > 1 \
+                    else t_end-s2[index2]
+        # compute the corresponding isi-distance
+        isi_values[index] = abs(nu1 - nu2) / max(nu1, nu2)
+        index += 1
+    # the last event is the interval end
+    if spike_events[index-1] == t_end:
+        index -= 1
+    else:
+        spike_events[index] = t_end
+
+    return spike_events[:index+1], isi_values[:index]
+
+
+############################################################
+# isi_profile_multi_numba
+############################################################
+@njit(cache=True, error_model='numpy')
+def _isi_sum(nu):
+    """ sum of the isi-distances of all pairs """
+    total = 0.0
+    for n in range(len(nu)):
+        for j in range(n+1, len(nu)):
+            total += abs(nu[n]-nu[j])/max(nu[n], nu[j])
+    return total
+
+
+@njit(cache=True, error_model='numpy')
+def _isi_profile_multi(spikes, offsets, order, trains, t_start, t_end):
+    N = len(offsets)-1
+    S = len(spikes)
+    M = 0.5*N*(N-1)
+    nu = np.empty(N)
+    current = np.empty(N, dtype=np.intp)
+    spike_events = np.empty(S+2)
+    isi_values = np.empty(S+1)
+
+    # first interspike intervals - check if a spike exists at the start
+    for n in range(N):
+        start = offsets[n]
+        stop = offsets[n+1]
+        if spikes[start] > t_start:
+            # edge correction
+            nu[n] = max(spikes[start]-t_start,
+                        spikes[start+1]-spikes[start]) \
+                if stop-start > 1 else spikes[start]-t_start
+            current[n] = start-1
+        else:
+            nu[n] = spikes[start+1]-spikes[start] if stop-start > 1 \
+                else t_end-spikes[start]
+            current[n] = start
+
+    total = _isi_sum(nu)
+    spike_events[0] = t_start
+    isi_values[0] = total/M
+    index = 1
+    updates = 0
+
+    for i in range(S):
+        k = order[i]
+        n = trains[i]
+        if k <= current[n]:
+            # spike at the start time, already considered above
+            continue
+        current[n] = k
+        if k < offsets[n+1]-1:
+            nu_new = spikes[k+1]-spikes[k]
+        elif offsets[n+1]-offsets[n] > 1:
+            # edge correction
+            nu_new = max(t_end-spikes[k], spikes[k]-spikes[k-1])
+        else:
+            nu_new = t_end-spikes[k]
+        # only the pairs with spike train n change their isi-distance
+        delta = 0.0
+        for j in range(N):
+            if j != n:
+                delta += abs(nu_new-nu[j])/max(nu_new, nu[j]) - \
+                    abs(nu[n]-nu[j])/max(nu[n], nu[j])
+        total += delta
+        nu[n] = nu_new
+        updates += 1
+        if i < S-1 and spikes[order[i+1]] == spikes[k]:
+            # further spikes at the same time
+            continue
+        if 2*updates >= N:
+            # recompute the sum from time to time to avoid the accumulation
+            # of round-off errors
+            total = _isi_sum(nu)
+            updates = 0
+        spike_events[index] = spikes[k]
+        isi_values[index] = total/M
+        index += 1
+
+    # the last event is the interval end
+    if spike_events[index-1] == t_end:
+        index -= 1
+    else:
+        spike_events[index] = t_end
+    return spike_events[:index+1], isi_values[:index]
+
+
+def isi_profile_multi_numba(spikes, offsets, t_start, t_end):
+    # all spikes in temporal order together with their spike train
+    order = np.argsort(spikes, kind='mergesort').astype(np.intp)
+    trains = np.repeat(np.arange(len(offsets)-1, dtype=np.intp),
+                       np.diff(offsets))[order]
+    return _isi_profile_multi(spikes, np.asarray(offsets, dtype=np.intp),
+                              order, trains, t_start, t_end)
+
+
+############################################################
+# get_min_dist
+############################################################
+@njit(cache=True, error_model='numpy')
+def _get_min_dist(spike_time, spike_train, N, start_index, t_start, t_end):
+    """ Returns the minimal distance |spike_time - spike_train[i]|
+    with i>=start_index.
+    """
+    # start with the distance to the start time
+    d = abs(spike_time - t_start)
+    if start_index < 0:
+        start_index = 0
+    while start_index < N:
+        d_temp = abs(spike_time - spike_train[start_index])
+        if d_temp > d:
+            return d
+        else:
+            d = d_temp
+        start_index += 1
+
+    # finally, check the distance to end time
+    d_temp = abs(t_end - spike_time)
+    if d_temp > d:
+        return d
+    else:
+        return d_temp
+
+
+@njit(cache=True, error_model='numpy')
+def _isi_avrg(isi1, isi2):
+    return 0.5*(isi1+isi2)*(isi1+isi2)
+
+
+############################################################
+# spike_profile_numba
+############################################################
+@njit(cache=True, error_model='numpy')
+def spike_profile_numba(t1, t2, t_start, t_end):
+    N1 = len(t1)
+    N2 = len(t2)
+
+    spike_events = np.empty(N1+N2+2)
+    y_starts = np.empty(len(spike_events)-1)
+    y_ends = np.empty(len(spike_events)-1)
+
+    spike_events[0] = t_start
+    # auxiliary spikes for edge correction - consistent with first/last ISI
+    t_aux10 = min(t_start, 2*t1[0]-t1[1]) if N1 > 1 else t_start
+    t_aux11 = max(t_end, 2*t1[N1-1]-t1[N1-2]) if N1 > 1 else t_end
+    t_aux20 = min(t_start, 2*t2[0]-t2[1]) if N2 > 1 else t_start
+    t_aux21 = max(t_end, 2*t2[N2-1]-t2[N2-2]) if N2 > 1 else t_end
+    t_p1 = t_start if (t1[0] == t_start) else t_aux10
+    t_p2 = t_start if (t2[0] == t_start) else t_aux20
+    if t1[0] > t_start:
+        t_f1 = t1[0]
+        dt_f1 = _get_min_dist(t_f1, t2, N2, 0, t_aux20, t_aux21)
+        isi1 = max(t_f1-t_start, t1[1]-t1[0]) if N1 > 1 else t_f1-t_start
+        dt_p1 = dt_f1
+        s1 = dt_p1
+        index1 = -1
+    else:
+        t_f1 = t1[1] if N1 > 1 else t_end
+        dt_f1 = _get_min_dist(t_f1, t2, N2, 0, t_aux20, t_aux21)
+        dt_p1 = _get_min_dist(t_p1, t2, N2, 0, t_aux20, t_aux21)
+        isi1 = t_f1-t1[0]
+        s1 = dt_p1
+        index1 = 0
+    if t2[0] > t_start:
+        t_f2 = t2[0]
+        dt_f2 = _get_min_dist(t_f2, t1, N1, 0, t_aux10, t_aux11)
+        dt_p2 = dt_f2
+        isi2 = max(t_f2-t_start, t2[1]-t2[0]) if N2 > 1 else t_f2-t_start
+        s2 = dt_p2
+        index2 = -1
+    else:
+        t_f2 = t2[1] if N2 > 1 else t_end
+        dt_f2 = _get_min_dist(t_f2, t1, N1, 0, t_aux10, t_aux11)
+        dt_p2 = _get_min_dist(t_p2, t1, N1, 0, t_aux10, t_aux11)
+        isi2 = t_f2-t2[0]
+        s2 = dt_p2
+        index2 = 0
+
+    y_starts[0] = (s1*isi2 + s2*isi1) / _isi_avrg(isi1, isi2)
+    index = 1
+
+    while index1+index2 < N1+N2-2:
+        if (index1 < N1-1) and (t_f1 < t_f2 or index2 == N2-1):
+            index1 += 1
+            # first calculate the previous interval end value
+            s1 = dt_f1*(t_f1-t_p1) / isi1
+            # the previous time now was the following time before:
+            dt_p1 = dt_f1
+            t_p1 = t_f1    # t_p1 contains the current time point
+            # get the next time
+            if index1 < N1-1:
+                t_f1 = t1[index1+1]
+            else:
+                t_f1 = t_aux11
+            spike_events[index] = t_p1
+            s2 = (dt_p2*(t_f2-t_p1) + dt_f2*(t_p1-t_p2)) / isi2
+            y_ends[index-1] = (s1*isi2 + s2*isi1)/_isi_avrg(isi1, isi2)
+            # now the next interval start value
+            if index1 < N1-1:
+                dt_f1 = _get_min_dist(t_f1, t2, N2, index2, t_aux20, t_aux21)
+                isi1 = t_f1-t_p1
+                s1 = dt_p1
+            else:
+                dt_f1 = dt_p1
+                isi1 = max(t_end-t1[N1-1], t1[N1-1]-t1[N1-2]) if N1 > 1 \
+                    else t_end-t1[N1-1]
+                s1 = dt_p1
+            y_starts[index] = (s1*isi2 + s2*isi1)/_isi_avrg(isi1, isi2)
+        elif (index2 < N2-1) and (t_f1 > t_f2 or index1 == N1-1):
+            index2 += 1
+            # first calculate the previous interval end value
+            s2 = dt_f2*(t_f2-t_p2) / isi2
+            # the previous time now was the following time before:
+            dt_p2 = dt_f2
+            t_p2 = t_f2    # t_p2 contains the current time point
+            # get the next time
+            if index2 < N2-1:
+                t_f2 = t2[index2+1]
+            else:
+                t_f2 = t_aux21
+            spike_events[index] = t_p2
+            s1 = (dt_p1*(t_f1-t_p2) + dt_f1*(t_p2-t_p1)) / isi1
+            y_ends[index-1] = (s1*isi2 + s2*isi1) / _isi_avrg(isi1, isi2)
+            # now the next interval start value
+            if index2 < N2-1:
+                dt_f2 = _get_min_dist(t_f2, t1, N1, index1, t_aux10, t_aux11)
+                isi2 = t_f2-t_p2
+                s2 = dt_p2
+            else:
+                dt_f2 = dt_p2
+                isi2 = max(t_end-t2[N2-1], t2[N2-1]-t2[N2-2]) if N2 > 1 \
+                    else t_end-t2[N2-1]
+                s2 = dt_p2
+            y_starts[index] = (s1*isi2 + s2*isi1)/_isi_avrg(isi1, isi2)
+        else:  # t_f1 == t_f2 - generate only one event
+            index1 += 1
+            index2 += 1
+            t_p1 = t_f1
+            t_p2 = t_f2
+            dt_p1 = 0.0
+            dt_p2 = 0.0
+            spike_events[index] = t_f1
+            y_ends[index-1] = 0.0
+            y_starts[index] = 0.0
+            if index1 < N1-1:
+                t_f1 = t1[index1+1]
+                dt_f1 = _get_min_dist(t_f1, t2, N2, index2, t_aux20, t_aux21)
+                isi1 = t_f1 - t_p1
+            else:
+                t_f1 = t_aux11
+                dt_f1 = dt_p1
+                isi1 = max(t_end-t1[N1-1], t1[N1-1]-t1[N1-2]) if N1 > 1 \
+                    else t_end-t1[N1-1]
+            if index2 < N2-1:
+                t_f2 = t2[index2+1]
+                dt_f2 = _get_min_dist(t_f2, t1, N1, index1, t_aux10, t_aux11)
+                isi2 = t_f2 - t_p2
+            else:
+                t_f2 = t_aux21
+                dt_f2 = dt_p2
+                isi2 = max(t_end-t2[N2-1], t2[N2-1]-t2[N2-2]) if N2 > 1 \
+                    else t_end-t2[N2-1]
+        index += 1
+    # the last event is the interval end
+    if spike_events[index-1] == t_end:
+        index -= 1
+    else:
+        spike_events[index] = t_end
+        s1 = dt_f1
+        s2 = dt_f2
+        y_ends[index-1] = (s1*isi2 + s2*isi1) / _isi_avrg(isi1, isi2)
+
+    return spike_events[:index+1], y_starts[:index], y_ends[:index]
+
+
+############################################################
+# get_tau
+############################################################
+@njit(cache=True, error_model='numpy')
+def _get_tau(spikes1, N1, spikes2, N2, i, j, interval, max_tau):
+    m = interval   # use interval length as initial tau
+    # N1, N2 are the index of the last spike, i.e. len(spikes)-1
+    if i < N1 and i > -1:
+        m = min(m, spikes1[i+1]-spikes1[i])
+    if j < N2 and j > -1:
+        m = min(m, spikes2[j+1]-spikes2[j])
+    if i > 0:
+        m = min(m, spikes1[i]-spikes1[i-1])
+    if j > 0:
+        m = min(m, spikes2[j]-spikes2[j-1])
+    m *= 0.5
+    if max_tau > 0.0:
+        m = min(m, max_tau)
+    return m
+
+
+############################################################
+# coincidence_profile_numba
+############################################################
+@njit(cache=True, error_model='numpy')
+def coincidence_profile_numba(spikes1, spikes2, t_start, t_end, max_tau):
+    N1 = len(spikes1)
+    N2 = len(spikes2)
+    i = -1
+    j = -1
+    n = 0
+    st = np.zeros(N1 + N2 + 2)  # spike times
+    c = np.zeros(N1 + N2 + 2)   # coincidences
+    mp = np.ones(N1 + N2 + 2)   # multiplicity
+    interval = t_end - t_start
+    while i + j < N1 + N2 - 2:
+        if (i < N1-1) and (j == N2-1 or spikes1[i+1] < spikes2[j+1]):
+            i += 1
+            n += 1
+            tau = _get_tau(spikes1, N1-1, spikes2, N2-1, i, j, interval,
+                           max_tau)
+            st[n] = spikes1[i]
+            if j > -1 and spikes1[i]-spikes2[j] < tau:
+                # coincidence between the current spike and the previous spike
+                # both get marked with 1
+                c[n] = 1
+                c[n-1] = 1
+        elif (j < N2-1) and (i == N1-1 or spikes1[i+1] > spikes2[j+1]):
+            j += 1
+            n += 1
+            tau = _get_tau(spikes1, N1-1, spikes2, N2-1, i, j, interval,
+                           max_tau)
+            st[n] = spikes2[j]
+            if i > -1 and spikes2[j]-spikes1[i] < tau:
+                # coincidence between the current spike and the previous spike
+                # both get marked with 1
+                c[n] = 1
+                c[n-1] = 1
+        else:   # spikes1[i+1] = spikes2[j+1]
+            # advance in both spike trains
+            j += 1
+            i += 1
+            n += 1
+            # add only one event, but with coincidence 2 and multiplicity 2
+            st[n] = spikes1[i]
+            c[n] = 2
+            mp[n] = 2
+
+    # only use the data added above
+    L = n+2
+    st[0] = t_start
+    st[L-1] = t_end
+    if N1 + N2 > 0:
+        c[0] = c[1]
+        c[L-1] = c[L-2]
+        mp[0] = mp[1]
+        mp[L-1] = mp[L-2]
+    else:
+        c[0] = 1
+        c[1] = 1
+
+    return st[:L], c[:L], mp[:L]
+
+
+############################################################
+# isi_distance_numba
+############################################################
+@njit(cache=True, error_model='numpy')
+def isi_distance_numba(s1, s2, t_start, t_end):
+    N1 = len(s1)
+    N2 = len(s2)
+    isi_value = 0.0
+
+    # first interspike interval - check if a spike exists at the start time
+    if s1[0] > t_start:
+        nu1 = max(s1[0]-t_start, s1[1]-s1[0]) if N1 > 1 else s1[0]-t_start
+        index1 = -1
+    else:
+        nu1 = s1[1]-s1[0] if N1 > 1 else t_end-s1[0]
+        index1 = 0
+    if s2[0] > t_start:
+        nu2 = max(s2[0]-t_start, s2[1]-s2[0]) if N2 > 1 else s2[0]-t_start
+        index2 = -1
+    else:
+        nu2 = s2[1]-s2[0] if N2 > 1 else t_end-s2[0]
+        index2 = 0
+
+    last_t = t_start
+    curr_t = t_start
+    curr_isi = abs(nu1-nu2)/max(nu1, nu2)
+
+    while index1+index2 < N1+N2-2:
+        if (index1 < N1-1) and ((index2 == N2-1) or
+                                (s1[index1+1] < s2[index2+1])):
+            index1 += 1
+            curr_t = s1[index1]
+            if index1 < N1-1:
+                nu1 = s1[index1+1]-s1[index1]
+            else:
+                nu1 = max(t_end-s1[index1], nu1) if N1 > 1 \
+                    else t_end-s1[index1]
+        elif (index2 < N2-1) and ((index1 == N1-1) or
+                                  (s1[index1+1] > s2[index2+1])):
+            index2 += 1
+            curr_t = s2[index2]
+            if index2 < N2-1:
+                nu2 = s2[index2+1]-s2[index2]
+            else:
+                nu2 = max(t_end-s2[index2], nu2) if N2 > 1 \
+                    else t_end-s2[index2]
+        else:  # s1[index1+1] == s2[index2+1]
+            index1 += 1
+            index2 += 1
+            curr_t = s1[index1]
+            if index1 < N1-1:
+                nu1 = s1[index1+1]-s1[index1]
+            else:
+                nu1 = max(t_end-s1[index1], nu1) if N1 > 1 \
+                    else t_end-s1[index1]
+            if index2 < N2-1:
+                nu2 = s2[index2+1]-s2[index2]
+            else:
+                nu2 = max(t_end-s2[index2], nu2) if N2 > 1 \
+                    else t_end-s2[index2]
+        # compute the corresponding isi-distance
+        # zero length segments, e.g. a spike at t_end, do not contribute
+        if curr_t > last_t:
+            isi_value += curr_isi * (curr_t - last_t)
+        curr_isi = abs(nu1 - nu2) / max(nu1, nu2)
+        last_t = curr_t
+
+    if t_end > last_t:
+        isi_value += curr_isi * (t_end - last_t)
+    return isi_value / (t_end-t_start)
+
+
+############################################################
+# spike_distance_numba
+############################################################
+@njit(cache=True, error_model='numpy')
+def spike_distance_numba(t1, t2, t_start, t_end):
+    # the spike-distance is the integral of the piece-wise linear profile
+    x, y_starts, y_ends = spike_profile_numba(t1, t2, t_start, t_end)
+    spike_value = 0.0
+    for i in range(len(y_starts)):
+        if x[i+1] > x[i]:
+            spike_value += 0.5*(y_starts[i] + y_ends[i]) * (x[i+1] - x[i])
+    return spike_value / (t_end-t_start)
+
+
+############################################################
+# coincidence_value_numba
+############################################################
+@njit(cache=True, error_model='numpy')
+def coincidence_value_numba(spikes1, spikes2, t_start, t_end, max_tau):
+    N1 = len(spikes1)
+    N2 = len(spikes2)
+    i = -1
+    j = -1
+    coinc = 0.0
+    mp = 0.0
+    interval = t_end - t_start
+    while i + j < N1 + N2 - 2:
+        if (i < N1-1) and (j == N2-1 or spikes1[i+1] < spikes2[j+1]):
+            i += 1
+            mp += 1
+            tau = _get_tau(spikes1, N1-1, spikes2, N2-1, i, j, interval,
+                           max_tau)
+            if j > -1 and spikes1[i]-spikes2[j] < tau:
+                # coincidence between the current spike and the previous spike
+                coinc += 2
+        elif (j < N2-1) and (i == N1-1 or spikes1[i+1] > spikes2[j+1]):
+            j += 1
+            mp += 1
+            tau = _get_tau(spikes1, N1-1, spikes2, N2-1, i, j, interval,
+                           max_tau)
+            if i > -1 and spikes2[j]-spikes1[i] < tau:
+                # coincidence between the current spike and the previous spike
+                coinc += 2
+        else:   # spikes1[i+1] = spikes2[j+1]
+            # advance in both spike trains
+            j += 1
+            i += 1
+            # add only one event, but with coincidence 2 and multiplicity 2
+            mp += 2
+            coinc += 2
+
+    if coinc == 0 and mp == 0:
+        # empty spike trains -> spike sync = 1 by definition
+        coinc = 1.0
+        mp = 1.0
+    return coinc, mp
+
+
+############################################################
+# distance matrices
+############################################################
+@njit(cache=True, parallel=True, error_model='numpy')
+def _isi_distance_matrix(spikes, offsets, t_start, t_end):
+    N = len(offsets)-1
+    distances = np.zeros((N, N))
+    for i in prange(N):
+        for j in range(i+1, N):
+            d = isi_distance_numba(spikes[offsets[i]:offsets[i+1]],
+                                   spikes[offsets[j]:offsets[j+1]],
+                                   t_start, t_end)
+            distances[i, j] = d
+            distances[j, i] = d
+    return distances
+
+
+@njit(cache=True, parallel=True, error_model='numpy')
+def _spike_distance_matrix(spikes, offsets, t_start, t_end):
+    N = len(offsets)-1
+    distances = np.zeros((N, N))
+    for i in prange(N):
+        for j in range(i+1, N):
+            d = spike_distance_numba(spikes[offsets[i]:offsets[i+1]],
+                                     spikes[offsets[j]:offsets[j+1]],
+                                     t_start, t_end)
+            distances[i, j] = d
+            distances[j, i] = d
+    return distances
+
+
+@njit(cache=True, parallel=True, error_model='numpy')
+def _isi_distance_condensed(spikes, offsets, t_start, t_end, out):
+    N = len(offsets)-1
+    for i in prange(N):
+        k = N*i - i*(i+1)//2
+        for j in range(i+1, N):
+            out[k+j-i-1] = isi_distance_numba(spikes[offsets[i]:offsets[i+1]],
+                                              spikes[offsets[j]:offsets[j+1]],
+                                              t_start, t_end)
+
+
+@njit(cache=True, parallel=True, error_model='numpy')
+def _spike_distance_condensed(spikes, offsets, t_start, t_end, out):
+    N = len(offsets)-1
+    for i in prange(N):
+        k = N*i - i*(i+1)//2
+        for j in range(i+1, N):
+            out[k+j-i-1] = spike_distance_numba(
+                spikes[offsets[i]:offsets[i+1]],
+                spikes[offsets[j]:offsets[j+1]], t_start, t_end)
+
+
+@njit(cache=True, parallel=True, error_model='numpy')
+def _spike_sync_condensed(spikes, offsets, t_start, t_end, max_tau, out):
+    N = len(offsets)-1
+    for i in prange(N):
+        k = N*i - i*(i+1)//2
+        for j in range(i+1, N):
+            coinc, mp = coincidence_value_numba(
+                spikes[offsets[i]:offsets[i+1]],
+                spikes[offsets[j]:offsets[j+1]], t_start, t_end, max_tau)
+            out[k+j-i-1] = coinc/mp
+
+
+@njit(cache=True, parallel=True, error_model='numpy')
+def _isi_distance_cross(spikes_a, offsets_a, spikes_b, offsets_b, t_start,
+                        t_end):
+    N_a = len(offsets_a)-1
+    N_b = len(offsets_b)-1
+    distances = np.zeros((N_a, N_b))
+    for k in prange(N_a*N_b):
+        i = k // N_b
+        j = k % N_b
+        distances[i, j] = isi_distance_numba(
+            spikes_a[offsets_a[i]:offsets_a[i+1]],
+            spikes_b[offsets_b[j]:offsets_b[j+1]], t_start, t_end)
+    return distances
+
+
+@njit(cache=True, parallel=True, error_model='numpy')
+def _spike_distance_cross(spikes_a, offsets_a, spikes_b, offsets_b, t_start,
+                          t_end):
+    N_a = len(offsets_a)-1
+    N_b = len(offsets_b)-1
+    distances = np.zeros((N_a, N_b))
+    for k in prange(N_a*N_b):
+        i = k // N_b
+        j = k % N_b
+        distances[i, j] = spike_distance_numba(
+            spikes_a[offsets_a[i]:offsets_a[i+1]],
+            spikes_b[offsets_b[j]:offsets_b[j+1]], t_start, t_end)
+    return distances
+
+
+@njit(cache=True, parallel=True, error_model='numpy')
+def _spike_sync_cross(spikes_a, offsets_a, spikes_b, offsets_b, t_start,
+                      t_end, max_tau):
+    N_a = len(offsets_a)-1
+    N_b = len(offsets_b)-1
+    sync = np.zeros((N_a, N_b))
+    for k in prange(N_a*N_b):
+        i = k // N_b
+        j = k % N_b
+        coinc, mp = coincidence_value_numba(
+            spikes_a[offsets_a[i]:offsets_a[i+1]],
+            spikes_b[offsets_b[j]:offsets_b[j+1]], t_start, t_end, max_tau)
+        sync[i, j] = coinc/mp
+    return sync
+
+
+@njit(cache=True, parallel=True, error_model='numpy')
+def _coincidence_matrix(times, taus, trains, position, tau_spikes, offsets):
+    N = len(offsets)-1
+    M = len(times)
+    coinc = np.zeros((N, N))
+    follow = np.zeros((N, N))
+    for b in prange(N):
+        # last spike that visited each spike train
+        visited = np.full(N, -1, dtype=np.intp)
+        for k in range(offsets[b], offsets[b+1]):
+            p = position[k]
+            t = times[p]
+            tau = tau_spikes[k]
+            # spikes at the same time are coincident, count each such pair
+            # once from its later spike in the stream
+            q = p - 1
+            while q >= 0 and times[q] == t:
+                a = trains[q]
+                if a != b and visited[a] != p:
+                    visited[a] = p
+                    coinc[b, a] += 2
+                q -= 1
+            # no predecessor check for spike trains with a spike at this time
+            r = p + 1
+            while r < M and times[r] == t:
+                visited[trains[r]] = p
+                r += 1
+            # the first spike of each spike train found scanning backwards is
+            # the preceding spike of that train
+            while q >= 0 and t - times[q] < tau:
+                a = trains[q]
+                if a != b and visited[a] != p:
+                    visited[a] = p
+                    if t - times[q] < taus[q]:
+                        coinc[b, a] += 2
+                        follow[b, a] += 1
+                q -= 1
+    return coinc, follow
+
+
+def _coincidence_sweep(spikes, offsets, t_start, t_end, max_tau,
+                       num_threads):
+    """ Detects the coincidences of all pairs of spike trains in one sweep
+    over the merged spikes, see coincidence_sweep_cython.
+    """
+    spikes = np.asarray(spikes, dtype=float)
+    offsets = np.asarray(offsets, dtype=np.intp)
+    N = len(offsets)-1
+    M = len(spikes)
+    train_ids = np.repeat(np.arange(N, dtype=np.intp), np.diff(offsets))
+    # half of the minimal neighboring ISI of each spike, as in _get_tau
+    half_isi = np.full(M, t_end-t_start)
+    if M > 1:
+        isi = np.diff(spikes)
+        same = train_ids[1:] == train_ids[:-1]
+        half_isi[:-1] = np.where(same, np.fmin(half_isi[:-1], isi),
+                                 half_isi[:-1])
+        half_isi[1:] = np.where(same, np.fmin(half_isi[1:], isi),
+                                half_isi[1:])
+    half_isi *= 0.5
+    if max_tau > 0.0:
+        half_isi = np.fmin(half_isi, max_tau)
+    order = np.argsort(spikes, kind='mergesort')
+    position = np.empty(M, dtype=np.intp)
+    position[order] = np.arange(M, dtype=np.intp)
+
+    _set_num_threads(num_threads)
+    return _coincidence_matrix(spikes[order], half_isi[order],
+                               train_ids[order], position, half_isi, offsets)
+
+
+def coincidence_matrix_numba(spikes, offsets, t_start, t_end, max_tau,
+                             num_threads):
+    """ Computes the coincidences and multiplicities of all pairs of spike
+    trains in one sweep over the merged spikes, see
+    coincidence_matrix_cython.
+    """
+    offsets = np.asarray(offsets, dtype=np.intp)
+    coinc, follow = _coincidence_sweep(spikes, offsets, t_start, t_end,
+                                       max_tau, num_threads)
+    coinc += coinc.T
+    counts = np.diff(offsets)
+    mp = (counts[:, None] + counts[None, :]).astype(float)
+    # empty spike trains -> spike sync = 1 by definition
+    empty = mp == 0.0
+    coinc[empty] = 1.0
+    mp[empty] = 1.0
+    return coinc, mp
+
+
+def _set_num_threads(num_threads):
+    """ Sets the number of threads used by the parallel loops, limited by the
+    number of threads numba was started with.
+    """
+    numba.set_num_threads(max(1, min(num_threads,
+                                     numba.config.NUMBA_NUM_THREADS)))
+
+
+def isi_distance_matrix_numba(spikes, offsets, t_start, t_end, num_threads):
+    _set_num_threads(num_threads)
+    return _isi_distance_matrix(spikes, np.asarray(offsets, dtype=np.intp),
+                                t_start, t_end)
+
+
+def spike_distance_matrix_numba(spikes, offsets, t_start, t_end,
+                                num_threads):
+    _set_num_threads(num_threads)
+    return _spike_distance_matrix(spikes, np.asarray(offsets, dtype=np.intp),
+                                  t_start, t_end)
+
+
+def spike_sync_matrix_numba(spikes, offsets, t_start, t_end, max_tau,
+                            num_threads):
+    coinc, mp = coincidence_matrix_numba(spikes, offsets, t_start, t_end,
+                                         max_tau, num_threads)
+    sync = coinc/mp
+    np.fill_diagonal(sync, 0.0)
+    return sync
+
+
+def spike_directionality_matrix_numba(spikes, offsets, t_start, t_end,
+                                      max_tau, num_threads):
+    """ Computes the antisymmetric matrix of the summed spike directionality
+    values of all pairs of spike trains, see
+    spike_directionality_matrix_cython.
+    """
+    coinc, follow = _coincidence_sweep(spikes, offsets, t_start, t_end,
+                                       max_tau, num_threads)
+    return follow.T - follow
+
+
+def isi_distance_condensed_numba(spikes, offsets, t_start, t_end, out,
+                                 num_threads):
+    _set_num_threads(num_threads)
+    _isi_distance_condensed(spikes, np.asarray(offsets, dtype=np.intp),
+                            t_start, t_end, out)
+
+
+def spike_distance_condensed_numba(spikes, offsets, t_start, t_end, out,
+                                   num_threads):
+    _set_num_threads(num_threads)
+    _spike_distance_condensed(spikes, np.asarray(offsets, dtype=np.intp),
+                              t_start, t_end, out)
+
+
+def spike_sync_condensed_numba(spikes, offsets, t_start, t_end, max_tau, out,
+                               num_threads):
+    _set_num_threads(num_threads)
+    _spike_sync_condensed(spikes, np.asarray(offsets, dtype=np.intp),
+                          t_start, t_end, max_tau, out)
+
+
+def isi_distance_cross_numba(spikes_a, offsets_a, spikes_b, offsets_b,
+                             t_start, t_end, num_threads):
+    _set_num_threads(num_threads)
+    return _isi_distance_cross(spikes_a, np.asarray(offsets_a, dtype=np.intp),
+                               spikes_b, np.asarray(offsets_b, dtype=np.intp),
+                               t_start, t_end)
+
+
+def spike_distance_cross_numba(spikes_a, offsets_a, spikes_b, offsets_b,
+                               t_start, t_end, num_threads):
+    _set_num_threads(num_threads)
+    return _spike_distance_cross(spikes_a,
+                                 np.asarray(offsets_a, dtype=np.intp),
+                                 spikes_b,
+                                 np.asarray(offsets_b, dtype=np.intp),
+                                 t_start, t_end)
+
+
+def spike_sync_cross_numba(spikes_a, offsets_a, spikes_b, offsets_b,
+                           t_start, t_end, max_tau, num_threads):
+    _set_num_threads(num_threads)
+    return _spike_sync_cross(spikes_a, np.asarray(offsets_a, dtype=np.intp),
+                             spikes_b, np.asarray(offsets_b, dtype=np.intp),
+                             t_start, t_end, max_tau)
+
+
+############################################################
+# add_piece_wise_const_numba
+############################################################
+@njit(cache=True, error_model='numpy')
+def add_piece_wise_const_numba(x1, y1, x2, y2):
+    N1 = len(x1)
+    N2 = len(x2)
+    x_new = np.empty(N1+N2)
+    y_new = np.empty(N1+N2-1)
+    index1 = 0
+    index2 = 0
+    index = 0
+    x_new[0] = x1[0]
+    y_new[0] = y1[0] + y2[0]
+    while (index1+1 < N1-1) and (index2+1 < N2-1):
+        index += 1
+        if x1[index1+1] < x2[index2+1]:
+            index1 += 1
+            x_new[index] = x1[index1]
+        elif x1[index1+1] > x2[index2+1]:
+            index2 += 1
+            x_new[index] = x2[index2]
+        else:  # x1[index1+1] == x2[index2+1]:
+            index1 += 1
+            index2 += 1
+            x_new[index] = x1[index1]
+        y_new[index] = y1[index1] + y2[index2]
+    # one array reached the end -> copy the contents of the other to the end
+    if index1+1 < N1-1:
+        x_new[index+1:index+1+N1-index1-1] = x1[index1+1:]
+        for i in range(N1-index1-2):
+            y_new[index+1+i] = y1[index1+1+i] + y2[N2-2]
+        index += N1-index1-2
+    elif index2+1 < N2-1:
+        x_new[index+1:index+1+N2-index2-1] = x2[index2+1:]
+        for i in range(N2-index2-2):
+            y_new[index+1+i] = y2[index2+1+i] + y1[N1-2]
+        index += N2-index2-2
+    else:  # both arrays reached the end simultaneously
+        # only the last x-value missing
+        x_new[index+1] = x1[N1-1]
+    return x_new[:index+2], y_new[:index+1]
+
+
+############################################################
+# add_piece_wise_lin_numba
+############################################################
+@njit(cache=True, error_model='numpy')
+def add_piece_wise_lin_numba(x1, y11, y12, x2, y21, y22):
+    N1 = len(x1)
+    N2 = len(x2)
+    x_new = np.empty(N1+N2)
+    y1_new = np.empty(N1+N2-1)
+    y2_new = np.empty(N1+N2-1)
+    index1 = 0  # index for self
+    index2 = 0  # index for f
+    index = 0   # index for new
+    x_new[0] = x1[0]
+    y1_new[0] = y11[0] + y21[0]
+    while (index1+1 < N1-1) and (index2+1 < N2-1):
+        if x1[index1+1] < x2[index2+1]:
+            # first compute the end value of the previous interval
+            # linear interpolation of the interval
+            y = y21[index2] + (y22[index2]-y21[index2]) * \
+                (x1[index1+1]-x2[index2]) / (x2[index2+1]-x2[index2])
+            y2_new[index] = y12[index1] + y
+            index1 += 1
+            index += 1
+            x_new[index] = x1[index1]
+            # and the starting value for the next interval
+            y1_new[index] = y11[index1] + y
+        elif x1[index1+1] > x2[index2+1]:
+            # first compute the end value of the previous interval
+            # linear interpolation of the interval
+            y = y11[index1] + (y12[index1]-y11[index1]) * \
+                (x2[index2+1]-x1[index1]) / \
+                (x1[index1+1]-x1[index1])
+            y2_new[index] = y22[index2] + y
+            index2 += 1
+            index += 1
+            x_new[index] = x2[index2]
+            # and the starting value for the next interval
+            y1_new[index] = y21[index2] + y
+        else:  # x1[index1+1] == x2[index2+1]:
+            y2_new[index] = y12[index1] + y22[index2]
+            index1 += 1
+            index2 += 1
+            index += 1
+            x_new[index] = x1[index1]
+            y1_new[index] = y11[index1] + y21[index2]
+    # one array reached the end -> copy the contents of the other to the end
+    if index1+1 < N1-1:
+        x_new[index+1:index+1+N1-index1-1] = x1[index1+1:]
+        for i in range(N1-index1-2):
+            # compute the linear interpolations value
+            y = y21[index2] + (y22[index2]-y21[index2]) * \
+                (x1[index1+1+i]-x2[index2]) / (x2[index2+1]-x2[index2])
+            y1_new[index+1+i] = y11[index1+1+i] + y
+            y2_new[index+i] = y12[index1+i] + y
+        index += N1-index1-2
+    elif index2+1 < N2-1:
+        x_new[index+1:index+1+N2-index2-1] = x2[index2+1:]
+        # compute the linear interpolations values
+        for i in range(N2-index2-2):
+            y = y11[index1] + (y12[index1]-y11[index1]) * \
+                (x2[index2+1+i]-x1[index1]) / \
+                (x1[index1+1]-x1[index1])
+            y1_new[index+1+i] = y21[index2+1+i] + y
+            y2_new[index+i] = y22[index2+i] + y
+        index += N2-index2-2
+    else:  # both arrays reached the end simultaneously
+        # only the last x-value missing
+        x_new[index+1] = x1[N1-1]
+    # finally, the end value for the last interval
+    y2_new[index] = y12[N1-2]+y22[N2-2]
+    return x_new[:index+2], y1_new[:index+1], y2_new[:index+1]
+
+
+############################################################
+# add_discrete_function_numba
+############################################################
+@njit(cache=True, error_model='numpy')
+def add_discrete_function_numba(x1, y1, mp1, x2, y2, mp2):
+    x_new = np.empty(len(x1) + len(x2))
+    y_new = np.empty(len(x1) + len(x2))
+    mp_new = np.empty(len(x1) + len(x2))
+    index1 = 0
+    index2 = 0
+    index = 0
+    N1 = len(y1)
+    N2 = len(y2)
+    x_new[0] = x1[0]
+    while (index1+1 < N1) and (index2+1 < N2):
+        if x1[index1+1] < x2[index2+1]:
+            index1 += 1
+            index += 1
+            x_new[index] = x1[index1]
+            y_new[index] = y1[index1]
+            mp_new[index] = mp1[index1]
+        elif x1[index1+1] > x2[index2+1]:
+            index2 += 1
+            index += 1
+            x_new[index] = x2[index2]
+            y_new[index] = y2[index2]
+            mp_new[index] = mp2[index2]
+        else:  # x1[index1+1] == x2[index2+1]
+            index1 += 1
+            index2 += 1
+            index += 1
+            x_new[index] = x1[index1]
+            y_new[index] = y1[index1] + y2[index2]
+            mp_new[index] = mp1[index1] + mp2[index2]
+    # one array reached the end -> copy the contents of the other to the end
+    if index1+1 < N1:
+        x_new[index+1:index+1+N1-index1-1] = x1[index1+1:]
+        y_new[index+1:index+1+N1-index1-1] = y1[index1+1:]
+        mp_new[index+1:index+1+N1-index1-1] = mp1[index1+1:]
+        index += N1-index1-1
+    elif index2+1 < N2:
+        x_new[index+1:index+1+N2-index2-1] = x2[index2+1:]
+        y_new[index+1:index+1+N2-index2-1] = y2[index2+1:]
+        mp_new[index+1:index+1+N2-index2-1] = mp2[index2+1:]
+        index += N2-index2-1
+
+    y_new[0] = y_new[1]
+    mp_new[0] = mp_new[1]
+    return x_new[:index+1], y_new[:index+1], mp_new[:index+1]
@@ -0,0 +1,409 @@
+""" numpy_backend.py
+
+Collection of vectorized numpy functions that can be used instead of the
+cython implementation. They compute the same results as the cython and python
+backends, but replace the loops over the spikes by array operations.
+
+Copyright 2015, Mario Mulansky <mario.mulansky@gmx.net>
+
+Distributed under the BSD License
+
+"""
+
+import numpy as np
+
+
+############################################################
+# merge_sorted
+############################################################
+def merge_sorted(a, b):
+    """ Merges the two sorted arrays a and b, where equal values of a and b
+    appear only once in the result. Repeated values are matched in order of
+    their occurrence, i.e. the k-th occurrence of a value in a is merged with
+    the k-th occurrence of that value in b. This is the ordering of the event
+    loops in the cython backend.
+
+    Returns the merged values and, for each merged value, the number of
+    entries of a and b up to and including this value.
+    """
+    def occurrence(s):
+        """ index of each value among the equal values in s """
+        return np.arange(len(s)) - np.searchsorted(s, s, side='left')
+
+    values = np.concatenate((a, b))
+    occ = np.concatenate((occurrence(a), occurrence(b)))
+    order = np.lexsort((occ, values))
+    values = values[order]
+    occ = occ[order]
+    if len(values) > 1:
+        keep = np.empty(len(values), dtype=bool)
+        keep[0] = True
+        keep[1:] = np.logical_or(values[1:] != values[:-1],
+                                 occ[1:] != occ[:-1])
+        values = values[keep]
+        occ = occ[keep]
+
+    def count(s):
+        """ number of entries of s up to and including each merged value """
+        left = np.searchsorted(s, values, side='left')
+        right = np.searchsorted(s, values, side='right')
+        return left + np.minimum(occ+1, right-left)
+
+    return values, count(a), count(b)
+
+
+def _advanced(counts, initial=0):
+    """ Returns which merged values belong to the array with the given
+    counts, i.e. where the count increases.
+    """
+    return np.diff(counts, prepend=initial) > 0
+
+
+############################################################
+# isi_profile_numpy
+############################################################
+def _isi_values(s, t_start, t_end):
+    """ Returns the interspike intervals of the spike train s indexed by the
+    number of spikes that have occurred, including the edge corrections.
+    """
+    N = len(s)
+    nu = np.empty(N+1)
+    if N > 1:
+        nu[1:N] = s[1:]-s[:-1]
+        nu[0] = max(s[0]-t_start, s[1]-s[0])
+        nu[N] = max(t_end-s[N-1], s[N-1]-s[N-2])
+    else:
+        nu[0] = s[0]-t_start
+        nu[N] = t_end-s[0]
+    return nu
+
+
+def _finish_events(t_start, t_end, events):
+    """ Adds the interval edges to the events and returns the times and
+    whether the last event coincides with the interval end.
+    """
+    at_end = len(events) > 0 and events[-1] == t_end
+    times = np.empty(len(events) + (1 if at_end else 2))
+    times[0] = t_start
+    times[1:len(events)+1] = events
+    times[-1] = t_end
+    return times, at_end
+
+
+def isi_profile_numpy(s1, s2, t_start, t_end):
+    """ Vectorized implementation of the isi profile.
+    """
+    s1 = np.asarray(s1, dtype=float)
+    s2 = np.asarray(s2, dtype=float)
+    # spikes at the start time are considered in the initial values
+    c1 = 1 if s1[0] <= t_start else 0
+    c2 = 1 if s2[0] <= t_start else 0
+    events, n1, n2 = merge_sorted(s1[c1:], s2[c2:])
+    n1 = np.concatenate(([c1], n1+c1))
+    n2 = np.concatenate(([c2], n2+c2))
+
+    nu1 = _isi_values(s1, t_start, t_end)[n1]
+    nu2 = _isi_values(s2, t_start, t_end)[n2]
+    isi_values = np.abs(nu1-nu2) / np.maximum(nu1, nu2)
+
+    times, at_end = _finish_events(t_start, t_end, events)
+    return times, isi_values[:len(times)-1]
+
+
+############################################################
+# isi_profile_multi_numpy
+############################################################
+def isi_profile_multi_numpy(spikes, offsets, t_start, t_end,
+                            chunk_size=100000):
+    """ Vectorized implementation of the multivariate isi profile.
+    """
+    spikes = np.asarray(spikes, dtype=float)
+    N = len(offsets)-1
+    M = 0.5*N*(N-1)
+    trains = [spikes[offsets[n]:offsets[n+1]] for n in range(N)]
+    # spikes at the start time are considered in the initial values
+    consumed = np.array([1 if s[0] <= t_start else 0 for s in trains])
+    events = [s[c:] for s, c in zip(trains, consumed)]
+    events = np.unique(np.concatenate(events))
+
+    times, at_end = _finish_events(t_start, t_end, events)
+    isi_values = np.zeros(len(times)-1)
+    # evaluate the events in chunks to limit the memory of the N x chunk
+    # matrix of interspike intervals
+    chunk = max(1, chunk_size // N)
+    nu_trains = [_isi_values(s, t_start, t_end) for s in trains]
+    for start in range(0, len(isi_values), chunk):
+        stop = min(start+chunk, len(isi_values))
+        # the value of an interval is defined by the spikes at its start
+        t = times[start:stop]
+        nu = np.empty((N, stop-start))
+        for n in range(N):
+            counts = np.searchsorted(trains[n], t, side='right')
+            if start == 0:
+                # the initial value only considers the first spike at the
+                # start time
+                counts[0] = consumed[n]
+            nu[n] = nu_trains[n][counts]
+        for n in range(N-1):
+            isi_values[start:stop] += np.sum(
+                np.abs(nu[n]-nu[n+1:]) / np.maximum(nu[n], nu[n+1:]), axis=0)
+    return times, isi_values/M
+
+
+############################################################
+# spike_profile_numpy
+############################################################
+def _min_dist(t, s, t_aux):
+    """ Returns the minimal distance of the times t to the spikes s including
+    the auxiliary spikes t_aux.
+    """
+    points = np.concatenate(([t_aux[0]], s, [t_aux[1]]))
+    ind = np.searchsorted(points, t)
+    left = points[np.maximum(ind-1, 0)]
+    right = points[np.minimum(ind, len(points)-1)]
+    return np.minimum(np.abs(t-left), np.abs(right-t))
+
+
+def _spike_segments(t, t_other, t_aux, t_aux_other, t_start, t_end):
+    """ Returns the previous and following spike times, their distances to
+    the other spike train and the interspike intervals of the spike train t,
+    indexed by the number of spikes that have occurred. The last array marks
+    the segments where the distance is constant due to the edge correction.
+    """
+    N = len(t)
+    consumed = t[0] <= t_start
+    t_p = np.empty(N+1)
+    t_p[0] = t_aux[0]
+    t_p[1:] = t
+    t_f = np.empty(N+1)
+    t_f[:N] = t
+    t_f[N] = t_aux[1]
+    dist = _min_dist(t, t_other, t_aux_other)
+    dt_p = np.empty(N+1)
+    dt_p[0] = dist[0]
+    dt_p[1:] = dist
+    dt_f = np.empty(N+1)
+    dt_f[:N] = dist
+    dt_f[N] = dt_p[N]
+    isi = _isi_values(t, t_start, t_end)
+    const = np.zeros(N+1, dtype=bool)
+    const[0] = True
+    const[N] = True
+    if consumed and N == 1:
+        # single spike at the start: interpolate until the end of the interval
+        dt_f[N] = _min_dist(np.array([t_end]), t_other, t_aux_other)[0]
+        const[N] = False
+    return t_p, t_f, dt_p, dt_f, isi, const
+
+
+def _spike_value(t, k, segments, exact_start=False):
+    """ Returns the distance of the spike train at times t, where k is the
+    number of spikes that have occurred before.
+    """
+    t_p, t_f, dt_p, dt_f, isi, const = segments
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = (dt_p[k]*(t_f[k]-t) + dt_f[k]*(t-t_p[k])) / isi[k]
+    if exact_start:
+        # at the own spike, the value is given by the distance directly
+        const = np.logical_or(const[k], t == t_p[k])
+    else:
+        const = const[k]
+    return np.where(const, dt_p[k], s)
+
+
+def spike_profile_numpy(t1, t2, t_start, t_end):
+    """ Vectorized implementation of the spike profile.
+    """
+    t1 = np.asarray(t1, dtype=float)
+    t2 = np.asarray(t2, dtype=float)
+    N1 = len(t1)
+    N2 = len(t2)
+    assert N1 > 0
+    assert N2 > 0
+
+    # auxiliary spikes for edge correction - consistent with first/last ISI
+    t_aux1 = (min(t_start, 2*t1[0]-t1[1]) if N1 > 1 else t_start,
+              max(t_end, 2*t1[N1-1]-t1[N1-2]) if N1 > 1 else t_end)
+    t_aux2 = (min(t_start, 2*t2[0]-t2[1]) if N2 > 1 else t_start,
+              max(t_end, 2*t2[N2-1]-t2[N2-2]) if N2 > 1 else t_end)
+    seg1 = _spike_segments(t1, t2, t_aux1, t_aux2, t_start, t_end)
+    seg2 = _spike_segments(t2, t1, t_aux2, t_aux1, t_start, t_end)
+
+    # spikes at the start time are considered in the initial values
+    c1 = 1 if t1[0] <= t_start else 0
+    c2 = 1 if t2[0] <= t_start else 0
+    events, n1, n2 = merge_sorted(t1[c1:], t2[c2:])
+    n1 += c1
+    n2 += c2
+    has1 = _advanced(n1, c1)
+    has2 = _advanced(n2, c2)
+    # number of spikes before each event
+    p1 = np.concatenate(([c1], n1[:-1]))
+    p2 = np.concatenate(([c2], n2[:-1]))
+
+    def combine(s1, s2, k1, k2):
+        isi1 = seg1[4][k1]
+        isi2 = seg2[4][k2]
+        return (s1*isi2 + s2*isi1) / (0.5*(isi1+isi2)*(isi1+isi2))
+
+    times, at_end = _finish_events(t_start, t_end, events)
+    t0 = np.array([t_start])
+    k1 = np.concatenate(([c1], n1))
+    k2 = np.concatenate(([c2], n2))
+    t = np.concatenate((t0, events))
+    y_starts = combine(_spike_value(t, k1, seg1, True),
+                       _spike_value(t, k2, seg2, True), k1, k2)
+    y_ends = combine(_spike_value(events, p1, seg1),
+                     _spike_value(events, p2, seg2), p1, p2)
+    # both spike trains spike at the same time: the distance is zero
+    tie = np.logical_and(has1, has2)
+    y_starts[1:][tie] = 0.0
+    y_ends[tie] = 0.0
+
+    if at_end:
+        y_starts = y_starts[:-1]
+    else:
+        # the end value of the last interval
+        y_last = combine(seg1[3][k1[-1:]], seg2[3][k2[-1:]],
+                         k1[-1:], k2[-1:])
+        y_ends = np.concatenate((y_ends, y_last))
+    return times, y_starts, y_ends
+
+
+############################################################
+# coincidence_profile_numpy
+############################################################
+def coincidence_profile_numpy(spikes1, spikes2, t_start, t_end, max_tau):
+    """ Vectorized implementation of the coincidence profile.
+    """
+    spikes1 = np.asarray(spikes1, dtype=float)
+    spikes2 = np.asarray(spikes2, dtype=float)
+    events, n1, n2 = merge_sorted(spikes1, spikes2)
+    if len(events) == 0:
+        return (np.array([t_start, t_end]), np.ones(2), np.ones(2))
+    has1 = _advanced(n1)
+    has2 = _advanced(n2)
+    tie = np.logical_and(has1, has2)
+    i = n1-1
+    j = n2-1
+
+    def neighbor_isis(s):
+        """ intervals to the next and previous spike, padded with inf for
+        non-existing spikes. Index 0 corresponds to no spike. """
+        isi = np.diff(s)
+        inf = np.array([np.inf])
+        return (np.concatenate((inf, isi, inf)),
+                np.concatenate((inf, inf, isi)))
+
+    f1, b1 = neighbor_isis(spikes1)
+    f2, b2 = neighbor_isis(spikes2)
+    tau = np.minimum(np.minimum(f1[i+1], b1[i+1]),
+                     np.minimum(f2[j+1], b2[j+1]))
+    tau = 0.5*np.minimum(tau, t_end-t_start)
+    if max_tau > 0.0:
+        tau = np.minimum(tau, max_tau)
+
+    # a spike is coincident with the preceding spike of the other train
+    coinc1 = np.logical_and(np.logical_and(has1, ~has2), j > -1)
+    coinc1[coinc1] = events[coinc1] - spikes2[j[coinc1]] < tau[coinc1]
+    coinc2 = np.logical_and(np.logical_and(has2, ~has1), i > -1)
+    coinc2[coinc2] = events[coinc2] - spikes1[i[coinc2]] < tau[coinc2]
+    coinc = np.nonzero(np.logical_or(coinc1, coinc2))[0]
+
+    c = np.zeros(len(events)+2)
+    mp = np.ones(len(events)+2)
+    # both get marked with 1
+    c[coinc+1] = 1
+    c[coinc] = 1
+    # add only one event, but with coincidence 2 and multiplicity 2
+    c[1:-1][tie] = 2
+    mp[1:-1][tie] = 2
+    c[0] = c[1]
+    c[-1] = c[-2]
+    mp[0] = mp[1]
+    mp[-1] = mp[-2]
+
+    st = np.empty(len(events)+2)
+    st[0] = t_start
+    st[1:-1] = events
+    st[-1] = t_end
+    return st, c, mp
+
+
+############################################################
+# add_piece_wise_const_numpy
+############################################################
+def add_piece_wise_const_numpy(x1, y1, x2, y2):
+    """ Vectorized implementation of the sum of two piece-wise constant
+    functions.
+    """
+    x1, y1, x2, y2 = [np.asarray(a, dtype=float) for a in (x1, y1, x2, y2)]
+    x, n1, n2 = merge_sorted(x1[1:-1], x2[1:-1])
+    x_new = np.concatenate(([x1[0]], x, [x1[-1]]))
+    y_new = np.empty(len(x)+1)
+    y_new[0] = y1[0] + y2[0]
+    y_new[1:] = y1[n1] + y2[n2]
+    return x_new, y_new
+
+
+############################################################
+# add_piece_wise_lin_numpy
+############################################################
+def add_piece_wise_lin_numpy(x1, y11, y12, x2, y21, y22):
+    """ Vectorized implementation of the sum of two piece-wise linear
+    functions.
+    """
+    x1, y11, y12, x2, y21, y22 = [np.asarray(a, dtype=float) for a in
+                                  (x1, y11, y12, x2, y21, y22)]
+    x, n1, n2 = merge_sorted(x1[1:-1], x2[1:-1])
+    has1 = _advanced(n1)
+    has2 = _advanced(n2)
+    p1 = n1 - has1
+    p2 = n2 - has2
+
+    def values(x_f, y_1, y_2, y_exact, exact, n):
+        """ values of a function at the merged x-values, which are either
+        given exactly by y_exact or by linear interpolation of the n-th
+        interval """
+        y = np.where(exact, y_exact[n], 0.0)
+        k = n[~exact]
+        t = x[~exact]
+        y[~exact] = y_1[k] + (y_2[k]-y_1[k]) * (t-x_f[k]) / (x_f[k+1]-x_f[k])
+        return y
+
+    # values of the functions at the start of each new interval
+    start1 = values(x1, y11, y12, y11, has1, n1)
+    start2 = values(x2, y21, y22, y21, has2, n2)
+    # and at the end of the previous interval
+    end1 = values(x1, y11, y12, y12, has1, p1)
+    end2 = values(x2, y21, y22, y22, has2, p2)
+
+    x_new = np.concatenate(([x1[0]], x, [x1[-1]]))
+    y1_new = np.empty(len(x)+1)
+    y2_new = np.empty(len(x)+1)
+    y1_new[0] = y11[0] + y21[0]
+    y1_new[1:] = start1 + start2
+    y2_new[:-1] = end1 + end2
+    y2_new[-1] = y12[-1] + y22[-1]
+    return x_new, y1_new, y2_new
+
+
+############################################################
+# add_discrete_function_numpy
+############################################################
+def add_discrete_function_numpy(x1, y1, mp1, x2, y2, mp2):
+    """ Vectorized implementation of the sum of two discrete functions.
+    """
+    x1, y1, mp1, x2, y2, mp2 = [np.asarray(a, dtype=float) for a in
+                                (x1, y1, mp1, x2, y2, mp2)]
+    x, n1, n2 = merge_sorted(x1[1:], x2[1:])
+    has1 = _advanced(n1)
+    has2 = _advanced(n2)
+    x_new = np.concatenate(([x1[0]], x))
+    y_new = np.empty(len(x_new))
+    mp_new = np.empty(len(x_new))
+    y_new[1:] = np.where(has1, y1[n1], 0.0) + np.where(has2, y2[n2], 0.0)
+    mp_new[1:] = np.where(has1, mp1[n1], 0.0) + np.where(has2, mp2[n2], 0.0)
+    y_new[0] = y_new[1]
+    mp_new[0] = mp_new[1]
+    return x_new, y_new, mp_new
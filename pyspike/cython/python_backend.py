@@ -96,6 +96,86 @@ def isi_distance_python(s1, s2, t_start, t_end):
     return spike_events[:index + 1], isi_values[:index]
 
 
+############################################################
+# isi_profile_multi_python
+############################################################
+def isi_profile_multi_python(spikes, offsets, t_start, t_end):
+    """ Plain Python implementation of the multivariate isi profile.
+    """
+    def isi_sum(nu):
+        """ sum of the isi-distances of all pairs """
+        i, j = np.triu_indices(len(nu), 1)
+        return np.sum(np.abs(nu[i]-nu[j]) / np.maximum(nu[i], nu[j]))
+
+    N = len(offsets)-1
+    M = 0.5*N*(N-1)
+    nu = np.empty(N)
+    current = np.empty(N, dtype=int)
+    for n in range(N):
+        s = spikes[offsets[n]:offsets[n+1]]
+        if s[0] > t_start:
+            # edge correction
+            nu[n] = max(s[0]-t_start, s[1]-s[0]) if len(s) > 1 \
+                else s[0]-t_start
+            current[n] = offsets[n]-1
+        else:
+            nu[n] = s[1]-s[0] if len(s) > 1 else t_end-s[0]
+            current[n] = offsets[n]
+
+    # all spikes in temporal order together with their spike train
+    order = np.argsort(spikes, kind='mergesort')
+    trains = np.repeat(np.arange(N), np.diff(offsets))[order]
+
+    spike_events = np.empty(len(spikes)+2)
+    isi_values = np.empty(len(spikes)+1)
+    spike_events[0] = t_start
+    total = isi_sum(nu)
+    isi_values[0] = total/M
+    index = 1
+    updates = 0
+    others = np.ones(N, dtype=bool)
+    for i in range(len(spikes)):
+        k = order[i]
+        n = trains[i]
+        if k <= current[n]:
+            # spike at the start time, already considered above
+            continue
+        current[n] = k
+        if k < offsets[n+1]-1:
+            nu_new = spikes[k+1]-spikes[k]
+        elif offsets[n+1]-offsets[n] > 1:
+            # edge correction
+            nu_new = max(t_end-spikes[k], spikes[k]-spikes[k-1])
+        else:
+            nu_new = t_end-spikes[k]
+        # only the pairs with spike train n change their isi-distance
+        others[n] = False
+        nu_j = nu[others]
+        others[n] = True
+        total += np.sum(np.abs(nu_new-nu_j) / np.maximum(nu_new, nu_j) -
+                        np.abs(nu[n]-nu_j) / np.maximum(nu[n], nu_j))
+        nu[n] = nu_new
+        updates += 1
+        if i < len(spikes)-1 and spikes[order[i+1]] == spikes[k]:
+            # further spikes at the same time
+            continue
+        if 2*updates >= N:
+            # recompute the sum from time to time to avoid the accumulation
+            # of round-off errors
+            total = isi_sum(nu)
+            updates = 0
+        spike_events[index] = spikes[k]
+        isi_values[index] = total/M
+        index += 1
+
+    # the last event is the interval end
+    if spike_events[index-1] == t_end:
+        index -= 1
+    else:
+        spike_events[index] = t_end
+    return spike_events[:index+1], isi_values[:index]
+
+
 ############################################################
 # get_min_dist
 ############################################################
@@ -433,6 +513,160 @@ def coincidence_python(spikes1, spikes2, t_start, t_end, max_tau):
     return st, c, mp
 
 
+############################################################
+# spike_directionality_profiles_python
+############################################################
+def spike_directionality_profiles_python(spikes1, spikes2, t_start, t_end,
+                                         max_tau):
+
+    def get_tau(spikes1, spikes2, i, j, max_tau):
+        m = t_end - t_start   # use interval as initial tau
+        if i < len(spikes1)-1 and i > -1:
+            m = min(m, spikes1[i+1]-spikes1[i])
+        if j < len(spikes2)-1 and j > -1:
+            m = min(m, spikes2[j+1]-spikes2[j])
+        if i > 0:
+            m = min(m, spikes1[i]-spikes1[i-1])
+        if j > 0:
+            m = min(m, spikes2[j]-spikes2[j-1])
+        m *= 0.5
+        if max_tau > 0.0:
+            m = min(m, max_tau)
+        return m
+
+    N1 = len(spikes1)
+    N2 = len(spikes2)
+    i = -1
+    j = -1
+    d1 = np.zeros(N1)
+    d2 = np.zeros(N2)
+    while i + j < N1 + N2 - 2:
+        if (i < N1-1) and (j == N2-1 or spikes1[i+1] < spikes2[j+1]):
+            i += 1
+            tau = get_tau(spikes1, spikes2, i, j, max_tau)
+            if j > -1 and spikes1[i]-spikes2[j] < tau:
+                # coincidence with the previous spike of spike train 2
+                d1[i] = -1
+                d2[j] = 1
+        elif (j < N2-1) and (i == N1-1 or spikes1[i+1] > spikes2[j+1]):
+            j += 1
+            tau = get_tau(spikes1, spikes2, i, j, max_tau)
+            if i > -1 and spikes2[j]-spikes1[i] < tau:
+                # coincidence with the previous spike of spike train 1
+                d1[i] = 1
+                d2[j] = -1
+        else:   # spikes1[i+1] = spikes2[j+1]
+            # simultaneous spikes: no order
+            j += 1
+            i += 1
+
+    return d1, d2
+
+
+############################################################
+# spike_train_order_profile_python
+############################################################
+def spike_train_order_profile_python(spikes1, spikes2, t_start, t_end,
+                                     max_tau):
+
+    def get_tau(spikes1, spikes2, i, j, max_tau):
+        m = t_end - t_start   # use interval as initial tau
+        if i < len(spikes1)-1 and i > -1:
+            m = min(m, spikes1[i+1]-spikes1[i])
+        if j < len(spikes2)-1 and j > -1:
+            m = min(m, spikes2[j+1]-spikes2[j])
+        if i > 0:
+            m = min(m, spikes1[i]-spikes1[i-1])
+        if j > 0:
+            m = min(m, spikes2[j]-spikes2[j-1])
+        m *= 0.5
+        if max_tau > 0.0:
+            m = min(m, max_tau)
+        return m
+
+    N1 = len(spikes1)
+    N2 = len(spikes2)
+    i = -1
+    j = -1
+    n = 0
+    st = np.zeros(N1 + N2 + 2)  # spike times
+    e = np.zeros(N1 + N2 + 2)   # spike train order values
+    mp = np.ones(N1 + N2 + 2)   # multiplicity
+    while i + j < N1 + N2 - 2:
+        if (i < N1-1) and (j == N2-1 or spikes1[i+1] < spikes2[j+1]):
+            i += 1
+            n += 1
+            tau = get_tau(spikes1, spikes2, i, j, max_tau)
+            st[n] = spikes1[i]
+            if j > -1 and spikes1[i]-spikes2[j] < tau:
+                # spike train 2 leads
+                e[n] = -1
+                e[n-1] = -1
+        elif (j < N2-1) and (i == N1-1 or spikes1[i+1] > spikes2[j+1]):
+            j += 1
+            n += 1
+            tau = get_tau(spikes1, spikes2, i, j, max_tau)
+            st[n] = spikes2[j]
+            if i > -1 and spikes2[j]-spikes1[i] < tau:
+                # spike train 1 leads
+                e[n] = 1
+                e[n-1] = 1
+        else:   # spikes1[i+1] = spikes2[j+1]
+            # advance in both spike trains
+            j += 1
+            i += 1
+            n += 1
+            # add only one event with multiplicity 2 and no order
+            st[n] = spikes1[i]
+            mp[n] = 2
+
+    st = st[:n+2]
+    e = e[:n+2]
+    mp = mp[:n+2]
+
+    st[0] = t_start
+    st[len(st)-1] = t_end
+    if N1 + N2 > 0:
+        e[0] = e[1]
+        e[len(e)-1] = e[len(e)-2]
+        mp[0] = mp[1]
+        mp[len(mp)-1] = mp[len(mp)-2]
+
+    return st, e, mp
+
+
+############################################################
+# simulated_annealing_python
+############################################################
+def simulated_annealing_python(D, p_init, T_start, T_end, alpha, rng):
+    N = len(p_init)
+    p = np.array(p_init, dtype=np.intp)
+    A = np.sum(np.triu(D[p][:, p], 1))
+    best_p = p.copy()
+    best_A = A
+    iterations = 0
+    if N < 2:
+        return best_p, best_A, iterations
+
+    T = T_start
+    while T > T_end:
+        u_swap = rng.random(N*N)
+        u_accept = rng.random(N*N)
+        for it in range(N*N):
+            k = int(u_swap[it]*(N-1))
+            dA = -2.0*D[p[k], p[k+1]]
+            if dA > 0.0 or u_accept[it] < np.exp(dA/T):
+                p[k], p[k+1] = p[k+1], p[k]
+                A += dA
+        iterations += N*N
+        if A > best_A:
+            best_A = A
+            best_p = p.copy()
+        T *= alpha
+
+    return best_p, best_A, iterations
+
+
 ############################################################
 # add_piece_wise_const_python
 ############################################################
@@ -0,0 +1,21 @@
+"""
+Copyright 2015, Mario Mulansky <mario.mulansky@gmx.net>
+
+Distributed under the BSD License
+"""
+
+from __future__ import absolute_import
+
+__all__ = ["spike_directionality", "spike_directionality_values",
+           "spike_directionality_matrix", "spike_train_order_profile",
+           "spike_train_order_profile_bi", "spike_train_order_profile_multi",
+           "spike_train_order", "spike_train_order_bi",
+           "spike_train_order_multi", "optimal_spike_train_sorting",
+           "permutate_matrix"]
+
+from .spike_directionality import spike_directionality, \
+    spike_directionality_values, spike_directionality_matrix, \
+    spike_train_order_profile, spike_train_order_profile_bi, \
+    spike_train_order_profile_multi, spike_train_order, \
+    spike_train_order_bi, spike_train_order_multi, \
+    optimal_spike_train_sorting, permutate_matrix
@@ -0,0 +1,574 @@
+# Module containing functions to compute the SPIKE directionality and the
+# spike train order profile
+# Copyright 2015, Mario Mulansky <mario.mulansky@gmx.net>
+# Distributed under the BSD License
+
+from __future__ import absolute_import, division
+
+import numpy as np
+from pyspike.backends import get_kernel
+from pyspike import DiscreteFunc
+from pyspike.generic import _generic_profile_multi, _flatten_spike_trains, \
+    _get_n_jobs, _get_intervals
+from pyspike.spikes import _get_rng
+
+
+############################################################
+# _spike_directionality_profiles
+############################################################
+def _spike_directionality_profiles(spike_train1, spike_train2, max_tau):
+    """ Internal implementation detail. Returns the spike directionality
+    values of the spikes of both spike trains: +1 for a spike leading its
+    coincident spike, -1 for a following spike, and 0 otherwise.
+    """
+    assert spike_train1.t_start == spike_train2.t_start, \
+        "Given spike trains are not defined on the same interval!"
+    assert spike_train1.t_end == spike_train2.t_end, \
+        "Given spike trains are not defined on the same interval!"
+    spike_directionality_profiles_impl = \
+        get_kernel("spike_directionality_profiles")
+    return spike_directionality_profiles_impl(spike_train1.spikes,
+                                              spike_train2.spikes,
+                                              spike_train1.t_start,
+                                              spike_train1.t_end,
+                                              max_tau or 0.0)
+
+
+def _in_interval(spikes, interval, t_start, t_end):
+    """ Internal implementation detail. Returns the mask of the spikes within
+    the given interval, or sequence of intervals.
+    """
+    if interval is None:
+        return np.ones(len(spikes), dtype=bool)
+    intervals = _get_intervals(interval, t_start, t_end)
+    mask = np.zeros(len(spikes), dtype=bool)
+    for t0, t1 in intervals:
+        mask |= (spikes >= t0) & (spikes <= t1)
+    return mask
+
+
+############################################################
+# spike_directionality
+############################################################
+def spike_directionality(spike_train1, spike_train2, normalize=True,
+                         interval=None, max_tau=None):
+    """ Computes the overall spike directionality of the first spike train
+    with respect to the second spike train: the number of spikes of the first
+    spike train that lead a coincident spike of the second spike train minus
+    the number of spikes that follow one.
+
+    :param spike_train1: First spike train.
+    :type spike_train1: :class:`pyspike.SpikeTrain`
+    :param spike_train2: Second spike train.
+    :type spike_train2: :class:`pyspike.SpikeTrain`
+    :param normalize: Normalize by the number of spikes of the first spike
+                      train.
+    :param interval: averaging interval given as a pair of floats (T0, T1),
+                     if `None` all spikes are considered.
+    :type interval: Pair of floats or None.
+    :param max_tau: Maximum coincidence window size. If 0 or `None`, the
+                    coincidence window has no upper bound.
+    :returns: The spike train directionality of the first spike train.
+    :rtype: double
+    """
+    d1, d2 = _spike_directionality_profiles(spike_train1, spike_train2,
+                                            max_tau)
+    mask = _in_interval(spike_train1.spikes, interval, spike_train1.t_start,
+                        spike_train1.t_end)
+    d = np.sum(d1[mask])
+    if normalize:
+        n = np.sum(mask)
+        return d/n if n > 0 else 0.0
+    return d
+
+
+############################################################
+# spike_directionality_values
+############################################################
+def spike_directionality_values(spike_trains, indices=None, interval=None,
+                                max_tau=None):
+    """ Computes the spike directionality value of every spike, averaged over
+    all other spike trains: +1 if the spike leads coincident spikes in all
+    other spike trains, -1 if it follows all of them.
+
+    :param spike_trains: list of :class:`pyspike.SpikeTrain`
+    :param indices: list of indices defining which spike trains to use,
+                    if None all given spike trains are used (default=None)
+    :type indices: list or None
+    :param interval: If given, only the spikes within this interval are
+                     returned.
+    :type interval: Pair of floats or None.
+    :param max_tau: Maximum coincidence window size. If 0 or `None`, the
+                    coincidence window has no upper bound.
+    :returns: list of arrays with the spike directionality values of the
+              spikes of each spike train.
+    :rtype: list of np.array
+    """
+    if indices is None:
+        indices = np.arange(len(spike_trains))
+    indices = np.array(indices)
+    # check validity of indices
+    assert (indices < len(spike_trains)).all() and (indices >= 0).all(), \
+        "Invalid index list."
+    N = len(indices)
+    values = [np.zeros(len(spike_trains[i].spikes)) for i in indices]
+    for i in range(N):
+        for j in range(i+1, N):
+            d1, d2 = _spike_directionality_profiles(spike_trains[indices[i]],
+                                                    spike_trains[indices[j]],
+                                                    max_tau)
+            values[i] += d1
+            values[j] += d2
+    if N > 1:
+        values = [v/(N-1) for v in values]
+    if interval is not None:
+        values = [v[_in_interval(spike_trains[i].spikes, interval,
+                                 spike_trains[i].t_start,
+                                 spike_trains[i].t_end)]
+                  for i, v in zip(indices, values)]
+    return values
+
+
+############################################################
+# spike_directionality_matrix
+############################################################
+def spike_directionality_matrix(spike_trains, normalize=True, indices=None,
+                                interval=None, max_tau=None, n_jobs=1):
+    """ Computes the spike directionality of all pairs of spike trains.
+    Without normalization, the matrix is antisymmetric and entry
+    :math:`D_{nm}` is the number of spikes of spike train n leading a
+    coincident spike of m minus the number of spikes following one.
+
+    :param spike_trains: list of :class:`pyspike.SpikeTrain`
+    :param normalize: Normalize each row by the number of spikes of the
+                      respective spike train.
+    :param indices: list of indices defining which spike trains to use,
+                    if None all given spike trains are used (default=None)
+    :type indices: list or None
+    :param interval: If given, only the spikes within this interval are
+                     considered.
+    :type interval: Pair of floats or None.
+    :param max_tau: Maximum coincidence window size. If 0 or `None`, the
+                    coincidence window has no upper bound.
+    :param n_jobs: number of threads used by the Cython backend, -1 uses all
+                   available cpus.
+    :returns: 2D array with the pair wise spike directionality values
+    :rtype: np.array
+    """
+    if indices is None:
+        indices = np.arange(len(spike_trains))
+    indices = np.array(indices)
+    # check validity of indices
+    assert (indices < len(spike_trains)).all() and (indices >= 0).all(), \
+        "Invalid index list."
+    N = len(indices)
+    t_start = spike_trains[indices[0]].t_start
+    t_end = spike_trains[indices[0]].t_end
+
+    spike_directionality_matrix_impl = \
+        get_kernel("spike_directionality_matrix")
+    if interval is None and spike_directionality_matrix_impl is not None:
+        spikes, offsets = _flatten_spike_trains(spike_trains, indices,
+                                                non_empty=False)
+        D = spike_directionality_matrix_impl(spikes, offsets, t_start, t_end,
+                                             max_tau or 0.0,
+                                             _get_n_jobs(n_jobs))
+    else:
+        D = np.zeros((N, N))
+        masks = [_in_interval(spike_trains[i].spikes, interval, t_start,
+                              t_end) for i in indices]
+        for i in range(N):
+            for j in range(i+1, N):
+                d1, d2 = _spike_directionality_profiles(
+                    spike_trains[indices[i]], spike_trains[indices[j]],
+                    max_tau)
+                D[i, j] = np.sum(d1[masks[i]])
+                D[j, i] = np.sum(d2[masks[j]])
+    if normalize:
+        counts = np.array([np.sum(_in_interval(spike_trains[i].spikes,
+                                               interval, t_start, t_end))
+                           for i in indices], dtype=float)
+        D = D / np.maximum(counts, 1.0)[:, None]
+    return D
+
+
+############################################################
+# spike_train_order_profile
+############################################################
+def spike_train_order_profile(*args, **kwargs):
+    """ Computes the spike train order profile :math:`E(t)` of the given
+    spike trains. Returns the profile as a DiscreteFunction object. Each
+    spike of a coincidence gets the value +1 if the order of the coincident
+    spikes follows the order of the spike trains, i.e. the spike of the
+    spike train with the lower index leads, and -1 otherwise. Spikes without
+    coincidence have the value 0.
+
+    Valid call structures::
+
+      spike_train_order_profile(st1, st2)  # returns the bi-variate profile
+      spike_train_order_profile(st1, st2, st3)  # multi-variate profile
+
+      sts = [st1, st2, st3, st4]  # list of spike trains
+      spike_train_order_profile(sts)  # profile of the list of spike trains
+      spike_train_order_profile(sts, indices=[0, 1])  # use only the spike
+                                                      # trains given by the
+                                                      # indices
+
+    In the multivariate case, the values of each spike are summed over all
+    pairs and the multiplicity is the number of pairs involving the spike
+    train of this spike, as for :func:`.spike_sync_profile`.
+
+    :returns: The spike train order profile :math:`E(t)`
+    :rtype: :class:`.DiscreteFunc`
+    """
+    if len(args) == 1:
+        return spike_train_order_profile_multi(args[0], **kwargs)
+    elif len(args) == 2:
+        return spike_train_order_profile_bi(args[0], args[1], **kwargs)
+    else:
+        return spike_train_order_profile_multi(args, **kwargs)
+
+
+############################################################
+# spike_train_order_profile_bi
+############################################################
+def spike_train_order_profile_bi(spike_train1, spike_train2, max_tau=None):
+    """ Computes the spike train order profile of two spike trains. Use
+    :func:`.spike_train_order_profile` instead.
+
+    :param spike_train1: First spike train.
+    :type spike_train1: :class:`pyspike.SpikeTrain`
+    :param spike_train2: Second spike train.
+    :type spike_train2: :class:`pyspike.SpikeTrain`
+    :param max_tau: Maximum coincidence window size. If 0 or `None`, the
+                    coincidence window has no upper bound.
+    :returns: The spike train order profile :math:`E(t)`
+    :rtype: :class:`.DiscreteFunc`
+    """
+    assert spike_train1.t_start == spike_train2.t_start, \
+        "Given spike trains are not defined on the same interval!"
+    assert spike_train1.t_end == spike_train2.t_end, \
+        "Given spike trains are not defined on the same interval!"
+    spike_train_order_profile_impl = get_kernel("spike_train_order_profile")
+    times, e, mp = spike_train_order_profile_impl(spike_train1.spikes,
+                                                  spike_train2.spikes,
+                                                  spike_train1.t_start,
+                                                  spike_train1.t_end,
+                                                  max_tau or 0.0)
+    return DiscreteFunc(times, e, mp)
+
+
+############################################################
+# spike_train_order_profile_multi
+############################################################
+def spike_train_order_profile_multi(spike_trains, indices=None,
+                                    max_tau=None):
+    """ Computes the multivariate spike train order profile of a set of spike
+    trains. Use :func:`.spike_train_order_profile` instead.
+
+    :param spike_trains: list of :class:`pyspike.SpikeTrain`
+    :param indices: list of indices defining which spike trains to use,
+                    if None all given spike trains are used (default=None)
+    :type indices: list or None
+    :param max_tau: Maximum coincidence window size. If 0 or `None`, the
+                    coincidence window has no upper bound.
+    :returns: The multi-variate spike train order profile :math:`E(t)`
+    :rtype: :class:`.DiscreteFunc`
+    """
+    def prof_func(spike_train1, spike_train2):
+        return spike_train_order_profile_bi(spike_train1, spike_train2,
+                                            max_tau)
+    average_prof, M = _generic_profile_multi(spike_trains, prof_func,
+                                             indices)
+    return average_prof
+
+
+############################################################
+# _spike_train_order_values
+############################################################
+def _spike_train_order_values(profile, interval):
+    """ Internal implementation detail. Returns the summed values and the
+    summed multiplicity of the spike train order profile, without the edges.
+    """
+    if interval is None:
+        return np.sum(profile.y[1:-1]), np.sum(profile.mp[1:-1])
+    intervals = _get_intervals(interval, profile.x[0], profile.x[-1])
+    value = 0.0
+    multiplicity = 0.0
+    for t0, t1 in intervals:
+        # the spike events within the interval, excluding the edges
+        start = max(np.searchsorted(profile.x, t0, side='left'), 1)
+        end = min(np.searchsorted(profile.x, t1, side='right'),
+                  len(profile.x)-1)
+        value += np.sum(profile.y[start:end])
+        multiplicity += np.sum(profile.mp[start:end])
+    return value, multiplicity
+
+
+############################################################
+# spike_train_order
+############################################################
+def spike_train_order(*args, **kwargs):
+    """ Computes the synfire indicator F of the given spike trains, i.e. the
+    overall spike train order: the sum of the spike train order profile
+    divided by the total number of spikes. F=1 if all coincidences follow
+    the order of the spike trains, F=-1 if they all follow the reverse order.
+
+    Valid call structures::
+
+      spike_train_order(st1, st2)  # returns the bi-variate value
+      spike_train_order(st1, st2, st3)  # multi-variate result
+
+      spike_trains = [st1, st2, st3, st4]  # list of spike trains
+      spike_train_order(spike_trains)  # value of the list of spike trains
+      spike_train_order(spike_trains, indices=[0, 1])
+
+    :returns: The synfire indicator F.
+    :rtype: double
+    """
+    if len(args) == 1:
+        return spike_train_order_multi(args[0], **kwargs)
+    elif len(args) == 2:
+        return spike_train_order_bi(args[0], args[1], **kwargs)
+    else:
+        return spike_train_order_multi(args, **kwargs)
+
+
+############################################################
+# spike_train_order_bi
+############################################################
+def spike_train_order_bi(spike_train1, spike_train2, normalize=True,
+                         interval=None, max_tau=None):
+    """ Computes the synfire indicator of two spike trains. Use
+    :func:`.spike_train_order` instead.
+
+    :param spike_train1: First spike train.
+    :type spike_train1: :class:`pyspike.SpikeTrain`
+    :param spike_train2: Second spike train.
+    :type spike_train2: :class:`pyspike.SpikeTrain`
+    :param normalize: Normalize by the number of spikes. If False, the summed
+                      spike train order values are returned.
+    :param interval: averaging interval given as a pair of floats (T0, T1),
+                     if `None` the average over the whole function is computed.
+    :type interval: Pair of floats or None.
+    :param max_tau: Maximum coincidence window size. If 0 or `None`, the
+                    coincidence window has no upper bound.
+    :returns: The synfire indicator F.
+    :rtype: double
+    """
+    profile = spike_train_order_profile_bi(spike_train1, spike_train2,
+                                           max_tau)
+    value, multiplicity = _spike_train_order_values(profile, interval)
+    if not normalize:
+        return value
+    return value/multiplicity if multiplicity > 0 else 0.0
+
+
+############################################################
+# spike_train_order_multi
+############################################################
+def spike_train_order_multi(spike_trains, indices=None, normalize=True,
+                            interval=None, max_tau=None):
+    """ Computes the synfire indicator of a set of spike trains. Use
+    :func:`.spike_train_order` instead. Without interval, the value is
+    obtained from the spike directionality matrix as
+    :math:`F = 2 \\sum_{n<m} D_{nm} / ((N-1) M)`, where M is the total
+    number of spikes.
+
+    :param spike_trains: list of :class:`pyspike.SpikeTrain`
+    :param indices: list of indices defining which spike trains to use,
+                    if None all given spike trains are used (default=None)
+    :type indices: list or None
+    :param normalize: Normalize by the number of spikes. If False, the summed
+                      spike train order values are returned.
+    :param interval: averaging interval given as a pair of floats, if None
+                     the average over the whole function is computed.
+    :type interval: Pair of floats or None.
+    :param max_tau: Maximum coincidence window size. If 0 or `None`, the
+                    coincidence window has no upper bound.
+    :returns: The synfire indicator F.
+    :rtype: double
+    """
+    if indices is None:
+        indices = np.arange(len(spike_trains))
+    indices = np.array(indices)
+    N = len(indices)
+    if interval is None:
+        D = spike_directionality_matrix(spike_trains, normalize=False,
+                                        indices=indices, max_tau=max_tau)
+        value = 2.0*np.sum(np.triu(D, 1))
+        multiplicity = (N-1)*np.sum([len(spike_trains[i].spikes)
+                                     for i in indices])
+    else:
+        value = 0.0
+        multiplicity = 0.0
+        for i in range(N):
+            for j in range(i+1, N):
+                v, m = _spike_train_order_values(
+                    spike_train_order_profile_bi(spike_trains[indices[i]],
+                                                 spike_trains[indices[j]],
+                                                 max_tau), interval)
+                value += v
+                multiplicity += m
+    if not normalize:
+        return value
+    return value/multiplicity if multiplicity > 0 else 0.0
+
+
+############################################################
+# optimal_spike_train_sorting
+############################################################
+def optimal_spike_train_sorting(spike_trains, indices=None, interval=None,
+                                max_tau=None, full_output=False, rng=None):
+    """ Finds the order of the spike trains that maximizes the synfire
+    indicator F, i.e. that puts leading spike trains before following ones.
+    For up to 10 spike trains, the optimal order is found exactly. For more
+    spike trains, the order is found heuristically by simulated annealing
+    on the spike directionality matrix, starting from the spike trains
+    sorted by their total directionality and followed by a local search
+    that moves single spike trains. This order is not guaranteed to be
+    optimal, finding it exactly is NP-hard. Use :func:`.permutate_matrix`
+    to apply the order to a matrix, or reorder the spike trains with it.
+
+    :param spike_trains: list of :class:`pyspike.SpikeTrain`
+    :param indices: list of indices defining which spike trains to use,
+                    if None all given spike trains are used (default=None)
+    :type indices: list or None
+    :param interval: If given, only the spikes within this interval are
+                     considered.
+    :type interval: Pair of floats or None.
+    :param max_tau: Maximum coincidence window size. If 0 or `None`, the
+                    coincidence window has no upper bound.
+    :param full_output: If True, additionally returns the synfire indicator
+                        of the optimal order and the number of iterations of
+                        the simulated annealing, which is 0 if the order was
+                        found exactly.
+    :param rng: The random number generator, e.g. a
+                :class:`numpy.random.Generator`, or a seed. If `None`, the
+                global random state of :mod:`numpy.random` is used.
+    :returns: array of the spike train indices in the optimal order, and
+              optionally the synfire indicator F and the number of iterations.
+    """
+    if indices is None:
+        indices = np.arange(len(spike_trains))
+    indices = np.array(indices)
+    N = len(indices)
+    D = spike_directionality_matrix(spike_trains, normalize=False,
+                                    indices=indices, interval=interval,
+                                    max_tau=max_tau)
+    p, A, iterations = _optimal_order_from_matrix(D, _get_rng(rng))
+
+    if full_output:
+        t_start = spike_trains[indices[0]].t_start
+        t_end = spike_trains[indices[0]].t_end
+        M = np.sum([np.sum(_in_interval(spike_trains[i].spikes, interval,
+                                        t_start, t_end)) for i in indices])
+        F = 2.0*A/((N-1)*M) if N > 1 and M > 0 else 0.0
+        return indices[p], F, iterations
+    return indices[p]
+
+
+def _optimal_order_from_matrix(D, rng, alpha=0.9, exact_max=10):
+    """ Internal implementation detail. Returns the permutation maximizing
+    the sum of the upper triangle of the antisymmetric matrix D, the value of
+    this sum, and the number of iterations of the simulated annealing. Up to
+    exact_max spike trains, the optimal permutation is found exactly and the
+    number of iterations is 0.
+    """
+    if len(D) <= exact_max:
+        p, A = _exact_order_from_matrix(D)
+        return p, A, 0
+    # start with the spike trains sorted by their overall leadership, the
+    # simulated annealing only needs to resolve the remaining conflicts
+    p_init = np.argsort(-np.sum(D, axis=1), kind='mergesort')
+    T_start = 2.0*np.max(np.abs(D)) if len(D) > 0 else 0.0
+    T_end = 1E-5 * T_start
+    simulated_annealing_impl = get_kernel("simulated_annealing")
+    p, A, iterations = simulated_annealing_impl(
+        np.ascontiguousarray(D, dtype=float), p_init.astype(np.intp),
+        T_start, T_end, alpha, rng)
+    # the annealing only swaps neighbours, moving single spike trains over
+    # larger distances resolves some of the remaining local optima
+    p, A = _improve_order_by_insertion(D, np.asarray(p), A)
+    return p, A, iterations
+
+
+def _exact_order_from_matrix(D):
+    """ Internal implementation detail. Finds the optimal permutation by
+    dynamic programming over the subsets of already placed spike trains,
+    which takes O(2^N N) operations.
+    """
+    D = np.asarray(D, dtype=float)
+    N = len(D)
+    n_sets = 1 << N
+    # placed_sums[S, j] = sum of D[j, i] over the placed spike trains i in S
+    placed_sums = np.zeros((n_sets, N))
+    for S in range(1, n_sets):
+        i = (S & -S).bit_length() - 1
+        placed_sums[S] = placed_sums[S & (S-1)] + D[:, i]
+    row_sums = np.sum(D, axis=1) - np.diag(D)
+    best = np.full(n_sets, -np.inf)
+    best[0] = 0.0
+    last = np.zeros(n_sets, dtype=np.intp)
+    for S in range(n_sets):
+        for j in range(N):
+            if S & (1 << j):
+                continue
+            # placing j next puts it before all spike trains not in S
+            A = best[S] + row_sums[j] - placed_sums[S, j]
+            if A > best[S | (1 << j)]:
+                best[S | (1 << j)] = A
+                last[S | (1 << j)] = j
+    p = np.empty(N, dtype=np.intp)
+    S = n_sets - 1
+    for n in range(N-1, -1, -1):
+        p[n] = last[S]
+        S ^= 1 << last[S]
+    return p, best[n_sets-1]
+
+
+def _improve_order_by_insertion(D, p, A):
+    """ Internal implementation detail. Moves single spike trains to other
+    positions as long as this increases the sum A of the upper triangle.
+    """
+    p = list(p)
+    N = len(p)
+    tol = 1E-12 * np.max(np.abs(D)) if N > 0 else 0.0
+    improved = True
+    while improved:
+        improved = False
+        for i in range(N):
+            row = D[p[i], p]
+            # gains of moving p[i] behind p[j] for j > i, and before p[j]
+            # for j < i
+            gains_after = -2.0*np.cumsum(row[i+1:])
+            gains_before = 2.0*np.cumsum(row[i-1::-1]) if i > 0 \
+                else np.zeros(0)
+            j_after = np.argmax(gains_after) if len(gains_after) > 0 else -1
+            j_before = np.argmax(gains_before) if i > 0 else -1
+            gain, j = 0.0, i
+            if j_after >= 0 and gains_after[j_after] > gain:
+                gain, j = gains_after[j_after], i+1+j_after
+            if j_before >= 0 and gains_before[j_before] > gain:
+                gain, j = gains_before[j_before], i-1-j_before
+            if gain > tol:
+                p.insert(j, p.pop(i))
+                A += gain
+                improved = True
+                break
+    return np.array(p, dtype=np.intp), A
+
+
+############################################################
+# permutate_matrix
+############################################################
+def permutate_matrix(D, p):
+    """ Applies the permutation p to the rows and columns of the matrix D.
+
+    :param D: 2D array, e.g. a spike directionality matrix.
+    :param p: permutation, e.g. from :func:`.optimal_spike_train_sorting`.
+    :returns: the permuted matrix :math:`D_{p_n, p_m}`
+    :rtype: np.array
+    """
+    p = np.asarray(p)
+    return np.asarray(D)[p][:, p]
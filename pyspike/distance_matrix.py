@@ -0,0 +1,476 @@
+# Module containing a distance matrix that is updated incrementally when
+# spike trains are added or removed, and the out-of-core computation of
+# distance matrices in memory mapped files
+# Copyright 2015, Mario Mulansky <mario.mulansky@gmx.net>
+# Distributed under the BSD License
+
+from __future__ import absolute_import
+
+import json
+import os
+
+import numpy as np
+from functools import partial
+from pyspike.isi_distance import isi_distance_matrix, isi_distance_cross
+from pyspike.spike_distance import spike_distance_matrix, \
+    spike_distance_cross
+from pyspike.spike_sync import spike_sync_matrix, spike_sync_cross
+from pyspike.generic import _generic_distance_matrix, _generic_distance_cross
+
+
+############################################################
+# _get_metric_functions
+############################################################
+def _get_metric_functions(metric, max_tau):
+    """ Internal implementation detail. Returns the cross and matrix
+    functions of the given metric, see DistanceMatrixBuilder.
+    """
+    if metric == "isi":
+        return isi_distance_cross, isi_distance_matrix
+    elif metric == "spike":
+        return spike_distance_cross, spike_distance_matrix
+    elif metric == "spike_sync":
+        return (partial(spike_sync_cross, max_tau=max_tau),
+                partial(spike_sync_matrix, max_tau=max_tau))
+    elif callable(metric):
+        return (partial(_generic_distance_cross, dist_function=metric),
+                partial(_generic_distance_matrix, dist_function=metric))
+    raise ValueError("Unknown metric: %s" % metric)
+
+
+############################################################
+# DistanceMatrixBuilder
+############################################################
+class DistanceMatrixBuilder(object):
+    """ Holds a set of spike trains together with the matrix of their pair
+    wise distances, and updates the matrix when spike trains are added or
+    removed. Adding k spike trains to a set of N spike trains only computes
+    the distances of the new pairs, i.e. k*N + k*(k-1)/2 values instead of the
+    full matrix. The matrix is stored in an array with spare capacity that is
+    enlarged by doubling, so repeatedly adding single spike trains has an
+    amortized copy cost of O(N) per spike train.
+
+    Example::
+
+      builder = DistanceMatrixBuilder("isi", spike_trains)
+      builder.add(new_spike_trains)
+      builder.remove([0, 3])
+      D = builder.matrix
+    """
+
+    def __init__(self, metric="isi", spike_trains=None, interval=None,
+                 max_tau=None, n_jobs=1):
+        """ Constructs the distance matrix builder.
+
+        :param metric: "isi", "spike" or "spike_sync" for the ISI-distance,
+                       SPIKE-distance or SPIKE-synchronization, or a function
+                       `f(spike_train1, spike_train2, interval)` returning the
+                       distance of two spike trains.
+        :param spike_trains: initial list of :class:`.SpikeTrain`, optional.
+        :param interval: averaging interval given as a pair of floats, if None
+                         the average over the whole function is computed.
+        :type interval: Pair of floats or None.
+        :param max_tau: Maximum coincidence window size for the
+                        SPIKE-synchronization. If 0 or `None`, the coincidence
+                        window has no upper bound.
+        :param n_jobs: number of threads (Cython backend) or processes used
+                       to compute the distances of the new spike trains,
+                       -1 uses all available cpus.
+        """
+        self._cross_function, self._matrix_function = \
+            _get_metric_functions(metric, max_tau)
+        self.metric = metric
+        self.interval = interval
+        self.n_jobs = n_jobs
+        self._spike_trains = []
+        self._data = np.zeros((0, 0))
+        if spike_trains is not None:
+            self.add(spike_trains)
+
+    def __len__(self):
+        return len(self._spike_trains)
+
+    @property
+    def spike_trains(self):
+        """ The list of the current spike trains, in the order of the rows of
+        the matrix.
+        """
+        return list(self._spike_trains)
+
+    @property
+    def matrix(self):
+        """ The current distance matrix as a read-only view of the internal
+        storage. The view is only valid until the next call of :meth:`add` or
+        :meth:`remove`, copy it to keep the values.
+        """
+        N = len(self._spike_trains)
+        view = self._data[:N, :N]
+        view.flags.writeable = False
+        return view
+
+    def _reserve(self, n):
+        """ Enlarges the storage to hold at least n spike trains, at least
+        doubling the capacity to amortize the copies.
+        """
+        capacity = self._data.shape[0]
+        if n <= capacity:
+            return
+        N = len(self._spike_trains)
+        data = np.zeros((max(n, 2*capacity), max(n, 2*capacity)))
+        data[:N, :N] = self._data[:N, :N]
+        self._data = data
+
+    def add(self, spike_trains):
+        """ Adds the spike trains and computes their distances to all
+        current spike trains and among each other.
+
+        :param spike_trains: list of :class:`.SpikeTrain`
+        :returns: the row indices of the added spike trains.
+        :rtype: np.array
+        """
+        new_trains = list(spike_trains)
+        N = len(self._spike_trains)
+        k = len(new_trains)
+        if k == 0:
+            return np.arange(N, N)
+        if N > 0:
+            t_start = self._spike_trains[0].t_start
+            t_end = self._spike_trains[0].t_end
+        else:
+            t_start = new_trains[0].t_start
+            t_end = new_trains[0].t_end
+        for st in new_trains:
+            assert st.t_start == t_start and st.t_end == t_end, \
+                "Given spike trains are not defined on the same interval!"
+
+        self._reserve(N+k)
+        if N > 0:
+            # the distances of the new spike trains to the existing ones
+            cross = self._cross_function(self._spike_trains, new_trains,
+                                         interval=self.interval,
+                                         n_jobs=self.n_jobs)
+            self._data[:N, N:N+k] = cross
+            self._data[N:N+k, :N] = cross.T
+        # the distances among the new spike trains
+        self._data[N:N+k, N:N+k] = self._matrix_function(
+            new_trains, interval=self.interval, n_jobs=self.n_jobs)
+        self._spike_trains.extend(new_trains)
+        return np.arange(N, N+k)
+
+    def remove(self, indices):
+        """ Removes the spike trains with the given row indices. The remaining
+        spike trains keep their order, their rows and columns are moved up.
+
+        :param indices: row indices of the spike trains to remove.
+        """
+        N = len(self._spike_trains)
+        indices = np.atleast_1d(np.asarray(indices, dtype=int))
+        assert ((indices < N) & (indices >= -N)).all(), "Invalid index list."
+        keep = np.ones(N, dtype=bool)
+        keep[indices] = False
+        rows = np.nonzero(keep)[0]
+        n = len(rows)
+        self._data[:n, :n] = self._data[np.ix_(rows, rows)]
+        self._spike_trains = [self._spike_trains[i] for i in rows]
+
+
+############################################################
+# distance_matrix_memmap
+############################################################
+def _index_filename(filename):
+    """ Internal implementation detail. Returns the name of the sidecar index
+    of the memory mapped matrix.
+    """
+    return filename + ".index"
+
+
+def _write_index(filename, index):
+    """ Internal implementation detail. Writes the sidecar index atomically,
+    such that an interruption never leaves a corrupted index behind.
+    """
+    tmp_filename = _index_filename(filename) + ".tmp"
+    with open(tmp_filename, "w") as f:
+        json.dump(index, f)
+    try:
+        os.replace(tmp_filename, _index_filename(filename))
+    except AttributeError:  # python < 3.3
+        # os.rename replaces the index atomically on posix systems only
+        if os.name == "nt" and os.path.exists(_index_filename(filename)):
+            os.remove(_index_filename(filename))
+        os.rename(tmp_filename, _index_filename(filename))
+
+
+def distance_matrix_memmap(spike_trains, filename, metric="isi",
+                           tile_size=1024, interval=None, max_tau=None,
+                           n_jobs=1, dtype=np.float64, resume=True):
+    """ Computes the distance matrix of the spike trains out of core: the
+    matrix is stored in the file `filename` and computed in square tiles of
+    `tile_size` x `tile_size` spike trains, so only one tile is kept in
+    memory. After each tile, the file is flushed and the tile is recorded
+    as done in the small sidecar index `filename + ".index"`. If the
+    computation is interrupted, calling this function again with the same
+    arguments resumes after the last completed tile.
+
+    :param spike_trains: list of :class:`.SpikeTrain`
+    :param filename: name of the file holding the N x N matrix.
+    :param metric: "isi", "spike" or "spike_sync", or a distance function,
+                   see :class:`.DistanceMatrixBuilder`.
+    :param tile_size: number of spike trains per tile.
+    :param interval: averaging interval given as a pair of floats, if None
+                     the average over the whole function is computed.
+    :type interval: Pair of floats or None.
+    :param max_tau: Maximum coincidence window size for the
+                    SPIKE-synchronization. If 0 or `None`, the coincidence
+                    window has no upper bound.
+    :param n_jobs: number of threads (Cython backend) or processes used to
+                   compute each tile, -1 uses all available cpus.
+    :param dtype: float type of the stored matrix, `np.float64` or
+                  `np.float32`.
+    :param resume: if True, the tiles completed by a previous call are
+                   kept. A ValueError is raised if that call used different
+                   parameters. If False, an existing file is overwritten.
+    :returns: the matrix opened read-only, see :func:`.load_distance_matrix`
+    :rtype: np.memmap
+    """
+    cross_function, matrix_function = _get_metric_functions(metric, max_tau)
+    N = len(spike_trains)
+    dtype = np.dtype(dtype)
+    # parameters that have to match when resuming
+    parameters = {"N": N, "tile_size": int(tile_size), "dtype": dtype.str,
+                  "metric": metric if not callable(metric)
+                  else getattr(metric, "__name__", repr(metric)),
+                  "interval": None if interval is None
+                  else np.asarray(interval, dtype=float).tolist(),
+                  "max_tau": max_tau,
+                  "spike_counts": [len(st.spikes) for st in spike_trains]}
+
+    done = set()
+    if resume and os.path.exists(filename) and \
+            os.path.exists(_index_filename(filename)):
+        with open(_index_filename(filename)) as f:
+            index = json.load(f)
+        if index["parameters"] != parameters:
+            raise ValueError("The existing file %s was computed with "
+                             "different parameters." % filename)
+        done = set(tuple(tile) for tile in index["done"])
+        matrix = np.memmap(filename, dtype=dtype, mode="r+", shape=(N, N))
+    else:
+        matrix = np.memmap(filename, dtype=dtype, mode="w+", shape=(N, N))
+        index = {"parameters": parameters, "done": [], "complete": False}
+        _write_index(filename, index)
+
+    bounds = list(range(0, N, tile_size)) + [N]
+    n_tiles = len(bounds)-1
+    tiles = [[spike_trains[i] for i in range(bounds[I], bounds[I+1])]
+             for I in range(n_tiles)]
+    for I in range(n_tiles):
+        for J in range(I, n_tiles):
+            if (I, J) in done:
+                continue
+            if I == J:
+                tile = matrix_function(tiles[I], interval=interval,
+                                       n_jobs=n_jobs)
+            else:
+                tile = cross_function(tiles[I], tiles[J], interval=interval,
+                                      n_jobs=n_jobs)
+            matrix[bounds[I]:bounds[I+1], bounds[J]:bounds[J+1]] = tile
+            matrix[bounds[J]:bounds[J+1], bounds[I]:bounds[I+1]] = tile.T
+            # record the tile only after it is written to the file
+            matrix.flush()
+            index["done"].append([I, J])
+            _write_index(filename, index)
+
+    index["complete"] = True
+    _write_index(filename, index)
+    del matrix
+    return load_distance_matrix(filename)
+
+
+############################################################
+# load_distance_matrix
+############################################################
+def load_distance_matrix(filename):
+    """ Opens a distance matrix computed by :func:`.distance_matrix_memmap`
+    as a read-only memory mapped array, such that the values are only loaded
+    from the file when they are accessed.
+
+    :param filename: name of the file holding the matrix.
+    :returns: the distance matrix
+    :rtype: np.memmap
+    """
+    with open(_index_filename(filename)) as f:
+        index = json.load(f)
+    if not index["complete"]:
+        raise ValueError("The computation of %s is not complete, resume it "
+                         "with distance_matrix_memmap." % filename)
+    parameters = index["parameters"]
+    N = parameters["N"]
+    return np.memmap(filename, dtype=np.dtype(parameters["dtype"]), mode="r",
+                     shape=(N, N))
+
+
+############################################################
+# sparse_distance_matrix
+############################################################
+def _max_spike_sync(counts_a, counts_b):
+    """ Internal implementation detail. Returns the upper bound of the
+    SPIKE-synchronization of all pairs of spike trains with the spike counts
+    in the ranges of counts_a and counts_b: at most 2*min(n1, n2) of the
+    n1+n2 spikes can be coincident, which is largest for the most similar
+    spike counts. Two empty spike trains have SPIKE-synchronization 1.
+    """
+    lo_a, hi_a = np.min(counts_a), np.max(counts_a)
+    lo_b, hi_b = np.min(counts_b), np.max(counts_b)
+    if lo_a <= hi_b and lo_b <= hi_a:
+        # overlapping ranges: equal spike counts are possible
+        return 1.0
+    n1, n2 = (hi_a, lo_b) if hi_a < lo_b else (hi_b, lo_a)
+    return 2.0*n1/(n1+n2)
+
+
+def _merge_nearest(best_keys, best_cols, keys, cols, k):
+    """ Internal implementation detail. Merges the candidate keys of each
+    row into the k smallest keys found so far.
+    """
+    keys = np.concatenate([best_keys, keys], axis=1)
+    cols = np.concatenate([best_cols, np.tile(cols, (len(keys), 1))],
+                          axis=1)
+    select = np.argpartition(keys, k-1, axis=1)[:, :k]
+    rows = np.arange(len(keys))[:, None]
+    return keys[rows, select], cols[rows, select]
+
+
+def sparse_distance_matrix(spike_trains, metric="spike_sync", k=None,
+                           threshold=None, tile_size=1024, interval=None,
+                           max_tau=None, n_jobs=1, prefilter=True,
+                           format="coo"):
+    """ Computes the sparse matrix of the closest pairs of spike trains: the
+    k nearest neighbors of each spike train, and/or all pairs within the
+    threshold. For the SPIKE-synchronization, larger values are closer and
+    the threshold is a lower bound, for the distances smaller values are
+    closer and the threshold is an upper bound. The matrix is computed in
+    square tiles of `tile_size` spike trains, using the symmetry, so the
+    memory consumption is O(tile_size^2 + N*k) plus the retained pairs.
+
+    For a SPIKE-synchronization threshold over the whole interval, the spike
+    trains are sorted by their number of spikes and tiles are skipped if
+    none of their pairs can reach the threshold: at most 2*min(n1, n2) of
+    the n1+n2 spikes of a pair can be coincident, so spike trains with very
+    different spike counts, i.e. firing rates, can not be synchronous. This
+    prefilter is exact. It is not applied for averaging intervals, where
+    the spikes within the interval can coincide with spikes outside.
+
+    :param spike_trains: list of :class:`.SpikeTrain`
+    :param metric: "isi", "spike" or "spike_sync", or a distance function,
+                   see :class:`.DistanceMatrixBuilder`.
+    :param k: number of nearest neighbors retained for each spike train, or
+              None to retain all pairs within the threshold.
+    :param threshold: only pairs with values within the threshold are
+                      retained, or all pairs if None.
+    :param tile_size: number of spike trains per tile.
+    :param interval: averaging interval given as a pair of floats, if None
+                     the average over the whole function is computed.
+    :type interval: Pair of floats or None.
+    :param max_tau: Maximum coincidence window size for the
+                    SPIKE-synchronization. If 0 or `None`, the coincidence
+                    window has no upper bound.
+    :param n_jobs: number of threads (Cython backend) or processes used to
+                   compute each tile, -1 uses all available cpus.
+    :param prefilter: skip the tiles that can not reach a
+                      SPIKE-synchronization threshold, see above.
+    :param format: "coo" to return the triplets (rows, cols, values), sorted
+                   by rows and columns, or "csr" to return the compressed
+                   sparse rows (values, cols, indptr). Both can be passed to
+                   the constructors of :mod:`scipy.sparse` matrices.
+    :returns: the retained pairs in the given format. With a threshold only,
+              the result is symmetric. The k nearest neighbors of a spike
+              train are stored in its row.
+    :rtype: tuple of np.array
+    """
+    if k is None and threshold is None:
+        raise ValueError("Either k or threshold has to be given.")
+    if format not in ("coo", "csr"):
+        raise ValueError("Unknown format: %s" % format)
+    cross_function, matrix_function = _get_metric_functions(metric, max_tau)
+    N = len(spike_trains)
+    # the values are converted to keys where smaller means closer
+    sign = -1.0 if metric == "spike_sync" else 1.0
+    max_key = np.inf if threshold is None else sign*threshold
+    if k is not None:
+        k = min(k, N-1)
+
+    if prefilter and metric == "spike_sync" and threshold is not None and \
+            interval is None:
+        counts = np.array([len(st.spikes) for st in spike_trains])
+        order = np.argsort(counts, kind='mergesort')
+    else:
+        counts = None
+        order = np.arange(N)
+    bounds = list(range(0, N, tile_size)) + [N]
+    n_tiles = len(bounds)-1
+    tiles = [order[bounds[I]:bounds[I+1]] for I in range(n_tiles)]
+
+    if k is not None and k > 0:
+        best_keys = np.full((N, k), np.inf)
+        best_cols = np.zeros((N, k), dtype=np.intp)
+    rows, cols, keys = [], [], []
+    for I in range(n_tiles):
+        trains_I = [spike_trains[i] for i in tiles[I]]
+        for J in range(I, n_tiles):
+            if counts is not None and \
+                    _max_spike_sync(counts[tiles[I]], counts[tiles[J]]) < \
+                    threshold:
+                continue
+            if I == J:
+                tile = matrix_function(trains_I, interval=interval,
+                                       n_jobs=n_jobs)
+            else:
+                tile = cross_function(trains_I,
+                                      [spike_trains[j] for j in tiles[J]],
+                                      interval=interval, n_jobs=n_jobs)
+            tile_keys = sign*np.asarray(tile, dtype=float)
+            tile_keys[tile_keys > max_key] = np.inf
+            if I == J:
+                np.fill_diagonal(tile_keys, np.inf)
+            if k is None:
+                # all pairs within the threshold, the lower triangle of the
+                # diagonal tiles is given by the upper one
+                if I == J:
+                    tile_keys[np.tril_indices(len(tiles[I]))] = np.inf
+                i, j = np.nonzero(tile_keys < np.inf)
+                rows.append(tiles[I][i])
+                cols.append(tiles[J][j])
+                keys.append(tile_keys[i, j])
+            elif k > 0:
+                best_keys[tiles[I]], best_cols[tiles[I]] = _merge_nearest(
+                    best_keys[tiles[I]], best_cols[tiles[I]], tile_keys,
+                    tiles[J], k)
+                if I != J:
+                    best_keys[tiles[J]], best_cols[tiles[J]] = \
+                        _merge_nearest(best_keys[tiles[J]],
+                                       best_cols[tiles[J]], tile_keys.T,
+                                       tiles[I], k)
+
+    if k is None:
+        rows = np.concatenate(rows + [np.zeros(0, dtype=np.intp)])
+        cols = np.concatenate(cols + [np.zeros(0, dtype=np.intp)])
+        keys = np.concatenate(keys + [np.zeros(0)])
+        rows, cols, keys = (np.concatenate([rows, cols]),
+                            np.concatenate([cols, rows]),
+                            np.concatenate([keys, keys]))
+    elif k > 0:
+        found = best_keys < np.inf
+        rows = np.repeat(np.arange(N), np.sum(found, axis=1))
+        cols = best_cols[found]
+        keys = best_keys[found]
+    else:
+        rows = cols = np.zeros(0, dtype=np.intp)
+        keys = np.zeros(0)
+
+    sort = np.lexsort((cols, rows))
+    rows, cols, values = rows[sort], cols[sort], sign*keys[sort]
+    if format == "coo":
+        return rows, cols, values
+    indptr = np.zeros(N+1, dtype=np.intp)
+    indptr[1:] = np.cumsum(np.bincount(rows, minlength=N))
+    return values, cols, indptr
@@ -9,8 +9,120 @@ Distributed under the BSD License
 
 from __future__ import division
 
+import math
+import multiprocessing
+import sys
+
 import numpy as np
 
+from pyspike import PieceWiseConstFunc, PieceWiseLinFunc, SpikeTrainSet
+from pyspike.spikes import _get_rng
+
+
+############################################################
+# _cumsum_compensated
+############################################################
+def _cumsum_compensated(values):
+    """ Internal implementation detail. Computes the cumulative sum of the
+    given values, where the rounding errors of the sequential summation are
+    computed exactly (TwoSum) and added back. This keeps the result accurate
+    even if large values cancel each other, e.g. slopes of short intervals.
+    """
+    s = np.cumsum(values)
+    prev = s[:-1]
+    b = values[1:]
+    curr = s[1:]
+    bb = curr - prev
+    errors = (prev - (curr - bb)) + (b - bb)
+    s[1:] += np.cumsum(errors)
+    return s
+
+
+############################################################
+# _sum_piece_wise_const
+############################################################
+def _sum_piece_wise_const(x_grid, profiles):
+    """ Internal implementation detail. Computes the sum of the given
+    piece-wise constant profiles on the grid `x_grid`, which has to contain
+    all x-values of the profiles. The profiles are merged in one pass: every
+    x-value is turned into an event with the change of the function value,
+    the events are merged by a stable sort and summed up cumulatively.
+    Returns the y-values of the sum on the intervals of `x_grid`.
+    """
+    keys = []
+    deltas = []
+    for f in profiles:
+        ind = np.searchsorted(x_grid, f.x[:-1])
+        assert np.all(x_grid[ind] == f.x[:-1]), "Invalid profile grid"
+        keys.append(ind)
+        delta = np.empty(len(f.y))
+        delta[0] = f.y[0]
+        delta[1:] = f.y[1:] - f.y[:-1]
+        deltas.append(delta)
+    keys = np.concatenate(keys)
+    order = np.argsort(keys, kind='mergesort')
+    values = _cumsum_compensated(np.concatenate(deltas)[order])
+    # the value on each interval is given by the last event at its start
+    last = np.searchsorted(keys[order], np.arange(len(x_grid)-1),
+                           side='right') - 1
+    return values[last]
+
+
+############################################################
+# _sum_piece_wise_lin
+############################################################
+def _sum_piece_wise_lin(x_grid, profiles):
+    """ Internal implementation detail. Computes the sum of the given
+    piece-wise linear profiles on the grid `x_grid`, which has to contain all
+    x-values of the profiles. As in _sum_piece_wise_const, the changes of the
+    slopes and the jumps of the function values at the x-values are merged
+    and summed up cumulatively.
+    Returns the y1- and y2-values of the sum on the intervals of `x_grid`.
+    """
+    M = len(x_grid)-1
+    slope_keys = []
+    slope_deltas = []
+    jump_keys = []
+    jumps = []
+    for f in profiles:
+        ind = np.searchsorted(x_grid, f.x)
+        assert np.all(x_grid[ind] == f.x), "Invalid profile grid"
+        dx = f.x[1:] - f.x[:-1]
+        # intervals of zero length don't have a slope, but their value
+        # change is added as an additional jump
+        zero = dx == 0.0
+        dx[zero] = 1.0
+        slope = np.where(zero, 0.0, (f.y2-f.y1) / dx)
+        delta = np.empty(len(slope))
+        delta[0] = slope[0]
+        delta[1:] = slope[1:] - slope[:-1]
+        slope_keys.append(ind[:-1])
+        slope_deltas.append(delta)
+        jump = np.empty(len(f.y1))
+        jump[0] = f.y1[0]
+        jump[1:] = f.y1[1:] - f.y2[:-1]
+        jump_keys.append(ind[:-1])
+        jumps.append(jump)
+        jump_keys.append(ind[:-1][zero])
+        jumps.append((f.y2-f.y1)[zero])
+
+    # sum of the slopes on each interval
+    keys = np.concatenate(slope_keys)
+    order = np.argsort(keys, kind='mergesort')
+    slopes = _cumsum_compensated(np.concatenate(slope_deltas)[order])
+    last = np.searchsorted(keys[order], np.arange(M), side='right') - 1
+    increments = slopes[last] * (x_grid[1:] - x_grid[:-1])
+
+    # the value at the start of each interval is the sum of all jumps and
+    # all increments of the previous intervals, merge both event types
+    keys = np.concatenate(jump_keys + [np.arange(1, M)])
+    order = np.argsort(keys, kind='mergesort')
+    values = _cumsum_compensated(
+        np.concatenate(jumps + [increments[:-1]])[order])
+    last = np.searchsorted(keys[order], np.arange(M), side='right') - 1
+    y1 = values[last]
+    return y1, y1 + increments
+
 
 ############################################################
 # _generic_profile_multi
@@ -24,13 +136,16 @@ def _generic_profile_multi(spike_trains, pair_distance_func, indices=None):
     average distance of all pairs of spike-trains:
     :math:`S(t) = 2/((N(N-1)) sum_{<i,j>} S_{i,j}`,
     where the sum goes over all pairs <i,j>.
+    Piece-wise constant and piece-wise linear profiles are summed by merging
+    all pair profiles onto the grid of all spike events at once, other
+    profiles are added recursively.
     Args:
     - spike_trains: list of spike trains
     - pair_distance_func: function computing the distance of two spike trains
     - indices: list of indices defining which spike trains to use,
     if None all given spike trains are used (default=None)
     Returns:
-    - The averaged multi-variate distance of all pairs
+    - The summed multi-variate distance of all pairs and the number of pairs
     """
 
     def divide_and_conquer(pairs1, pairs2):
@@ -64,15 +179,50 @@ def _generic_profile_multi(spike_trains, pair_distance_func, indices=None):
              for j in indices[i+1:]]
 
     L = len(pairs)
-    if L > 1:
+    first_dist = pair_distance_func(spike_trains[pairs[0][0]],
+                                    spike_trains[pairs[0][1]])
+    if L == 1:
+        return first_dist, L
+
+    if not isinstance(first_dist, (PieceWiseConstFunc, PieceWiseLinFunc)):
         # recursive iteration through the list of pairs to get average profile
-        avrg_dist = divide_and_conquer(pairs[:len(pairs)//2],
-                                       pairs[len(pairs)//2:])
+        return divide_and_conquer(pairs[:len(pairs)//2],
+                                  pairs[len(pairs)//2:]), L
+
+    # the x-values of the summed profile are all spike events
+    t_start = first_dist.x[0]
+    t_end = first_dist.x[-1]
+    x_grid = np.unique(np.concatenate(
+        [spike_trains[i].spikes for i in indices] + [[t_start, t_end]]))
+    # the profiles are processed in batches to limit the memory consumption
+    batch_size = max(len(x_grid), 100000)
+    if isinstance(first_dist, PieceWiseConstFunc):
+        y = np.zeros(len(x_grid)-1)
     else:
-        avrg_dist = pair_distance_func(spike_trains[pairs[0][0]],
-                                       spike_trains[pairs[0][1]])
+        y1 = np.zeros(len(x_grid)-1)
+        y2 = np.zeros(len(x_grid)-1)
+    batch = [first_dist]
+    batch_len = len(first_dist.x)
+    for n in range(1, L+1):
+        if n < L:
+            dist = pair_distance_func(spike_trains[pairs[n][0]],
+                                      spike_trains[pairs[n][1]])
+            batch.append(dist)
+            batch_len += len(dist.x)
+        if batch_len >= batch_size or n == L:
+            if isinstance(first_dist, PieceWiseConstFunc):
+                y += _sum_piece_wise_const(x_grid, batch)
+            else:
+                batch_y1, batch_y2 = _sum_piece_wise_lin(x_grid, batch)
+                y1 += batch_y1
+                y2 += batch_y2
+            batch = []
+            batch_len = 0
 
-    return avrg_dist, L
+    if isinstance(first_dist, PieceWiseConstFunc):
+        return PieceWiseConstFunc(x_grid, y), L
+    else:
+        return PieceWiseLinFunc(x_grid, y1, y2), L
 
 
 ############################################################
@@ -115,11 +265,242 @@ def _generic_distance_multi(spike_trains, pair_distance_func,
     return avrg_dist/len(pairs)
 
 
+############################################################
+# _approx_distance_multi
+############################################################
+def _approx_distance_multi(spike_trains, pair_values_func, indices=None,
+                           n_samples=1000, target_se=None, confidence=0.95,
+                           rng=None, ratio=False):
+    """ Internal implementation detail, don't call this function directly,
+    use the multivariate distance functions with approx=True instead.
+
+    Estimates the multi-variate value of a set of spike-trains from randomly
+    sampled pairs, drawn uniformly with replacement. If target_se is given,
+    further batches of n_samples pairs are drawn until the standard error of
+    the estimate is at most target_se, or the number of samples reaches the
+    number of pairs. If there are no more pairs than samples, the exact value
+    is computed.
+    Args:
+    - spike_trains: list of spike trains
+    - pair_values_func: function computing the value of two spike trains, or
+    the pair of summands (numerator, denominator) if ratio is True
+    - indices: list of indices defining which spike trains to use,
+    if None all given spike trains are used (default=None)
+    - n_samples: number of pairs per batch (default=1000)
+    - target_se: standard error at which the sampling stops (default=None)
+    - confidence: confidence level of the interval (default=0.95)
+    - rng: random number generator or seed (default=None)
+    - ratio: if True, the value is the ratio of the sums of numerators and
+    denominators, as for the SPIKE-synchronization (default=False)
+    Returns:
+    - the estimate and the confidence interval (lower, upper), based on the
+    normal approximation with the standard error of the mean or, for ratios,
+    the delta method
+    """
+    if indices is None:
+        indices = np.arange(len(spike_trains))
+    indices = np.array(indices)
+    # check validity of indices
+    assert (indices < len(spike_trains)).all() and (indices >= 0).all(), \
+        "Invalid index list."
+    N = len(indices)
+    L = N*(N-1)//2
+    assert L > 0, "At least two spike trains are required."
+    if L <= n_samples:
+        # fewer pairs than samples: compute the exact value
+        i, j = _pair_block(N, 0, L)
+        values = np.array([pair_values_func(spike_trains[indices[i[k]]],
+                                            spike_trains[indices[j[k]]])
+                           for k in range(L)])
+        if ratio:
+            value = np.sum(values[:, 0]) / np.sum(values[:, 1])
+        else:
+            value = np.mean(values)
+        return value, (value, value)
+
+    rng = _get_rng(rng)
+    values = np.zeros((0, 2) if ratio else 0)
+    while True:
+        # uniform linear pair indices, which works for the global random
+        # state of numpy and for Generators
+        k = np.minimum((rng.random(n_samples)*L).astype(np.int64), L-1)
+        i, j = _pair_indices(N, k)
+        batch = np.array([pair_values_func(spike_trains[indices[i[n]]],
+                                           spike_trains[indices[j[n]]])
+                          for n in range(n_samples)])
+        values = np.concatenate([values, batch])
+        n = len(values)
+        if ratio:
+            c, m = values[:, 0], values[:, 1]
+            value = np.sum(c) / np.sum(m)
+            # delta method for the ratio of the means
+            se = np.std(c - value*m, ddof=1) / (np.mean(m) * np.sqrt(n))
+        else:
+            value = np.mean(values)
+            se = np.std(values, ddof=1) / np.sqrt(n)
+        if target_se is None or se <= target_se or n >= L:
+            break
+    z = _normal_quantile(0.5 + 0.5*confidence)
+    return value, (value - z*se, value + z*se)
+
+
+############################################################
+# _normal_quantile
+############################################################
+def _normal_quantile(p):
+    """ Internal implementation detail. Returns the p-quantile of the
+    standard normal distribution.
+    """
+    try:
+        from statistics import NormalDist
+    except ImportError:  # python < 3.8
+        # bisection of the cumulative distribution function
+        lo, hi = -40.0, 40.0
+        for _ in range(100):
+            mid = 0.5*(lo+hi)
+            if 0.5*(1.0+math.erf(mid/math.sqrt(2.0))) < p:
+                lo = mid
+            else:
+                hi = mid
+        return 0.5*(lo+hi)
+    return NormalDist().inv_cdf(p)
+
+
+############################################################
+# _flatten_spike_trains
+############################################################
+def _flatten_spike_trains(spike_trains, indices=None, non_empty=True):
+    """ Internal implementation detail. Concatenates the spike times of the
+    given spike trains into one flat array as required by the all-pairs
+    kernels.
+    Args:
+    - spike_trains: list of spike trains or SpikeTrainSet
+    - indices: list of indices defining which spike trains to use,
+    if None all given spike trains are used (default=None)
+    - non_empty: if True, empty spike trains are replaced by their auxiliary
+    spikes, see SpikeTrain.get_spikes_non_empty (default=True)
+    Returns:
+    - spikes: flat array of all spike times
+    - offsets: array of len(indices)+1 entries such that the n-th spike train
+    is given by spikes[offsets[n]:offsets[n+1]]
+    """
+    if isinstance(spike_trains, SpikeTrainSet):
+        # the data is already stored in the required format
+        if non_empty:
+            spikes, offsets = spike_trains.get_spikes_non_empty()
+        else:
+            spikes, offsets = spike_trains.spikes, spike_trains.offsets
+        if indices is None:
+            return spikes, offsets
+        indices = np.array(indices)
+        assert (indices < len(offsets)-1).all() and (indices >= 0).all(), \
+            "Invalid index list."
+        # use only the given spike trains
+        trains = [spikes[offsets[i]:offsets[i+1]] for i in indices]
+    else:
+        if indices is None:
+            indices = np.arange(len(spike_trains))
+        indices = np.array(indices)
+        # check validity of indices
+        assert (indices < len(spike_trains)).all() and \
+            (indices >= 0).all(), "Invalid index list."
+        if non_empty:
+            trains = [spike_trains[i].get_spikes_non_empty()
+                      for i in indices]
+        else:
+            trains = [spike_trains[i].spikes for i in indices]
+    offsets = np.zeros(len(trains)+1, dtype=np.intp)
+    offsets[1:] = np.cumsum([len(t) for t in trains])
+    if len(trains) > 0:
+        spikes = np.concatenate(trains).astype(float)
+    else:
+        spikes = np.empty(0)
+    return spikes, offsets
+
+
+############################################################
+# _pair_block
+############################################################
+def _pair_block(n, start, stop):
+    """ Internal implementation detail. Returns the row and column indices of
+    the pairs `start`, ..., `stop-1` of the upper triangle (without diagonal)
+    of an n x n matrix, enumerated row by row.
+    """
+    return _pair_indices(n, np.arange(start, stop))
+
+
+def _pair_indices(n, k):
+    """ Internal implementation detail. Returns the row and column indices of
+    the pairs with the linear indices k of the upper triangle (without
+    diagonal) of an n x n matrix, enumerated row by row.
+    """
+    rows = np.arange(n-1)
+    # linear index of the first pair in each row
+    row_offsets = rows*n - rows*(rows+1)//2
+    i = np.searchsorted(row_offsets, k, side='right') - 1
+    j = k - row_offsets[i] + i + 1
+    return i, j
+
+
+############################################################
+# _matrix_worker
+############################################################
+# spike trains and distance function of the worker processes, set once per
+# process by _init_matrix_worker to avoid pickling the data for every pair
+_worker_state = None
+
+
+def _init_matrix_worker(spike_trains, dist_function, interval):
+    """ Internal implementation detail. Initializer of the worker processes.
+    """
+    global _worker_state
+    _worker_state = (spike_trains, dist_function, interval)
+
+
+def _matrix_worker(block):
+    """ Internal implementation detail. Computes the distances of the pairs in
+    the given block (n, start, stop) inside a worker process.
+    """
+    spike_trains, dist_function, interval = _worker_state
+    n, start, stop = block
+    i, j = _pair_block(n, start, stop)
+    return np.array([dist_function(spike_trains[i[k]], spike_trains[j[k]],
+                                   interval)
+                     for k in range(len(i))])
+
+
+def _get_n_jobs(n_jobs):
+    """ Internal implementation detail. Returns the number of worker processes
+    for the given `n_jobs` parameter: None or 1 means serial, values < 0 count
+    backwards from the number of cpus (-1 = all cpus).
+    """
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        n_jobs = max(1, multiprocessing.cpu_count() + 1 + n_jobs)
+    return n_jobs
+
+
+def _get_pool(n_jobs, initializer, initargs):
+    """ Internal implementation detail. Starts the worker processes. Once
+    numba has started its worker threads, e.g. in a parallel kernel, forking
+    the process can deadlock, so the workers are then started from a fork
+    server instead, which requires the initializer arguments to be picklable.
+    """
+    if "numba" in sys.modules and hasattr(multiprocessing, "get_context"):
+        methods = multiprocessing.get_all_start_methods()
+        method = "forkserver" if "forkserver" in methods else "spawn"
+        return multiprocessing.get_context(method).Pool(n_jobs, initializer,
+                                                        initargs)
+    return multiprocessing.Pool(n_jobs, initializer, initargs)
+
+
 ############################################################
 # generic_distance_matrix
 ############################################################
 def _generic_distance_matrix(spike_trains, dist_function,
-                             indices=None, interval=None):
+                             indices=None, interval=None, n_jobs=1,
+                             condensed=False, dtype=np.float64):
     """ Internal implementation detail. Don't use this function directly.
     Instead use isi_distance_matrix or spike_distance_matrix.
     Computes the time averaged distance of all pairs of spike-trains.
@@ -127,9 +508,16 @@ def _generic_distance_matrix(spike_trains, dist_function,
     - spike_trains: list of spike trains
     - indices: list of indices defining which spike-trains to use
     if None all given spike-trains are used (default=None)
+    - n_jobs: number of worker processes, the upper triangle is split into
+    blocks of equal numbers of pairs that are computed in parallel. 1 or None
+    means serial computation, -1 uses all cpus (default=1)
+    - condensed: if True, only the upper triangle is returned as a 1D array
+    in the layout of scipy.spatial.distance.pdist (default=False)
+    - dtype: float type of the result (default=np.float64)
     Return:
     - a 2D array of size len(indices)*len(indices) containing the average
-    pair-wise distance
+    pair-wise distance, or a 1D array of its len(indices)*(len(indices)-1)/2
+    upper triangle values if condensed is True
     """
     if indices is None:
         indices = np.arange(len(spike_trains))
@@ -137,14 +525,198 @@ def _generic_distance_matrix(spike_trains, dist_function,
     # check validity of indices
     assert (indices < len(spike_trains)).all() and (indices >= 0).all(), \
         "Invalid index list."
+    n_jobs = _get_n_jobs(n_jobs)
+    N = len(indices)
+
+    L = N*(N-1)//2
+    if condensed:
+        distance_matrix = np.zeros(L, dtype=dtype)
+    else:
+        distance_matrix = np.zeros((N, N), dtype=dtype)
+    if n_jobs > 1 and N > 2:
+        # split the upper triangle into blocks with equal numbers of pairs,
+        # a few blocks per process give a better load balance
+        n_blocks = min(L, 4*n_jobs)
+        bounds = np.linspace(0, L, n_blocks+1).astype(int)
+        blocks = [(N, bounds[b], bounds[b+1]) for b in range(n_blocks)]
+        # the selected spike trains are sent to each process only once
+        trains = [spike_trains[i] for i in indices]
+        pool = _get_pool(n_jobs, _init_matrix_worker,
+                         (trains, dist_function, interval))
+        try:
+            results = pool.map(_matrix_worker, blocks)
+        finally:
+            pool.close()
+            pool.join()
+        for block, values in zip(blocks, results):
+            if condensed:
+                # the blocks enumerate the pairs in the condensed layout
+                distance_matrix[block[1]:block[2]] = values
+            else:
+                i, j = _pair_block(*block)
+                distance_matrix[i, j] = values
+                distance_matrix[j, i] = values
+        return distance_matrix
+
     # generate a list of possible index pairs
-    pairs = [(i, j) for i in range(len(indices))
-             for j in range(i+1, len(indices))]
+    pairs = [(i, j) for i in range(N) for j in range(i+1, N)]
 
-    distance_matrix = np.zeros((len(indices), len(indices)))
-    for i, j in pairs:
+    for k, (i, j) in enumerate(pairs):
         d = dist_function(spike_trains[indices[i]], spike_trains[indices[j]],
                           interval)
-        distance_matrix[i, j] = d
-        distance_matrix[j, i] = d
+        if condensed:
+            distance_matrix[k] = d
+        else:
+            distance_matrix[i, j] = d
+            distance_matrix[j, i] = d
     return distance_matrix
+
+
+############################################################
+# _cross_worker
+############################################################
+def _init_cross_worker(spike_trains_a, spike_trains_b, dist_function,
+                       interval):
+    """ Internal implementation detail. Initializer of the worker processes
+    of _generic_distance_cross.
+    """
+    global _worker_state
+    _worker_state = (spike_trains_a, spike_trains_b, dist_function, interval)
+
+
+def _cross_worker(block):
+    """ Internal implementation detail. Computes the distances of the pairs
+    start, ..., stop-1 of the cross matrix, enumerated row by row, inside a
+    worker process.
+    """
+    spike_trains_a, spike_trains_b, dist_function, interval = _worker_state
+    start, stop = block
+    N_b = len(spike_trains_b)
+    return np.array([dist_function(spike_trains_a[k // N_b],
+                                   spike_trains_b[k % N_b], interval)
+                     for k in range(start, stop)])
+
+
+############################################################
+# _generic_distance_cross
+############################################################
+def _generic_distance_cross(spike_trains_a, spike_trains_b, dist_function,
+                            interval=None, n_jobs=1):
+    """ Internal implementation detail. Don't use this function directly.
+    Instead use isi_distance_cross, spike_distance_cross or spike_sync_cross.
+    Computes the distances between all spike trains of two sets.
+    Args:
+    - spike_trains_a, spike_trains_b: lists of spike trains
+    - dist_function: function computing the distance of two spike trains
+    - n_jobs: number of worker processes, the pairs are split into blocks of
+    equal size that are computed in parallel. 1 or None means serial
+    computation, -1 uses all cpus (default=1)
+    Return:
+    - a 2D array of size len(spike_trains_a)*len(spike_trains_b) containing
+    the pair-wise distances
+    """
+    n_jobs = _get_n_jobs(n_jobs)
+    N_a = len(spike_trains_a)
+    N_b = len(spike_trains_b)
+    L = N_a*N_b
+    distances = np.zeros((N_a, N_b))
+    if n_jobs > 1 and L > 1:
+        n_blocks = min(L, 4*n_jobs)
+        bounds = np.linspace(0, L, n_blocks+1).astype(int)
+        blocks = [(bounds[b], bounds[b+1]) for b in range(n_blocks)]
+        pool = _get_pool(n_jobs, _init_cross_worker,
+                         (list(spike_trains_a), list(spike_trains_b),
+                          dist_function, interval))
+        try:
+            results = pool.map(_cross_worker, blocks)
+        finally:
+            pool.close()
+            pool.join()
+        for (start, stop), values in zip(blocks, results):
+            distances.flat[start:stop] = values
+        return distances
+
+    for i in range(N_a):
+        for j in range(N_b):
+            distances[i, j] = dist_function(spike_trains_a[i],
+                                            spike_trains_b[j], interval)
+    return distances
+
+
+############################################################
+# _get_intervals
+############################################################
+def _get_intervals(interval, t_start, t_end):
+    """ Internal implementation detail. Converts an averaging interval given
+    as a pair of floats, or a sequence of such pairs, into an array of shape
+    (n_intervals, 2) as required by the interval kernels.
+    """
+    intervals = np.array(interval, dtype=float).reshape(-1, 2)
+    assert np.all(intervals[:, 0] >= t_start) and \
+        np.all(intervals[:, 1] <= t_end), "Invalid averaging interval"
+    return intervals
+
+
+############################################################
+# _get_windows
+############################################################
+def _get_windows(t_start, t_end, window, step=None):
+    """ Internal implementation detail. Returns the sliding windows
+    [t_start + k*step, t_start + k*step + window] for k = 0, 1, ... that lie
+    within [t_start, t_end].
+    Args:
+    - window: length of the windows
+    - step: distance between the starts of two windows, if None the windows
+    are non-overlapping, i.e. step=window (default=None)
+    Returns:
+    - array of shape (n_windows, 2) containing the window edges
+    """
+    if step is None:
+        step = window
+    assert window > 0.0 and step > 0.0, "Invalid window or step size."
+    assert window <= t_end-t_start, "Window larger than the spike trains."
+    # small tolerance for windows that end at t_end up to round-off errors
+    n_windows = int(np.floor((t_end-t_start-window)/step + 1E-9)) + 1
+    windows = np.empty((n_windows, 2))
+    windows[:, 0] = t_start + step*np.arange(n_windows)
+    windows[:, 1] = np.minimum(windows[:, 0] + window, t_end)
+    return windows
+
+
+############################################################
+# _generic_distance_matrix_series
+############################################################
+def _generic_distance_matrix_series(spike_trains, pair_profile_func,
+                                    window, step=None, indices=None):
+    """ Internal implementation detail. Don't use this function directly.
+    Instead use isi_distance_matrix_series or spike_distance_matrix_series.
+    Computes the distance matrices in sliding windows, where the profile of
+    each pair is computed only once.
+    Args:
+    - spike_trains: list of spike trains
+    - pair_profile_func: function computing the profile of two spike trains
+    - window, step: sliding windows, see _get_windows
+    - indices: list of indices defining which spike-trains to use
+    if None all given spike-trains are used (default=None)
+    Return:
+    - a 3D array of size n_windows*len(indices)*len(indices) containing the
+    pair-wise distances in each window
+    """
+    if indices is None:
+        indices = np.arange(len(spike_trains))
+    indices = np.array(indices)
+    # check validity of indices
+    assert (indices < len(spike_trains)).all() and (indices >= 0).all(), \
+        "Invalid index list."
+    N = len(indices)
+    windows = _get_windows(spike_trains[indices[0]].t_start,
+                           spike_trains[indices[0]].t_end, window, step)
+
+    distances = np.zeros((len(windows), N, N))
+    for i in range(N):
+        for j in range(i+1, N):
+            d = pair_profile_func(spike_trains[indices[i]],
+                                  spike_trains[indices[j]]).avrg_many(windows)
+            distances[:, i, j] = d
+            distances[:, j, i] = d
+    return distances
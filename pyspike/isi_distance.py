@@ -4,10 +4,13 @@
 
 from __future__ import absolute_import
 
-import pyspike
+import numpy as np
+from pyspike.backends import get_kernel
 from pyspike import PieceWiseConstFunc
-from pyspike.generic import _generic_profile_multi, _generic_distance_multi, \
-    _generic_distance_matrix
+from pyspike.generic import _generic_distance_multi, \
+    _generic_distance_matrix, _flatten_spike_trains, _get_n_jobs, \
+    _get_windows, _generic_distance_matrix_series, _get_intervals, \
+    _generic_distance_cross, _approx_distance_multi
 
 
 ############################################################
@@ -69,19 +72,7 @@ def isi_profile_bi(spike_train1, spike_train2):
     assert spike_train1.t_end == spike_train2.t_end, \
         "Given spike trains are not defined on the same interval!"
 
-    # load cython implementation
-    try:
-        from .cython.cython_profiles import isi_profile_cython \
-            as isi_profile_impl
-    except ImportError:
-        if not(pyspike.disable_backend_warning):
-            print("Warning: isi_profile_cython not found. Make sure that \
-PySpike is installed by running\n 'python setup.py build_ext --inplace'!\n \
-Falling back to slow python backend.")
-        # use python backend
-        from .cython.python_backend import isi_distance_python \
-            as isi_profile_impl
-
+    isi_profile_impl = get_kernel("isi_profile")
     times, values = isi_profile_impl(spike_train1.get_spikes_non_empty(),
                                      spike_train2.get_spikes_non_empty(),
                                      spike_train1.t_start, spike_train1.t_end)
@@ -104,10 +95,16 @@ def isi_profile_multi(spike_trains, indices=None):
     :returns: The averaged isi profile :math:`<I(t)>`
     :rtype: :class:`.PieceWiseConstFunc`
     """
-    average_dist, M = _generic_profile_multi(spike_trains, isi_profile_bi,
-                                             indices)
-    average_dist.mul_scalar(1.0/M)  # normalize
-    return average_dist
+    # the isi-distance of each pair only depends on the current interspike
+    # intervals, so the average is computed in a single pass over all spikes
+    spikes, offsets = _flatten_spike_trains(spike_trains, indices)
+    assert len(offsets) > 2, "At least two spike trains required."
+
+    isi_profile_multi_impl = get_kernel("isi_profile_multi")
+    times, values = isi_profile_multi_impl(spikes, offsets,
+                                           spike_trains[0].t_start,
+                                           spike_trains[0].t_end)
+    return PieceWiseConstFunc(times, values)
 
 
 ############################################################
@@ -173,25 +170,35 @@ def isi_distance_bi(spike_train1, spike_train2, interval=None):
     if interval is None:
         # distance over the whole interval is requested: use specific function
         # for optimal performance
-        try:
-            from .cython.cython_distances import isi_distance_cython \
-                as isi_distance_impl
-
-            return isi_distance_impl(spike_train1.get_spikes_non_empty(),
-                                     spike_train2.get_spikes_non_empty(),
-                                     spike_train1.t_start, spike_train1.t_end)
-        except ImportError:
-            # Cython backend not available: fall back to profile averaging
+        isi_distance_impl = get_kernel("isi_distance")
+        if isi_distance_impl is None:
+            # kernel not available: fall back to profile averaging
             return isi_profile_bi(spike_train1, spike_train2).avrg(interval)
+        return isi_distance_impl(spike_train1.get_spikes_non_empty(),
+                                 spike_train2.get_spikes_non_empty(),
+                                 spike_train1.t_start, spike_train1.t_end)
     else:
-        # some specific interval is provided: use profile
-        return isi_profile_bi(spike_train1, spike_train2).avrg(interval)
+        # some specific interval is provided: use the interval function that
+        # only considers the spikes within and around the interval
+        isi_distance_interval_impl = get_kernel("isi_distance_interval")
+        if isi_distance_interval_impl is None:
+            # kernel not available: fall back to profile averaging
+            return isi_profile_bi(spike_train1, spike_train2).avrg(interval)
+        intervals = _get_intervals(interval, spike_train1.t_start,
+                                   spike_train1.t_end)
+        integral = isi_distance_interval_impl(
+            spike_train1.get_spikes_non_empty(),
+            spike_train2.get_spikes_non_empty(),
+            spike_train1.t_start, spike_train1.t_end, intervals)
+        return integral / np.sum(intervals[:, 1]-intervals[:, 0])
 
 
 ############################################################
 # isi_distance_multi
 ############################################################
-def isi_distance_multi(spike_trains, indices=None, interval=None):
+def isi_distance_multi(spike_trains, indices=None, interval=None,
+                       approx=False, n_samples=1000, target_se=None,
+                       confidence=0.95, rng=None):
     """ Specific function to compute the multivariate ISI-distance.
     This is a deprecfated function and should not be called directly. Use
     :func:`.isi_distance` to compute ISI-distances.
@@ -202,9 +209,28 @@ def isi_distance_multi(spike_trains, indices=None, interval=None):
     :param interval: averaging interval given as a pair of floats, if None
                      the average over the whole function is computed.
     :type interval: Pair of floats or None.
-    :returns: The time-averaged multivariate ISI distance :math:`D_I`
-    :rtype: double
+    :param approx: if True, the value is estimated from randomly sampled
+                   pairs of spike trains instead of all N(N-1)/2 pairs, and
+                   returned together with its confidence interval.
+    :param n_samples: number of sampled pairs, or the batch size if
+                      `target_se` is given.
+    :param target_se: if given, batches of `n_samples` pairs are sampled
+                      until the standard error of the estimate is at most
+                      `target_se`.
+    :param confidence: confidence level of the interval.
+    :param rng: The random number generator, e.g. a
+                :class:`numpy.random.Generator`, or a seed. If `None`, the
+                global random state of :mod:`numpy.random` is used.
+    :returns: The time-averaged multivariate ISI distance :math:`D_I`, with
+              `approx=True` the estimate and the confidence interval
+              (lower, upper)
+    :rtype: double, or (double, (double, double))
     """
+    if approx:
+        def pair_func(spike_train1, spike_train2):
+            return isi_distance_bi(spike_train1, spike_train2, interval)
+        return _approx_distance_multi(spike_trains, pair_func, indices,
+                                      n_samples, target_se, confidence, rng)
     return _generic_distance_multi(spike_trains, isi_distance_bi, indices,
                                    interval)
 
@@ -212,7 +238,8 @@ def isi_distance_multi(spike_trains, indices=None, interval=None):
 ############################################################
 # isi_distance_matrix
 ############################################################
-def isi_distance_matrix(spike_trains, indices=None, interval=None):
+def isi_distance_matrix(spike_trains, indices=None, interval=None,
+                        n_jobs=1, condensed=False, dtype=np.float64):
     """ Computes the time averaged isi-distance of all pairs of spike-trains.
 
     :param spike_trains: list of :class:`.SpikeTrain`
@@ -222,9 +249,187 @@ def isi_distance_matrix(spike_trains, indices=None, interval=None):
     :param interval: averaging interval given as a pair of floats, if None
                      the average over the whole function is computed.
     :type interval: Pair of floats or None.
+    :param n_jobs: number of threads (Cython backend) or processes used to
+                   compute the matrix. 1 or None means serial computation,
+                   -1 uses all available cpus.
+    :type n_jobs: int or None
+    :param condensed: if True, only the N*(N-1)/2 values of the upper
+                      triangle are returned as a 1D array, in the layout of
+                      :func:`scipy.spatial.distance.pdist`, which can be
+                      passed to :func:`scipy.cluster.hierarchy.linkage` or
+                      :func:`scipy.spatial.distance.squareform` directly.
+    :param dtype: float type of the result, `np.float64` or `np.float32`.
     :returns: 2D array with the pair wise time average isi distances
-              :math:`D_{I}^{ij}`
+              :math:`D_{I}^{ij}`, or its condensed upper triangle
     :rtype: np.array
     """
+    if interval is None:
+        # distance over the whole interval is requested: use the specific
+        # all-pairs function for optimal performance
+        if condensed:
+            isi_distance_condensed_impl = get_kernel("isi_distance_condensed")
+            if isi_distance_condensed_impl is not None:
+                spikes, offsets = _flatten_spike_trains(spike_trains, indices)
+                N = len(offsets)-1
+                distances = np.empty(N*(N-1)//2, dtype=dtype)
+                isi_distance_condensed_impl(spikes, offsets,
+                                            spike_trains[0].t_start,
+                                            spike_trains[0].t_end, distances,
+                                            _get_n_jobs(n_jobs))
+                return distances
+        else:
+            isi_distance_matrix_impl = get_kernel("isi_distance_matrix")
+            if isi_distance_matrix_impl is not None:
+                spikes, offsets = _flatten_spike_trains(spike_trains, indices)
+                return isi_distance_matrix_impl(
+                    spikes, offsets, spike_trains[0].t_start,
+                    spike_trains[0].t_end,
+                    _get_n_jobs(n_jobs)).astype(dtype, copy=False)
+
     return _generic_distance_matrix(spike_trains, isi_distance_bi,
-                                    indices=indices, interval=interval)
+                                    indices=indices, interval=interval,
+                                    n_jobs=n_jobs, condensed=condensed,
+                                    dtype=dtype)
+
+
+############################################################
+# isi_distance_cross
+############################################################
+def isi_distance_cross(spike_trains_a, spike_trains_b, interval=None,
+                       n_jobs=1):
+    """ Computes the isi-distance between all spike trains of the set a and
+    all spike trains of the set b, like :func:`scipy.spatial.distance.cdist`.
+    Only the N_a*N_b pairs between the sets are computed, which is much
+    cheaper than the matrix of the joined sets if one of them is small, e.g.
+    when comparing a few templates with many recorded spike trains. Both sets
+    have to be defined on the same interval.
+
+    :param spike_trains_a: list of :class:`.SpikeTrain`
+    :param spike_trains_b: list of :class:`.SpikeTrain`
+    :param interval: averaging interval given as a pair of floats, if None
+                     the average over the whole function is computed.
+    :type interval: Pair of floats or None.
+    :param n_jobs: number of threads (Cython backend) or processes used to
+                   compute the matrix. 1 or None means serial computation,
+                   -1 uses all available cpus.
+    :type n_jobs: int or None
+    :returns: 2D array of shape (len(spike_trains_a), len(spike_trains_b))
+              with the pair wise values :math:`D_{I}^{ij}`
+    :rtype: np.array
+    """
+    assert spike_trains_a[0].t_start == spike_trains_b[0].t_start and \
+        spike_trains_a[0].t_end == spike_trains_b[0].t_end, \
+        "Given spike trains are not defined on the same interval!"
+    if interval is None:
+        # distance over the whole interval is requested: use the specific
+        # cross kernel for optimal performance
+        isi_distance_cross_impl = get_kernel("isi_distance_cross")
+        if isi_distance_cross_impl is not None:
+            spikes_a, offsets_a = _flatten_spike_trains(spike_trains_a)
+            spikes_b, offsets_b = _flatten_spike_trains(spike_trains_b)
+            return isi_distance_cross_impl(spikes_a, offsets_a,
+                                           spikes_b, offsets_b,
+                                           spike_trains_a[0].t_start,
+                                           spike_trains_a[0].t_end,
+                                           _get_n_jobs(n_jobs))
+
+    return _generic_distance_cross(spike_trains_a, spike_trains_b,
+                                   isi_distance_bi, interval, n_jobs)
+
+
+############################################################
+# isi_distance_series
+############################################################
+def isi_distance_series(*args, **kwargs):
+    """ Computes the ISI-distance in sliding windows. The isi-profile
+    is computed only once and then averaged over each window
+    :math:`[T_0 + k \\cdot step, T_0 + k \\cdot step + window]`,
+    :math:`k = 0, 1, ...`, that lies within the interval of the spike trains.
+
+    Valid call structures::
+
+      isi_distance_series(st1, st2, window=1.0)  # non-overlapping windows
+      isi_distance_series(st1, st2, window=1.0, step=0.05)
+      isi_distance_series(st1, st2, st3, window=1.0)  # multi-variate
+
+      spike_trains = [st1, st2, st3, st4]  # list of spike trains
+      isi_distance_series(spike_trains, window=1.0, step=0.05)
+      isi_distance_series(spike_trains, indices=[0, 1], window=1.0)
+
+    :returns: The ISI-distance in each window.
+    :rtype: np.array
+    """
+    if len(args) == 1:
+        return isi_distance_series_multi(args[0], **kwargs)
+    elif len(args) == 2:
+        return isi_distance_series_bi(args[0], args[1], **kwargs)
+    else:
+        return isi_distance_series_multi(args, **kwargs)
+
+
+############################################################
+# isi_distance_series_bi
+############################################################
+def isi_distance_series_bi(spike_train1, spike_train2, window, step=None):
+    """ Specific function to compute the bivariate ISI-distance in sliding
+    windows. Use :func:`.isi_distance_series` instead.
+
+    :param spike_train1: First spike train.
+    :type spike_train1: :class:`.SpikeTrain`
+    :param spike_train2: Second spike train.
+    :type spike_train2: :class:`.SpikeTrain`
+    :param window: length of the windows.
+    :param step: distance between the starts of consecutive windows, if None
+                 the windows do not overlap (step=window).
+    :returns: The ISI-distance in each window.
+    :rtype: np.array
+    """
+    windows = _get_windows(spike_train1.t_start, spike_train1.t_end,
+                           window, step)
+    return isi_profile_bi(spike_train1, spike_train2).avrg_many(windows)
+
+
+############################################################
+# isi_distance_series_multi
+############################################################
+def isi_distance_series_multi(spike_trains, window, step=None,
+                              indices=None):
+    """ Specific function to compute the multivariate ISI-distance in
+    sliding windows. Use :func:`.isi_distance_series` instead.
+
+    :param spike_trains: list of :class:`.SpikeTrain`
+    :param window: length of the windows.
+    :param step: distance between the starts of consecutive windows, if None
+                 the windows do not overlap (step=window).
+    :param indices: list of indices defining which spike trains to use,
+                    if None all given spike trains are used (default=None)
+    :type indices: list or None
+    :returns: The multivariate ISI-distance in each window.
+    :rtype: np.array
+    """
+    windows = _get_windows(spike_trains[0].t_start, spike_trains[0].t_end,
+                           window, step)
+    return isi_profile_multi(spike_trains, indices).avrg_many(windows)
+
+
+############################################################
+# isi_distance_matrix_series
+############################################################
+def isi_distance_matrix_series(spike_trains, window, step=None,
+                               indices=None):
+    """ Computes the ISI-distance of all pairs of spike-trains in sliding
+    windows, see :func:`.isi_distance_series`.
+
+    :param spike_trains: list of :class:`.SpikeTrain`
+    :param window: length of the windows.
+    :param step: distance between the starts of consecutive windows, if None
+                 the windows do not overlap (step=window).
+    :param indices: list of indices defining which spike trains to use,
+                    if None all given spike trains are used (default=None)
+    :type indices: list or None
+    :returns: 3D array with the pair wise ISI-distances, where the first
+              axis runs over the windows.
+    :rtype: np.array
+    """
+    return _generic_distance_matrix_series(spike_trains, isi_profile_bi,
+                                           window, step, indices)
@@ -0,0 +1,204 @@
+# Module containing the online computation of the ISI- and SPIKE-distance of
+# spike trains that are received in real time
+# Copyright 2015, Mario Mulansky <mario.mulansky@gmx.net>
+# Distributed under the BSD License
+
+from __future__ import absolute_import, division
+
+import numpy as np
+from pyspike import SpikeTrain
+from pyspike.isi_distance import isi_distance_bi
+from pyspike.spike_distance import spike_distance_bi
+
+
+############################################################
+# OnlineDistance
+############################################################
+class OnlineDistance(object):
+    """ Computes the running ISI- and SPIKE-distances between channels whose
+    spikes arrive in real time. The spikes of each channel are pushed in
+    temporal order with :meth:`push`, and :meth:`value` returns the distances
+    of all pairs of channels in the most recent window.
+
+    The profiles at time t depend on the following spikes of both spike
+    trains and, for the SPIKE-distance, on the distances of these spikes to
+    the other spike train, which may still change when further spikes arrive.
+    The distances are therefore computed up to the time :attr:`t_final`, up
+    to which the profiles of all pairs are final. Within this range, the
+    values are identical to the distances of the complete spike trains
+    computed with the batch functions and the same averaging interval.
+    After :meth:`close`, the end of the recording is known and
+    :attr:`t_final` is the end time.
+
+    Only the spikes needed for windows of up to `max_window` before
+    :attr:`t_final` are kept, i.e. the spikes in the window and the few
+    preceding spikes the profiles depend on. Pushing a spike takes O(1)
+    amortized time, and computing the values takes time proportional to the
+    number of spikes in the window.
+
+    Example::
+
+      online = OnlineDistance(2, t_start=0.0, max_window=10.0)
+      online.push(0, 0.5)
+      online.push(1, 0.6)
+      ...
+      D = online.value(5.0)  # SPIKE-distances in the last 5 time units
+    """
+
+    def __init__(self, n_channels, t_start=0.0, max_window=None):
+        """ Constructs the online distance for the given number of channels.
+
+        :param n_channels: number of channels, i.e. spike trains.
+        :param t_start: start time of the recording.
+        :param max_window: the largest window used with :meth:`value`, older
+                           spikes are discarded. If None, all spikes are kept.
+        """
+        self.n_channels = n_channels
+        self.t_start = t_start
+        self.t_end = None
+        self.max_window = max_window
+        # spikes of each channel, the spikes before _heads[c] are discarded
+        self._spikes = [[] for _ in range(n_channels)]
+        self._heads = [0] * n_channels
+        # number of pushed spikes of each channel, including discarded ones
+        self._n_spikes = [0] * n_channels
+        # number of kept spikes at which the history is discarded next
+        self._next_discard = 64
+
+    def push(self, channel, t):
+        """ Adds the spike at time t to the channel. The spikes of a channel
+        have to be pushed in temporal order.
+
+        :param channel: index of the channel.
+        :param t: spike time.
+        """
+        assert self.t_end is None, "The recording is already closed."
+        spikes = self._spikes[channel]
+        assert t >= self.t_start and (len(spikes) == 0 or t >= spikes[-1]), \
+            "Spikes have to be pushed in temporal order."
+        spikes.append(t)
+        self._n_spikes[channel] += 1
+        if self.max_window is not None and \
+                len(spikes) - self._heads[channel] >= self._next_discard:
+            self._discard()
+
+    def close(self, t_end):
+        """ Marks the end of the recording, such that the profiles up to
+        t_end are final.
+
+        :param t_end: end time of the recording.
+        """
+        for spikes in self._spikes:
+            assert len(spikes) == 0 or spikes[-1] <= t_end, \
+                "Spikes after the end of the recording."
+        self.t_end = t_end
+
+    @property
+    def t_final(self):
+        """ The time up to which the profiles of all pairs of channels are
+        final: every channel has its following spike, and that spike has a
+        spike of every other channel at the same time or later. Before this,
+        every channel needs two spikes, as the edge correction at the start
+        depends on the first interspike interval.
+        """
+        if self.t_end is not None:
+            return self.t_end
+        if min(self._n_spikes) < 2:
+            return self.t_start
+        # time of the earliest last spike, all spikes up to here are known
+        t_known = min(spikes[-1] for spikes in self._spikes)
+        preceding = [self._last_spike_before(c, t_known)
+                     for c in range(self.n_channels)]
+        if any(t is None for t in preceding):
+            # the first spike of a channel is not final yet
+            return self.t_start
+        return min(preceding)
+
+    def _last_spike_before(self, channel, t):
+        """ Returns the last spike of the channel at or before t, or None.
+        """
+        spikes = self._spikes[channel]
+        i = np.searchsorted(spikes, t, side='right') - 1
+        return spikes[i] if i >= self._heads[channel] else None
+
+    def _discard(self):
+        """ Discards the spikes that are not needed for windows ending at
+        t_final or later. For any time t in these windows, the kept spikes
+        contain the preceding spikes of all channels, and the spikes of all
+        channels around these preceding spikes.
+        """
+        t_cut = self.t_final - self.max_window
+        t_keep = t_cut
+        # two levels of preceding spikes: the preceding spikes of the window
+        # start and the spikes preceding those in all channels
+        for _ in range(2):
+            preceding = [self._last_spike_before(c, t_keep)
+                         for c in range(self.n_channels)]
+            if any(t is None for t in preceding):
+                t_keep = None
+                break
+            t_keep = min(preceding)
+        if t_keep is not None:
+            for c in range(self.n_channels):
+                # keep one additional spike as margin for the edge handling
+                i = int(np.searchsorted(self._spikes[c], t_keep, 'left')) - 1
+                self._heads[c] = max(self._heads[c], i)
+                if self._heads[c] > len(self._spikes[c]) // 2:
+                    # compact the storage, amortized over the discarded spikes
+                    del self._spikes[c][:self._heads[c]]
+                    self._heads[c] = 0
+        self._next_discard = 2 * max([64] + [len(s) - h for s, h in
+                                             zip(self._spikes, self._heads)])
+
+    def spike_trains(self):
+        """ Returns the kept spikes of all channels as spike trains, with the
+        edges given by the start time and the end time of the recording, or
+        the latest spike if the recording is not closed yet.
+
+        :returns: list of :class:`.SpikeTrain`
+        """
+        if self.t_end is not None:
+            t_end = self.t_end
+        else:
+            t_end = max([self.t_start] + [spikes[-1] for spikes in
+                                          self._spikes if len(spikes) > 0])
+        return [SpikeTrain(np.array(spikes[head:]), (self.t_start, t_end))
+                for spikes, head in zip(self._spikes, self._heads)]
+
+    def value(self, window=None, metric="spike"):
+        """ Computes the distances of all pairs of channels in the window
+        [t_final - window, t_final].
+
+        :param window: length of the window, it must not exceed `max_window`.
+                       If None, the distances since the start of the
+                       recording are computed, which requires
+                       `max_window=None`.
+        :param metric: "spike" for the SPIKE-distance or "isi" for the
+                       ISI-distance.
+        :returns: 2D array with the pair wise distances.
+        :rtype: np.array
+        """
+        if metric == "spike":
+            dist_function = spike_distance_bi
+        elif metric == "isi":
+            dist_function = isi_distance_bi
+        else:
+            raise ValueError("Unknown metric: %s" % metric)
+        if self.max_window is not None:
+            assert window is not None and window <= self.max_window, \
+                "The window has to be at most max_window."
+        t_final = self.t_final
+        t0 = self.t_start if window is None \
+            else max(self.t_start, t_final - window)
+        N = self.n_channels
+        distances = np.zeros((N, N))
+        if t_final <= t0:
+            return distances
+        spike_trains = self.spike_trains()
+        for i in range(N):
+            for j in range(i+1, N):
+                d = dist_function(spike_trains[i], spike_trains[j],
+                                  (t0, t_final))
+                distances[i, j] = d
+                distances[j, i] = d
+        return distances
@@ -3,32 +3,130 @@
 # Distributed under the BSD License
 
 import numpy as np
-from pyspike import PieceWiseConstFunc
+from pyspike import PieceWiseConstFunc, SpikeTrainSet
+
+
+############################################################
+# _sorted_spikes
+############################################################
+def _sorted_spikes(spike_trains):
+    """ Returns all spike times of the given spike trains in one sorted array.
+    """
+    if isinstance(spike_trains, SpikeTrainSet):
+        # all spikes are already stored in one array
+        all_spikes = spike_trains.spikes
+    else:
+        all_spikes = np.concatenate([np.asarray(st.spikes, dtype=float)
+                                     for st in spike_trains])
+    return np.sort(all_spikes)
+
+
+############################################################
+# _histogram
+############################################################
+def _histogram(sorted_spikes, t_start, t_end, bin_size):
+    """ Computes the histogram of the sorted spike times with bins of the
+    given size. As for `np.histogram`, all bins are half-open except for the
+    last one, which includes t_end.
+    """
+    bin_count = max(int((t_end - t_start) / bin_size), 1)
+    edges = np.linspace(t_start, t_end, bin_count+1)
+    indices = np.empty(bin_count+1, dtype=np.intp)
+    indices[:-1] = np.searchsorted(sorted_spikes, edges[:-1], side='left')
+    indices[-1] = np.searchsorted(sorted_spikes, edges[-1], side='right')
+    return edges, np.diff(indices)
 
 
 # Computes the peri-stimulus time histogram of a set of spike trains
 def psth(spike_trains, bin_size):
     """ Computes the peri-stimulus time histogram of a set of
     :class:`.SpikeTrain`. The PSTH is simply the histogram of merged spike
-    events. The :code:`bin_size` defines the width of the histogram bins.
+    events. The :code:`bin_size` defines the width of the histogram bins. If
+    several bin sizes are given, the spikes are merged and sorted only once
+    and the histograms for all bin sizes are returned.
 
-    :param spike_trains: list of :class:`.SpikeTrain`
-    :param bin_size: width of the histogram bins.
-    :return: The PSTH as a :class:`.PieceWiseConstFunc`
+    :param spike_trains: list of :class:`.SpikeTrain` or
+                         :class:`.SpikeTrainSet`
+    :param bin_size: width of the histogram bins, or a sequence of widths.
+    :return: The PSTH as a :class:`.PieceWiseConstFunc`, or a list of
+             :class:`.PieceWiseConstFunc` if a sequence of bin sizes is
+             given.
     """
+    t_start = spike_trains[0].t_start
+    t_end = spike_trains[0].t_end
+    sorted_spikes = _sorted_spikes(spike_trains)
 
-    bin_count = int((spike_trains[0].t_end - spike_trains[0].t_start) /
-                    bin_size)
-    bins = np.linspace(spike_trains[0].t_start, spike_trains[0].t_end,
-                       bin_count+1)
+    psths = [PieceWiseConstFunc(*_histogram(sorted_spikes, t_start, t_end,
+                                            size))
+             for size in np.atleast_1d(bin_size)]
+    if np.ndim(bin_size) == 0:
+        return psths[0]
+    return psths
 
-    # N = len(spike_trains)
-    combined_spike_train = spike_trains[0].spikes
-    for i in range(1, len(spike_trains)):
-        combined_spike_train = np.append(combined_spike_train,
-                                         spike_trains[i].spikes)
 
-    vals, edges = np.histogram(combined_spike_train, bins, density=False)
+############################################################
+# _fft_convolve
+############################################################
+def _fft_convolve(values, kernel, offset):
+    """ Convolves the values with the kernel via FFT and returns the part of
+    the result aligned with the values, where `offset` is the index of the
+    kernel that corresponds to zero lag.
+    """
+    n = len(values) + len(kernel) - 1
+    n_fft = 1 << int(np.ceil(np.log2(n)))
+    result = np.fft.irfft(np.fft.rfft(values, n_fft) *
+                          np.fft.rfft(kernel, n_fft), n_fft)
+    # remove negative values originating from round-off errors
+    return np.maximum(result[offset:offset+len(values)], 0.0)
+
+
+# Computes the kernel smoothed firing rate of a set of spike trains
+def psth_smoothed(spike_trains, bandwidth, kernel="gaussian",
+                  resolution=None):
+    """ Computes the kernel smoothed average firing rate of a set of
+    :class:`.SpikeTrain`. The spikes are binned with the given resolution
+    and the histogram is convolved with the kernel via FFT, which makes the
+    computation time independent of the kernel width. The result is the
+    firing rate per spike train, i.e. the smoothed PSTH divided by the number
+    of spike trains. No correction is applied for the kernel mass outside of
+    the interval, so the rate is underestimated close to the edges.
+
+    :param spike_trains: list of :class:`.SpikeTrain` or
+                         :class:`.SpikeTrainSet`
+    :param bandwidth: width of the kernel, i.e. the standard deviation of the
+                      gaussian kernel or the time constant of the exponential
+                      kernel.
+    :param kernel: "gaussian" for a symmetric gaussian kernel or
+                   "exponential" for a causal exponential kernel.
+    :param resolution: width of the bins used for the discretization, the
+                       default is bandwidth/10.
+    :return: The rate as a :class:`.PieceWiseConstFunc`
+    """
+    if bandwidth <= 0.0:
+        raise ValueError("The bandwidth has to be positive.")
+    if resolution is None:
+        resolution = bandwidth / 10.0
+    t_start = spike_trains[0].t_start
+    t_end = spike_trains[0].t_end
+    edges, counts = _histogram(_sorted_spikes(spike_trains), t_start, t_end,
+                               resolution)
+    dt = edges[1] - edges[0]
+
+    if kernel == "gaussian":
+        # sample the kernel up to 5 standard deviations
+        m = int(np.ceil(5.0 * bandwidth / dt))
+        lags = dt * np.arange(-m, m+1)
+        weights = np.exp(-0.5 * (lags / bandwidth)**2)
+        offset = m
+    elif kernel == "exponential":
+        # integrate the kernel over the bins up to 10 time constants
+        m = int(np.ceil(10.0 * bandwidth / dt))
+        weights = -np.diff(np.exp(-dt * np.arange(m+2) / bandwidth))
+        offset = 0
+    else:
+        raise ValueError("Unknown kernel: %s" % kernel)
+    # normalize the kernel to unit integral
+    weights /= np.sum(weights) * dt
 
-    bin_size = edges[1]-edges[0]
-    return PieceWiseConstFunc(edges, vals)  # /(N*bin_size))
+    rate = _fft_convolve(counts.astype(float), weights, offset)
+    return PieceWiseConstFunc(edges, rate / len(spike_trains))
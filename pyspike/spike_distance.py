@@ -4,10 +4,13 @@
 
 from __future__ import absolute_import
 
-import pyspike
+import numpy as np
+from pyspike.backends import get_kernel
 from pyspike import PieceWiseLinFunc
 from pyspike.generic import _generic_profile_multi, _generic_distance_multi, \
-    _generic_distance_matrix
+    _generic_distance_matrix, _flatten_spike_trains, _get_n_jobs, \
+    _get_windows, _generic_distance_matrix_series, _get_intervals, \
+    _generic_distance_cross, _approx_distance_multi
 
 
 ############################################################
@@ -68,19 +71,7 @@ def spike_profile_bi(spike_train1, spike_train2):
     assert spike_train1.t_end == spike_train2.t_end, \
         "Given spike trains are not defined on the same interval!"
 
-    # cython implementation
-    try:
-        from .cython.cython_profiles import spike_profile_cython \
-            as spike_profile_impl
-    except ImportError:
-        if not(pyspike.disable_backend_warning):
-            print("Warning: spike_profile_cython not found. Make sure that \
-PySpike is installed by running\n 'python setup.py build_ext --inplace'!\n \
-Falling back to slow python backend.")
-        # use python backend
-        from .cython.python_backend import spike_distance_python \
-            as spike_profile_impl
-
+    spike_profile_impl = get_kernel("spike_profile")
     times, y_starts, y_ends = spike_profile_impl(
         spike_train1.get_spikes_non_empty(),
         spike_train2.get_spikes_non_empty(),
@@ -173,25 +164,36 @@ def spike_distance_bi(spike_train1, spike_train2, interval=None):
     if interval is None:
         # distance over the whole interval is requested: use specific function
         # for optimal performance
-        try:
-            from .cython.cython_distances import spike_distance_cython \
-                as spike_distance_impl
-            return spike_distance_impl(spike_train1.get_spikes_non_empty(),
-                                       spike_train2.get_spikes_non_empty(),
-                                       spike_train1.t_start,
-                                       spike_train1.t_end)
-        except ImportError:
-            # Cython backend not available: fall back to average profile
+        spike_distance_impl = get_kernel("spike_distance")
+        if spike_distance_impl is None:
+            # kernel not available: fall back to average profile
             return spike_profile_bi(spike_train1, spike_train2).avrg(interval)
+        return spike_distance_impl(spike_train1.get_spikes_non_empty(),
+                                   spike_train2.get_spikes_non_empty(),
+                                   spike_train1.t_start,
+                                   spike_train1.t_end)
     else:
-        # some specific interval is provided: compute the whole profile
-        return spike_profile_bi(spike_train1, spike_train2).avrg(interval)
+        # some specific interval is provided: use the interval function that
+        # only considers the spikes within and around the interval
+        spike_distance_interval_impl = get_kernel("spike_distance_interval")
+        if spike_distance_interval_impl is None:
+            # kernel not available: fall back to profile averaging
+            return spike_profile_bi(spike_train1, spike_train2).avrg(interval)
+        intervals = _get_intervals(interval, spike_train1.t_start,
+                                   spike_train1.t_end)
+        integral = spike_distance_interval_impl(
+            spike_train1.get_spikes_non_empty(),
+            spike_train2.get_spikes_non_empty(),
+            spike_train1.t_start, spike_train1.t_end, intervals)
+        return integral / np.sum(intervals[:, 1]-intervals[:, 0])
 
 
 ############################################################
 # spike_distance_multi
 ############################################################
-def spike_distance_multi(spike_trains, indices=None, interval=None):
+def spike_distance_multi(spike_trains, indices=None, interval=None,
+                         approx=False, n_samples=1000, target_se=None,
+                         confidence=0.95, rng=None):
     """ Specific function to compute a multivariate SPIKE-distance. This is a
     deprecated function and should not be called directly. Use
     :func:`.spike_distance` to compute SPIKE-distances.
@@ -203,9 +205,28 @@ def spike_distance_multi(spike_trains, indices=None, interval=None):
     :param interval: averaging interval given as a pair of floats, if None
                      the average over the whole function is computed.
     :type interval: Pair of floats or None.
-    :returns: The averaged multi-variate spike distance :math:`D_S`.
-    :rtype: double
+    :param approx: if True, the value is estimated from randomly sampled
+                   pairs of spike trains instead of all N(N-1)/2 pairs, and
+                   returned together with its confidence interval.
+    :param n_samples: number of sampled pairs, or the batch size if
+                      `target_se` is given.
+    :param target_se: if given, batches of `n_samples` pairs are sampled
+                      until the standard error of the estimate is at most
+                      `target_se`.
+    :param confidence: confidence level of the interval.
+    :param rng: The random number generator, e.g. a
+                :class:`numpy.random.Generator`, or a seed. If `None`, the
+                global random state of :mod:`numpy.random` is used.
+    :returns: The averaged multi-variate spike distance :math:`D_S`, with
+              `approx=True` the estimate and the confidence interval
+              (lower, upper).
+    :rtype: double, or (double, (double, double))
     """
+    if approx:
+        def pair_func(spike_train1, spike_train2):
+            return spike_distance_bi(spike_train1, spike_train2, interval)
+        return _approx_distance_multi(spike_trains, pair_func, indices,
+                                      n_samples, target_se, confidence, rng)
     return _generic_distance_multi(spike_trains, spike_distance_bi, indices,
                                    interval)
 
@@ -213,7 +234,8 @@ def spike_distance_multi(spike_trains, indices=None, interval=None):
 ############################################################
 # spike_distance_matrix
 ############################################################
-def spike_distance_matrix(spike_trains, indices=None, interval=None):
+def spike_distance_matrix(spike_trains, indices=None, interval=None,
+                          n_jobs=1, condensed=False, dtype=np.float64):
     """ Computes the time averaged spike-distance of all pairs of spike-trains.
 
     :param spike_trains: list of :class:`.SpikeTrain`
@@ -223,9 +245,187 @@ def spike_distance_matrix(spike_trains, indices=None, interval=None):
     :param interval: averaging interval given as a pair of floats, if None
                      the average over the whole function is computed.
     :type interval: Pair of floats or None.
+    :param n_jobs: number of threads (Cython backend) or processes used to
+                   compute the matrix. 1 or None means serial computation,
+                   -1 uses all available cpus.
+    :type n_jobs: int or None
+    :param condensed: if True, only the N*(N-1)/2 values of the upper
+                      triangle are returned as a 1D array, in the layout of
+                      :func:`scipy.spatial.distance.pdist`, which can be
+                      passed to :func:`scipy.cluster.hierarchy.linkage` or
+                      :func:`scipy.spatial.distance.squareform` directly.
+    :param dtype: float type of the result, `np.float64` or `np.float32`.
     :returns: 2D array with the pair wise time average spike distances
-              :math:`D_S^{ij}`
+              :math:`D_S^{ij}`, or its condensed upper triangle
     :rtype: np.array
     """
+    if interval is None:
+        # distance over the whole interval is requested: use the specific
+        # all-pairs function for optimal performance
+        if condensed:
+            spike_distance_condensed_impl = \
+                get_kernel("spike_distance_condensed")
+            if spike_distance_condensed_impl is not None:
+                spikes, offsets = _flatten_spike_trains(spike_trains, indices)
+                N = len(offsets)-1
+                distances = np.empty(N*(N-1)//2, dtype=dtype)
+                spike_distance_condensed_impl(spikes, offsets,
+                                              spike_trains[0].t_start,
+                                              spike_trains[0].t_end,
+                                              distances, _get_n_jobs(n_jobs))
+                return distances
+        else:
+            spike_distance_matrix_impl = get_kernel("spike_distance_matrix")
+            if spike_distance_matrix_impl is not None:
+                spikes, offsets = _flatten_spike_trains(spike_trains, indices)
+                return spike_distance_matrix_impl(
+                    spikes, offsets, spike_trains[0].t_start,
+                    spike_trains[0].t_end,
+                    _get_n_jobs(n_jobs)).astype(dtype, copy=False)
+
     return _generic_distance_matrix(spike_trains, spike_distance_bi,
-                                    indices, interval)
+                                    indices, interval, n_jobs, condensed,
+                                    dtype)
+
+
+############################################################
+# spike_distance_cross
+############################################################
+def spike_distance_cross(spike_trains_a, spike_trains_b, interval=None,
+                         n_jobs=1):
+    """ Computes the spike-distance between all spike trains of the set a and
+    all spike trains of the set b, like :func:`scipy.spatial.distance.cdist`.
+    Only the N_a*N_b pairs between the sets are computed, which is much
+    cheaper than the matrix of the joined sets if one of them is small, e.g.
+    when comparing a few templates with many recorded spike trains. Both sets
+    have to be defined on the same interval.
+
+    :param spike_trains_a: list of :class:`.SpikeTrain`
+    :param spike_trains_b: list of :class:`.SpikeTrain`
+    :param interval: averaging interval given as a pair of floats, if None
+                     the average over the whole function is computed.
+    :type interval: Pair of floats or None.
+    :param n_jobs: number of threads (Cython backend) or processes used to
+                   compute the matrix. 1 or None means serial computation,
+                   -1 uses all available cpus.
+    :type n_jobs: int or None
+    :returns: 2D array of shape (len(spike_trains_a), len(spike_trains_b))
+              with the pair wise values :math:`D_{S}^{ij}`
+    :rtype: np.array
+    """
+    assert spike_trains_a[0].t_start == spike_trains_b[0].t_start and \
+        spike_trains_a[0].t_end == spike_trains_b[0].t_end, \
+        "Given spike trains are not defined on the same interval!"
+    if interval is None:
+        # distance over the whole interval is requested: use the specific
+        # cross kernel for optimal performance
+        spike_distance_cross_impl = get_kernel("spike_distance_cross")
+        if spike_distance_cross_impl is not None:
+            spikes_a, offsets_a = _flatten_spike_trains(spike_trains_a)
+            spikes_b, offsets_b = _flatten_spike_trains(spike_trains_b)
+            return spike_distance_cross_impl(spikes_a, offsets_a,
+                                             spikes_b, offsets_b,
+                                             spike_trains_a[0].t_start,
+                                             spike_trains_a[0].t_end,
+                                             _get_n_jobs(n_jobs))
+
+    return _generic_distance_cross(spike_trains_a, spike_trains_b,
+                                   spike_distance_bi, interval, n_jobs)
+
+
+############################################################
+# spike_distance_series
+############################################################
+def spike_distance_series(*args, **kwargs):
+    """ Computes the SPIKE-distance in sliding windows. The spike-profile
+    is computed only once and then averaged over each window
+    :math:`[T_0 + k \\cdot step, T_0 + k \\cdot step + window]`,
+    :math:`k = 0, 1, ...`, that lies within the interval of the spike trains.
+
+    Valid call structures::
+
+      spike_distance_series(st1, st2, window=1.0)  # non-overlapping windows
+      spike_distance_series(st1, st2, window=1.0, step=0.05)
+      spike_distance_series(st1, st2, st3, window=1.0)  # multi-variate
+
+      spike_trains = [st1, st2, st3, st4]  # list of spike trains
+      spike_distance_series(spike_trains, window=1.0, step=0.05)
+      spike_distance_series(spike_trains, indices=[0, 1], window=1.0)
+
+    :returns: The SPIKE-distance in each window.
+    :rtype: np.array
+    """
+    if len(args) == 1:
+        return spike_distance_series_multi(args[0], **kwargs)
+    elif len(args) == 2:
+        return spike_distance_series_bi(args[0], args[1], **kwargs)
+    else:
+        return spike_distance_series_multi(args, **kwargs)
+
+
+############################################################
+# spike_distance_series_bi
+############################################################
+def spike_distance_series_bi(spike_train1, spike_train2, window, step=None):
+    """ Specific function to compute the bivariate SPIKE-distance in sliding
+    windows. Use :func:`.spike_distance_series` instead.
+
+    :param spike_train1: First spike train.
+    :type spike_train1: :class:`.SpikeTrain`
+    :param spike_train2: Second spike train.
+    :type spike_train2: :class:`.SpikeTrain`
+    :param window: length of the windows.
+    :param step: distance between the starts of consecutive windows, if None
+                 the windows do not overlap (step=window).
+    :returns: The SPIKE-distance in each window.
+    :rtype: np.array
+    """
+    windows = _get_windows(spike_train1.t_start, spike_train1.t_end,
+                           window, step)
+    return spike_profile_bi(spike_train1, spike_train2).avrg_many(windows)
+
+
+############################################################
+# spike_distance_series_multi
+############################################################
+def spike_distance_series_multi(spike_trains, window, step=None,
+                                indices=None):
+    """ Specific function to compute the multivariate SPIKE-distance in
+    sliding windows. Use :func:`.spike_distance_series` instead.
+
+    :param spike_trains: list of :class:`.SpikeTrain`
+    :param window: length of the windows.
+    :param step: distance between the starts of consecutive windows, if None
+                 the windows do not overlap (step=window).
+    :param indices: list of indices defining which spike trains to use,
+                    if None all given spike trains are used (default=None)
+    :type indices: list or None
+    :returns: The multivariate SPIKE-distance in each window.
+    :rtype: np.array
+    """
+    windows = _get_windows(spike_trains[0].t_start, spike_trains[0].t_end,
+                           window, step)
+    return spike_profile_multi(spike_trains, indices).avrg_many(windows)
+
+
+############################################################
+# spike_distance_matrix_series
+############################################################
+def spike_distance_matrix_series(spike_trains, window, step=None,
+                                 indices=None):
+    """ Computes the SPIKE-distance of all pairs of spike-trains in sliding
+    windows, see :func:`.spike_distance_series`.
+
+    :param spike_trains: list of :class:`.SpikeTrain`
+    :param window: length of the windows.
+    :param step: distance between the starts of consecutive windows, if None
+                 the windows do not overlap (step=window).
+    :param indices: list of indices defining which spike trains to use,
+                    if None all given spike trains are used (default=None)
+    :type indices: list or None
+    :returns: 3D array with the pair wise SPIKE-distances, where the first
+              axis runs over the windows.
+    :rtype: np.array
+    """
+    return _generic_distance_matrix_series(spike_trains, spike_profile_bi,
+                                           window, step, indices)
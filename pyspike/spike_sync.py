@@ -7,9 +7,12 @@ from __future__ import absolute_import
 
 import numpy as np
 from functools import partial
-import pyspike
+from pyspike.backends import get_kernel
 from pyspike import DiscreteFunc
-from pyspike.generic import _generic_profile_multi, _generic_distance_matrix
+from pyspike.generic import _generic_profile_multi, _generic_distance_matrix, \
+    _flatten_spike_trains, _get_n_jobs, _get_windows, \
+    _generic_distance_matrix_series, _get_intervals, \
+    _generic_distance_cross, _approx_distance_multi
 
 
 ############################################################
@@ -74,19 +77,7 @@ def spike_sync_profile_bi(spike_train1, spike_train2, max_tau=None):
     assert spike_train1.t_end == spike_train2.t_end, \
         "Given spike trains are not defined on the same interval!"
 
-    # cython implementation
-    try:
-        from .cython.cython_profiles import coincidence_profile_cython \
-            as coincidence_profile_impl
-    except ImportError:
-        if not(pyspike.disable_backend_warning):
-            print("Warning: spike_distance_cython not found. Make sure that \
-PySpike is installed by running\n 'python setup.py build_ext --inplace'!\n \
-Falling back to slow python backend.")
-        # use python backend
-        from .cython.python_backend import coincidence_python \
-            as coincidence_profile_impl
-
+    coincidence_profile_impl = get_kernel("coincidence_profile")
     if max_tau is None:
         max_tau = 0.0
 
@@ -136,25 +127,41 @@ def _spike_sync_values(spike_train1, spike_train2, interval, max_tau):
     if interval is None:
         # distance over the whole interval is requested: use specific function
         # for optimal performance
-        try:
-            from .cython.cython_distances import coincidence_value_cython \
-                as coincidence_value_impl
-            if max_tau is None:
-                max_tau = 0.0
-            c, mp = coincidence_value_impl(spike_train1.spikes,
-                                           spike_train2.spikes,
-                                           spike_train1.t_start,
-                                           spike_train1.t_end,
-                                           max_tau)
-            return c, mp
-        except ImportError:
-            # Cython backend not available: fall back to profile averaging
+        coincidence_value_impl = get_kernel("coincidence_value")
+        if coincidence_value_impl is None:
+            # kernel not available: fall back to profile averaging
             return spike_sync_profile_bi(spike_train1, spike_train2,
                                          max_tau).integral(interval)
+        if max_tau is None:
+            max_tau = 0.0
+        c, mp = coincidence_value_impl(spike_train1.spikes,
+                                       spike_train2.spikes,
+                                       spike_train1.t_start,
+                                       spike_train1.t_end,
+                                       max_tau)
+        return c, mp
     else:
-        # some specific interval is provided: use profile
-        return spike_sync_profile_bi(spike_train1, spike_train2,
-                                     max_tau).integral(interval)
+        # some specific interval is provided: use the interval function that
+        # only considers the spikes within and around the interval
+        coincidence_interval_impl = get_kernel("coincidence_interval")
+        if coincidence_interval_impl is None:
+            # kernel not available: fall back to profile averaging
+            return spike_sync_profile_bi(spike_train1, spike_train2,
+                                         max_tau).integral(interval)
+        if max_tau is None:
+            max_tau = 0.0
+        intervals = _get_intervals(interval, spike_train1.t_start,
+                                   spike_train1.t_end)
+        c, mp = coincidence_interval_impl(spike_train1.spikes,
+                                          spike_train2.spikes,
+                                          spike_train1.t_start,
+                                          spike_train1.t_end,
+                                          max_tau, intervals)
+        if mp == 0.0:
+            # no spikes in the interval, return spike sync of 1
+            c = 1.0
+            mp = 1.0
+        return c, mp
 
 
 ############################################################
@@ -221,7 +228,9 @@ def spike_sync_bi(spike_train1, spike_train2, interval=None, max_tau=None):
 ############################################################
 # spike_sync_multi
 ############################################################
-def spike_sync_multi(spike_trains, indices=None, interval=None, max_tau=None):
+def spike_sync_multi(spike_trains, indices=None, interval=None, max_tau=None,
+                     approx=False, n_samples=1000, target_se=None,
+                     confidence=0.95, rng=None):
     """ Specific function to compute a multivariate SPIKE-Sync value.
     This is a deprecated function and should not be called directly. Use
     :func:`.spike_sync` to compute SPIKE-Sync values.
@@ -235,10 +244,33 @@ def spike_sync_multi(spike_trains, indices=None, interval=None, max_tau=None):
     :type interval: Pair of floats or None.
     :param max_tau: Maximum coincidence window size. If 0 or `None`, the
                     coincidence window has no upper bound.
-    :returns: The multi-variate spike synchronization value SYNC.
-    :rtype: double
+    :param approx: if True, the value is estimated from randomly sampled
+                   pairs of spike trains instead of all N(N-1)/2 pairs, and
+                   returned together with its confidence interval. The
+                   estimate is the ratio of the summed coincidences and
+                   multiplicities of the sampled pairs.
+    :param n_samples: number of sampled pairs, or the batch size if
+                      `target_se` is given.
+    :param target_se: if given, batches of `n_samples` pairs are sampled
+                      until the standard error of the estimate is at most
+                      `target_se`.
+    :param confidence: confidence level of the interval.
+    :param rng: The random number generator, e.g. a
+                :class:`numpy.random.Generator`, or a seed. If `None`, the
+                global random state of :mod:`numpy.random` is used.
+    :returns: The multi-variate spike synchronization value SYNC, with
+              `approx=True` the estimate and the confidence interval
+              (lower, upper)
+    :rtype: double, or (double, (double, double))
 
     """
+    if approx:
+        def pair_func(spike_train1, spike_train2):
+            return _spike_sync_values(spike_train1, spike_train2, interval,
+                                      max_tau)
+        return _approx_distance_multi(spike_trains, pair_func, indices,
+                                      n_samples, target_se, confidence, rng,
+                                      ratio=True)
     if indices is None:
         indices = np.arange(len(spike_trains))
     indices = np.array(indices)
@@ -263,7 +295,8 @@ def spike_sync_multi(spike_trains, indices=None, interval=None, max_tau=None):
 ############################################################
 # spike_sync_matrix
 ############################################################
-def spike_sync_matrix(spike_trains, indices=None, interval=None, max_tau=None):
+def spike_sync_matrix(spike_trains, indices=None, interval=None, max_tau=None,
+                      n_jobs=1, condensed=False, dtype=np.float64):
     """ Computes the overall spike-synchronization value of all pairs of
     spike-trains.
 
@@ -276,11 +309,229 @@ def spike_sync_matrix(spike_trains, indices=None, interval=None, max_tau=None):
     :type interval: Pair of floats or None.
     :param max_tau: Maximum coincidence window size. If 0 or `None`, the
                     coincidence window has no upper bound.
+    :param n_jobs: number of threads (Cython backend) or processes used to
+                   compute the matrix. 1 or None means serial computation,
+                   -1 uses all available cpus.
+    :type n_jobs: int or None
+    :param condensed: if True, only the N*(N-1)/2 values of the upper
+                      triangle are returned as a 1D array, in the layout of
+                      :func:`scipy.spatial.distance.pdist`, which can be
+                      passed to :func:`scipy.cluster.hierarchy.linkage` or
+                      :func:`scipy.spatial.distance.squareform` directly.
+    :param dtype: float type of the result, `np.float64` or `np.float32`.
     :returns: 2D array with the pair wise time spike synchronization values
-              :math:`SYNC_{ij}`
+              :math:`SYNC_{ij}`, or its condensed upper triangle
     :rtype: np.array
 
     """
+    if interval is None:
+        # sync over the whole interval is requested: use the specific
+        # all-pairs function for optimal performance
+        if condensed:
+            # evaluates the pairs one by one, as the sweep of the matrix
+            # kernel requires dense N x N arrays
+            spike_sync_condensed_impl = get_kernel("spike_sync_condensed")
+            if spike_sync_condensed_impl is not None:
+                spikes, offsets = _flatten_spike_trains(spike_trains, indices,
+                                                        non_empty=False)
+                N = len(offsets)-1
+                sync = np.empty(N*(N-1)//2, dtype=dtype)
+                spike_sync_condensed_impl(spikes, offsets,
+                                          spike_trains[0].t_start,
+                                          spike_trains[0].t_end,
+                                          max_tau or 0.0, sync,
+                                          _get_n_jobs(n_jobs))
+                return sync
+        else:
+            spike_sync_matrix_impl = get_kernel("spike_sync_matrix")
+            if spike_sync_matrix_impl is not None:
+                spikes, offsets = _flatten_spike_trains(spike_trains, indices,
+                                                        non_empty=False)
+                return spike_sync_matrix_impl(
+                    spikes, offsets, spike_trains[0].t_start,
+                    spike_trains[0].t_end, max_tau or 0.0,
+                    _get_n_jobs(n_jobs)).astype(dtype, copy=False)
+
     dist_func = partial(spike_sync_bi, max_tau=max_tau)
     return _generic_distance_matrix(spike_trains, dist_func,
-                                    indices, interval)
+                                    indices, interval, n_jobs, condensed,
+                                    dtype)
+
+
+############################################################
+# spike_sync_cross
+############################################################
+def spike_sync_cross(spike_trains_a, spike_trains_b, interval=None,
+                     max_tau=None, n_jobs=1):
+    """ Computes the spike synchronization value between all spike trains of
+    the set a and all spike trains of the set b, like
+    :func:`scipy.spatial.distance.cdist`. Only the N_a*N_b pairs between the
+    sets are computed, which is much cheaper than the matrix of the joined
+    sets if one of them is small, e.g. when comparing a few templates with
+    many recorded spike trains. Both sets have to be defined on the same
+    interval.
+
+    :param spike_trains_a: list of :class:`.SpikeTrain`
+    :param spike_trains_b: list of :class:`.SpikeTrain`
+    :param interval: averaging interval given as a pair of floats, if None
+                     the average over the whole function is computed.
+    :type interval: Pair of floats or None.
+    :param max_tau: Maximum coincidence window size. If 0 or `None`, the
+                    coincidence window has no upper bound.
+    :param n_jobs: number of threads (Cython backend) or processes used to
+                   compute the matrix. 1 or None means serial computation,
+                   -1 uses all available cpus.
+    :type n_jobs: int or None
+    :returns: 2D array of shape (len(spike_trains_a), len(spike_trains_b))
+              with the pair wise values :math:`SYNC_{ij}`
+    :rtype: np.array
+    """
+    assert spike_trains_a[0].t_start == spike_trains_b[0].t_start and \
+        spike_trains_a[0].t_end == spike_trains_b[0].t_end, \
+        "Given spike trains are not defined on the same interval!"
+    if interval is None:
+        # sync over the whole interval is requested: use the specific
+        # cross kernel for optimal performance
+        spike_sync_cross_impl = get_kernel("spike_sync_cross")
+        if spike_sync_cross_impl is not None:
+            spikes_a, offsets_a = _flatten_spike_trains(spike_trains_a,
+                                                        non_empty=False)
+            spikes_b, offsets_b = _flatten_spike_trains(spike_trains_b,
+                                                        non_empty=False)
+            return spike_sync_cross_impl(spikes_a, offsets_a,
+                                         spikes_b, offsets_b,
+                                         spike_trains_a[0].t_start,
+                                         spike_trains_a[0].t_end,
+                                         max_tau or 0.0,
+                                         _get_n_jobs(n_jobs))
+
+    dist_func = partial(spike_sync_bi, max_tau=max_tau)
+    return _generic_distance_cross(spike_trains_a, spike_trains_b, dist_func,
+                                   interval, n_jobs)
+
+
+############################################################
+# spike_sync_series
+############################################################
+def spike_sync_series(*args, **kwargs):
+    """ Computes the spike synchronization value SYNC in sliding windows. The
+    spike-sync profile is computed only once and the coincidences are then
+    summed in each window :math:`[T_0 + k \\cdot step, T_0 + k \\cdot step +
+    window]`, :math:`k = 0, 1, ...`, that lies within the interval of the
+    spike trains.
+
+    Valid call structures::
+
+      spike_sync_series(st1, st2, window=1.0)  # non-overlapping windows
+      spike_sync_series(st1, st2, window=1.0, step=0.05)
+      spike_sync_series(st1, st2, st3, window=1.0)  # multi-variate
+
+      spike_trains = [st1, st2, st3, st4]  # list of spike trains
+      spike_sync_series(spike_trains, window=1.0, step=0.05)
+      spike_sync_series(spike_trains, indices=[0, 1], window=1.0)
+
+    :returns: The spike synchronization value in each window.
+    :rtype: np.array
+    """
+    if len(args) == 1:
+        return spike_sync_series_multi(args[0], **kwargs)
+    elif len(args) == 2:
+        return spike_sync_series_bi(args[0], args[1], **kwargs)
+    else:
+        return spike_sync_series_multi(args, **kwargs)
+
+
+############################################################
+# spike_sync_series_bi
+############################################################
+def spike_sync_series_bi(spike_train1, spike_train2, window, step=None,
+                         max_tau=None):
+    """ Specific function to compute the bivariate SPIKE-Sync value in
+    sliding windows. Use :func:`.spike_sync_series` instead.
+
+    :param spike_train1: First spike train.
+    :type spike_train1: :class:`pyspike.SpikeTrain`
+    :param spike_train2: Second spike train.
+    :type spike_train2: :class:`pyspike.SpikeTrain`
+    :param window: length of the windows.
+    :param step: distance between the starts of consecutive windows, if None
+                 the windows do not overlap (step=window).
+    :param max_tau: Maximum coincidence window size. If 0 or `None`, the
+                    coincidence window has no upper bound.
+    :returns: The spike synchronization value in each window.
+    :rtype: np.array
+    """
+    windows = _get_windows(spike_train1.t_start, spike_train1.t_end,
+                           window, step)
+    return spike_sync_profile_bi(spike_train1, spike_train2,
+                                 max_tau).avrg_many(windows)
+
+
+############################################################
+# spike_sync_series_multi
+############################################################
+def spike_sync_series_multi(spike_trains, window, step=None, indices=None,
+                            max_tau=None):
+    """ Specific function to compute the multivariate SPIKE-Sync value in
+    sliding windows. Use :func:`.spike_sync_series` instead.
+
+    :param spike_trains: list of :class:`pyspike.SpikeTrain`
+    :param window: length of the windows.
+    :param step: distance between the starts of consecutive windows, if None
+                 the windows do not overlap (step=window).
+    :param indices: list of indices defining which spike trains to use,
+                    if None all given spike trains are used (default=None)
+    :type indices: list or None
+    :param max_tau: Maximum coincidence window size. If 0 or `None`, the
+                    coincidence window has no upper bound.
+    :returns: The multivariate spike synchronization value in each window.
+    :rtype: np.array
+    """
+    if indices is None:
+        indices = np.arange(len(spike_trains))
+    indices = np.array(indices)
+    # check validity of indices
+    assert (indices < len(spike_trains)).all() and (indices >= 0).all(), \
+        "Invalid index list."
+    windows = _get_windows(spike_trains[0].t_start, spike_trains[0].t_end,
+                           window, step)
+
+    # as in spike_sync_multi, coincidences and multiplicities are summed over
+    # all pairs separately for each window
+    coincidence = np.zeros(len(windows))
+    mp = np.zeros(len(windows))
+    for i in range(len(indices)):
+        for j in indices[i+1:]:
+            c, m = spike_sync_profile_bi(spike_trains[indices[i]],
+                                         spike_trains[j],
+                                         max_tau).integral_many(windows)
+            coincidence += c
+            mp += m
+
+    return coincidence/mp
+
+
+############################################################
+# spike_sync_matrix_series
+############################################################
+def spike_sync_matrix_series(spike_trains, window, step=None, indices=None,
+                             max_tau=None):
+    """ Computes the spike-synchronization value of all pairs of spike-trains
+    in sliding windows, see :func:`.spike_sync_series`.
+
+    :param spike_trains: list of :class:`pyspike.SpikeTrain`
+    :param window: length of the windows.
+    :param step: distance between the starts of consecutive windows, if None
+                 the windows do not overlap (step=window).
+    :param indices: list of indices defining which spike trains to use,
+                    if None all given spike trains are used (default=None)
+    :type indices: list or None
+    :param max_tau: Maximum coincidence window size. If 0 or `None`, the
+                    coincidence window has no upper bound.
+    :returns: 3D array with the pair wise spike synchronization values, where
+              the first axis runs over the windows.
+    :rtype: np.array
+    """
+    prof_func = partial(spike_sync_profile_bi, max_tau=max_tau)
+    return _generic_distance_matrix_series(spike_trains, prof_func,
+                                           window, step, indices)
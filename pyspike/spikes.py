@@ -3,7 +3,7 @@
 # Distributed under the BSD License
 
 import numpy as np
-from pyspike import SpikeTrain
+from pyspike import SpikeTrain, SpikeTrainSet
 
 
 ############################################################
@@ -60,66 +60,159 @@ def load_spike_trains_from_txt(file_name, edges,
 ############################################################
 # merge_spike_trains
 ############################################################
-def merge_spike_trains(spike_trains):
-    """ Merges a number of spike trains into a single spike train.
+def merge_spike_trains(spike_trains, return_indices=False):
+    """ Merges a number of spike trains into a single spike train. Coinciding
+    spikes of different spike trains are ordered by the index of the spike
+    train.
 
-    :param spike_trains: list of :class:`.SpikeTrain`
-    :returns: spike train with the merged spike times
+    :param spike_trains: list of :class:`.SpikeTrain` or a
+                         :class:`.SpikeTrainSet`
+    :param return_indices: If `True`, additionally returns the index of the
+                           spike train each merged spike originates from.
+    :returns: spike train with the merged spike times, and the array of
+              spike train indices if `return_indices` is `True`.
     """
-    # get the lengths of the spike trains
-    lens = np.array([len(st.spikes) for st in spike_trains])
-    merged_spikes = np.empty(np.sum(lens))
-    index = 0                             # the index for merged_spikes
-    indices = np.zeros_like(lens)         # indices of the spike trains
-    index_list = np.arange(len(indices))  # indices of indices of spike trains
-                                          # that have not yet reached the end
-    # list of the possible events in the spike trains
-    vals = [spike_trains[i].spikes[indices[i]] for i in index_list]
-    while len(index_list) > 0:
-        i = np.argmin(vals)             # the next spike is the minimum
-        merged_spikes[index] = vals[i]  # put it to the merged spike train
-        i = index_list[i]
-        index += 1                      # next index of merged spike train
-        indices[i] += 1                 # next index for the chosen spike train
-        if indices[i] >= lens[i]:       # remove spike train index if ended
-            index_list = index_list[index_list != i]
-        vals = [spike_trains[n].spikes[indices[n]] for n in index_list]
-    return SpikeTrain(merged_spikes, [spike_trains[0].t_start,
-                                      spike_trains[0].t_end])
+    if isinstance(spike_trains, SpikeTrainSet):
+        # SpikeTrainSet: the spike times are already stored in one array
+        all_spikes = spike_trains.spikes
+        lens = np.diff(spike_trains.offsets)
+    else:
+        trains = [np.asarray(st.spikes, dtype=float) for st in spike_trains]
+        lens = np.array([len(t) for t in trains], dtype=np.intp)
+        all_spikes = np.concatenate(trains) if len(trains) > 0 \
+            else np.empty(0)
+    # the stable sort keeps the order of the spike trains for equal spikes
+    order = np.argsort(all_spikes, kind='mergesort')
+    merged = SpikeTrain(all_spikes[order], [spike_trains[0].t_start,
+                                            spike_trains[0].t_end])
+    if return_indices:
+        train_indices = np.repeat(np.arange(len(lens)), lens)[order]
+        return merged, train_indices
+    return merged
 
 
 ############################################################
 # generate_poisson_spikes
 ############################################################
-def generate_poisson_spikes(rate, interval):
+def generate_poisson_spikes(rate, interval, rng=None):
     """ Generates a Poisson spike train with the given rate in the given time
-    interval
+    interval. See :func:`.generate_poisson_spike_trains` for generating many
+    spike trains at once.
 
     :param rate: The rate of the spike trains
     :param interval: A pair (T_start, T_end) of values representing the
                      start and end time of the spike train measurement or
                      a single value representing the end time, the T_start
-                     is then assuemd as 0. Auxiliary spikes will be added
-                     to the spike train at the beginning and end of this
-                     interval, if they are not yet present.
+                     is then assuemd as 0.
     :type interval: pair of doubles or double
+    :param rng: random number generator, see
+                :func:`.generate_poisson_spike_trains`.
     :returns: Poisson spike train as a :class:`.SpikeTrain`
     """
+    spike_trains = generate_poisson_spike_trains(rate, interval, 1, rng=rng,
+                                                 as_set=True)
+    return SpikeTrain(spike_trains.spikes, interval)
+
+
+############################################################
+# generate_poisson_spike_trains
+############################################################
+def generate_poisson_spike_trains(rate, interval, count, shape=1.0,
+                                  max_rate=None, rng=None, as_set=False):
+    """ Generates `count` independent spike trains of a Poisson process, or
+    more generally of a gamma renewal process, in the given time interval.
+    All spike trains are drawn at once with a few vectorized calls of the
+    random number generator.
+
+    :param rate: The rate of the spike trains. Either a number, or a function
+                 `rate(t)` that returns the rate at the times given as numpy
+                 array for an inhomogeneous Poisson process, in which case
+                 `max_rate` has to be given.
+    :param interval: A pair (T_start, T_end) of values representing the
+                     start and end time of the spike trains or a single value
+                     representing the end time, the T_start is then assumed
+                     as 0.
+    :type interval: pair of doubles or double
+    :param count: Number of spike trains.
+    :param shape: Shape parameter of the gamma distributed inter-spike
+                  intervals. The default value 1 gives a Poisson process,
+                  larger values result in more regular spike trains. The
+                  renewal process starts at T_start.
+    :param max_rate: Upper bound of the rate function, only used for
+                     inhomogeneous rates which are generated by thinning.
+    :param rng: The random number generator, e.g. a
+                :class:`numpy.random.Generator`, or a seed for
+                :func:`numpy.random.default_rng`. If `None`, the global
+                random state of :mod:`numpy.random` is used.
+    :param as_set: If `True`, the spike trains are returned as
+                   :class:`.SpikeTrainSet`.
+    :returns: list of :class:`.SpikeTrain` or :class:`.SpikeTrainSet`
+    """
     try:
-        T_start = interval[0]
-        T_end = interval[1]
-    except:
-        T_start = 0
-        T_end = interval
-    # roughly how many spikes are required to fill the interval
-    N = max(1, int(1.2 * rate * (T_end-T_start)))
-    N_append = max(1, int(0.1 * rate * (T_end-T_start)))
-    intervals = np.random.exponential(1.0/rate, N)
-    # make sure we have enough spikes
-    while T_start + sum(intervals) < T_end:
-        # print T_start + sum(intervals)
-        intervals = np.append(intervals,
-                              np.random.exponential(1.0/rate, N_append))
-    spikes = T_start + np.cumsum(intervals)
-    spikes = spikes[spikes < T_end]
-    return SpikeTrain(spikes, interval)
+        T_start = float(interval[0])
+        T_end = float(interval[1])
+    except (TypeError, IndexError):
+        T_start = 0.0
+        T_end = float(interval)
+    rng = _get_rng(rng)
+
+    if callable(rate):
+        if shape != 1.0:
+            raise ValueError("Inhomogeneous rates are only supported for "
+                             "Poisson processes (shape=1).")
+        if max_rate is None:
+            raise ValueError("max_rate is required for inhomogeneous rates.")
+        base_rate = float(max_rate)
+    else:
+        base_rate = float(rate)
+
+    spikes, counts = _renewal_spikes(base_rate, shape, T_start, T_end, count,
+                                     rng)
+    if callable(rate):
+        # thinning: keep each spike with probability rate(t)/max_rate
+        keep = rng.uniform(0.0, 1.0, len(spikes)) * base_rate < \
+            np.asarray(rate(spikes), dtype=float)
+        train_ids = np.repeat(np.arange(count), counts)
+        spikes = spikes[keep]
+        counts = np.bincount(train_ids[keep], minlength=count)
+
+    offsets = np.zeros(count+1, dtype=np.intp)
+    offsets[1:] = np.cumsum(counts)
+    spike_trains = SpikeTrainSet(spikes, (T_start, T_end), offsets)
+    if as_set:
+        return spike_trains
+    return spike_trains.to_list()
+
+
+def _get_rng(rng):
+    """ Returns the random number generator for the `rng` parameter: the
+    global random state of numpy for None, a new Generator for a seed, or the
+    given generator itself.
+    """
+    if rng is None:
+        return np.random
+    if not hasattr(rng, 'uniform'):
+        return np.random.default_rng(rng)
+    return rng
+
+
+def _renewal_spikes(rate, shape, T_start, T_end, count, rng):
+    """ Draws the spikes of `count` renewal processes as the cumulative sums
+    of gamma distributed intervals, which are exponentially distributed for
+    shape=1. Returns the flat array of spike times and the spike counts.
+    """
+    def draw_intervals(n):
+        if shape == 1.0:
+            return rng.exponential(1.0/rate, (count, n))
+        return rng.gamma(shape, 1.0/(shape*rate), (count, n))
+
+    mean_count = rate * (T_end-T_start)
+    # enough intervals to fill the interval with high probability
+    n = int(mean_count + 6.0*np.sqrt(mean_count/shape) + 10)
+    times = T_start + np.cumsum(draw_intervals(n), axis=1)
+    while np.any(times[:, -1] < T_end):
+        # rarely required: append intervals for all spike trains
+        times = np.hstack([times, times[:, -1:] +
+                           np.cumsum(draw_intervals(n), axis=1)])
+    mask = times < T_end
+    return times[mask], np.sum(mask, axis=1)
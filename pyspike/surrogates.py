@@ -0,0 +1,230 @@
+# Module containing functions to generate surrogate spike trains and to test
+# the significance of synchrony and distance values against them
+# Copyright 2015, Mario Mulansky <mario.mulansky@gmx.net>
+# Distributed under the BSD License
+
+from __future__ import absolute_import, division
+
+import numpy as np
+from pyspike import SpikeTrainSet
+from pyspike.generic import _flatten_spike_trains
+from pyspike.spikes import _get_rng
+from pyspike.spike_sync import spike_sync_matrix
+from pyspike.spike_distance import spike_distance_matrix
+
+
+############################################################
+# _dither_train
+############################################################
+def _dither_train(spikes, n_surrogates, t_start, t_end, dither, rng):
+    """ Internal implementation detail. Returns an array of shape
+    (n_surrogates, len(spikes)) where each row contains the spikes shifted by
+    independent uniform random values from [-dither, dither]. Spikes shifted
+    out of [t_start, t_end] are reflected at the edges, repeatedly if the
+    dither is larger than the interval.
+    """
+    shifted = spikes[None, :] + rng.uniform(-dither, dither,
+                                            (n_surrogates, len(spikes)))
+    T = t_end - t_start
+    if T > 0.0:
+        # reflecting at both edges is periodic with period 2T
+        shifted = np.mod(shifted - t_start, 2*T)
+        shifted = t_start + np.where(shifted > T, 2*T - shifted, shifted)
+    else:
+        shifted[:] = t_start
+    return np.sort(shifted, axis=1)
+
+
+############################################################
+# _shuffle_train
+############################################################
+def _shuffle_train(spikes, n_surrogates, rng):
+    """ Internal implementation detail. Returns an array of shape
+    (n_surrogates, len(spikes)) where each row contains a spike train with
+    randomly permuted inter-spike intervals. The first and the last spike are
+    kept fixed.
+    """
+    result = np.empty((n_surrogates, len(spikes)))
+    if len(spikes) == 0:
+        return result
+    isis = np.diff(spikes)
+    result[:, 0] = spikes[0]
+    permutations = np.argsort(rng.random((n_surrogates, len(isis))), axis=1)
+    result[:, 1:] = spikes[0] + np.cumsum(isis[permutations], axis=1)
+    return result
+
+
+############################################################
+# _generate_surrogates
+############################################################
+def _generate_surrogates(spikes, offsets, n_surrogates, t_start, t_end,
+                         method, dither, rng):
+    """ Internal implementation detail. Generates the surrogates of the spike
+    trains given by the flat array `spikes` and the `offsets`. The surrogates
+    are generated train by train, vectorized over all surrogates, and returned
+    as an array of shape (n_surrogates, len(spikes)), where each row contains
+    the flat spike times of one surrogate population with the same offsets.
+    """
+    trains = []
+    for n in range(len(offsets)-1):
+        train = spikes[offsets[n]:offsets[n+1]]
+        if method == "dither":
+            trains.append(_dither_train(train, n_surrogates, t_start, t_end,
+                                        dither, rng))
+        else:
+            trains.append(_shuffle_train(train, n_surrogates, rng))
+    if len(trains) == 0:
+        return np.empty((n_surrogates, 0))
+    return np.concatenate(trains, axis=1)
+
+
+def _check_method(method, dither):
+    """ Internal implementation detail. Checks the surrogate parameters.
+    """
+    if method not in ("dither", "shuffle"):
+        raise ValueError("Unknown surrogate method: %s" % method)
+    if method == "dither" and (dither is None or dither <= 0.0):
+        raise ValueError("A positive dither is required for the dither "
+                         "method.")
+
+
+############################################################
+# generate_surrogates
+############################################################
+def generate_surrogates(spike_trains, n_surrogates, method="dither",
+                        dither=None, rng=None):
+    """ Generates surrogates of a set of spike trains. Each surrogate is a
+    copy of the whole population where every spike train is randomized
+    independently, either by dithering the spike times or by shuffling the
+    inter-spike intervals. Both methods keep the number of spikes of each
+    spike train.
+
+    :param spike_trains: list of :class:`.SpikeTrain` or
+                         :class:`.SpikeTrainSet`
+    :param n_surrogates: number of surrogate populations.
+    :param method: "dither" to shift each spike by a uniform random value
+                   from [-dither, dither], spikes shifted outside the interval
+                   are reflected at the edges. "shuffle" to randomly permute
+                   the inter-spike intervals of each spike train, keeping the
+                   first and the last spike.
+    :param dither: maximal shift of the spike times for the dither method.
+    :param rng: The random number generator, e.g. a
+                :class:`numpy.random.Generator`, or a seed. If `None`, the
+                global random state of :mod:`numpy.random` is used.
+    :returns: list of :class:`.SpikeTrainSet`, one for each surrogate.
+    """
+    _check_method(method, dither)
+    t_start = spike_trains[0].t_start
+    t_end = spike_trains[0].t_end
+    spikes, offsets = _flatten_spike_trains(spike_trains, non_empty=False)
+    surrogates = _generate_surrogates(spikes, offsets, n_surrogates, t_start,
+                                      t_end, method, dither, _get_rng(rng))
+    return [SpikeTrainSet(s, (t_start, t_end), offsets) for s in surrogates]
+
+
+############################################################
+# _surrogate_test
+############################################################
+def _surrogate_test(spike_trains, matrix_func, larger, n_surrogates, method,
+                    dither, rng, batch_size, n_jobs):
+    """ Internal implementation detail. Computes the matrix of the given
+    spike trains with `matrix_func` and the p-values of each entry, estimated
+    as the fraction of surrogates reaching at least the observed value, where
+    `larger` defines whether larger or smaller values are significant.
+    The surrogates are generated in batches of `batch_size` populations.
+    """
+    _check_method(method, dither)
+    rng = _get_rng(rng)
+    t_start = spike_trains[0].t_start
+    t_end = spike_trains[0].t_end
+    # flatten the spike trains once, all surrogates are generated from the
+    # flat arrays and share the offsets
+    spikes, offsets = _flatten_spike_trains(spike_trains, non_empty=False)
+    observed = matrix_func(SpikeTrainSet(spikes, (t_start, t_end), offsets),
+                           n_jobs=n_jobs)
+    if batch_size is None:
+        # limit the memory of a batch to roughly 10^7 spike times
+        batch_size = max(1, 10**7 // max(1, len(spikes)))
+
+    exceed = np.zeros(observed.shape, dtype=np.intp)
+    for start in range(0, n_surrogates, batch_size):
+        batch = _generate_surrogates(spikes, offsets,
+                                     min(batch_size, n_surrogates-start),
+                                     t_start, t_end, method, dither, rng)
+        for surrogate in batch:
+            values = matrix_func(SpikeTrainSet(surrogate, (t_start, t_end),
+                                               offsets), n_jobs=n_jobs)
+            if larger:
+                exceed += values >= observed
+            else:
+                exceed += values <= observed
+    return observed, (exceed + 1.0) / (n_surrogates + 1.0)
+
+
+############################################################
+# spike_sync_significance
+############################################################
+def spike_sync_significance(spike_trains, n_surrogates=100, method="dither",
+                            dither=None, max_tau=None, rng=None,
+                            batch_size=None, n_jobs=1):
+    """ Computes the SPIKE-Synchronization matrix of the given spike trains
+    and the p-value of each entry from a surrogate test. The p-value is
+    estimated as :math:`(1 + n_{\\geq}) / (1 + n_{surrogates})`, where
+    :math:`n_{\\geq}` is the number of surrogates with a synchronization value
+    at least as large as the observed one. The matrices of the surrogates are
+    computed with the all-pairs kernels of the backend.
+
+    :param spike_trains: list of :class:`.SpikeTrain` or
+                         :class:`.SpikeTrainSet`
+    :param n_surrogates: number of surrogates.
+    :param method: surrogate method, "dither" or "shuffle", see
+                   :func:`.generate_surrogates`.
+    :param dither: maximal shift of the spike times for the dither method.
+    :param max_tau: Maximum coincidence window size. If 0 or `None`, the
+                    coincidence window has no upper bound.
+    :param rng: The random number generator, e.g. a
+                :class:`numpy.random.Generator`, or a seed.
+    :param batch_size: number of surrogates generated at once, by default
+                       chosen to limit the memory consumption.
+    :param n_jobs: number of threads (Cython backend) or processes used to
+                   compute the matrices, -1 uses all available cpus.
+    :returns: tuple of the SPIKE-Sync matrix and the matrix of p-values.
+    :rtype: pair of np.array
+    """
+    def matrix_func(spike_trains, n_jobs):
+        return spike_sync_matrix(spike_trains, max_tau=max_tau, n_jobs=n_jobs)
+
+    return _surrogate_test(spike_trains, matrix_func, True, n_surrogates,
+                           method, dither, rng, batch_size, n_jobs)
+
+
+############################################################
+# spike_distance_significance
+############################################################
+def spike_distance_significance(spike_trains, n_surrogates=100,
+                                method="dither", dither=None, rng=None,
+                                batch_size=None, n_jobs=1):
+    """ Computes the SPIKE-distance matrix of the given spike trains and the
+    p-value of each entry from a surrogate test. As small distances indicate
+    synchrony, the p-value is estimated as :math:`(1 + n_{\\leq}) / (1 +
+    n_{surrogates})`, where :math:`n_{\\leq}` is the number of surrogates with
+    a distance at most as large as the observed one.
+
+    :param spike_trains: list of :class:`.SpikeTrain` or
+                         :class:`.SpikeTrainSet`
+    :param n_surrogates: number of surrogates.
+    :param method: surrogate method, "dither" or "shuffle", see
+                   :func:`.generate_surrogates`.
+    :param dither: maximal shift of the spike times for the dither method.
+    :param rng: The random number generator, e.g. a
+                :class:`numpy.random.Generator`, or a seed.
+    :param batch_size: number of surrogates generated at once, by default
+                       chosen to limit the memory consumption.
+    :param n_jobs: number of threads (Cython backend) or processes used to
+                   compute the matrices, -1 uses all available cpus.
+    :returns: tuple of the SPIKE-distance matrix and the matrix of p-values.
+    :rtype: pair of np.array
+    """
+    return _surrogate_test(spike_trains, spike_distance_matrix, False,
+                           n_surrogates, method, dither, rng, batch_size,
+                           n_jobs)
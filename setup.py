@@ -12,6 +12,7 @@ Distributed under the BSD License
 from setuptools import setup, find_packages
 from distutils.extension import Extension
 import os.path
+import sys
 import numpy
 
 try:
@@ -23,11 +24,23 @@ else:
 
 if os.path.isfile("pyspike/cython/cython_add.c") and \
    os.path.isfile("pyspike/cython/cython_profiles.c") and \
-   os.path.isfile("pyspike/cython/cython_distances.c"):
+   os.path.isfile("pyspike/cython/cython_distances.c") and \
+   os.path.isfile("pyspike/cython/cython_directionality.c"):
     use_c = True
 else:
     use_c = False
 
+# the all-pairs kernels in cython_distances are parallelized with OpenMP,
+# without compiler support they simply run in a single thread
+if sys.platform.startswith('win'):
+    openmp_args = {'extra_compile_args': ['/openmp']}
+elif sys.platform == 'darwin':
+    # the clang compiler of macOS does not support OpenMP out of the box
+    openmp_args = {}
+else:
+    openmp_args = {'extra_compile_args': ['-fopenmp'],
+                   'extra_link_args': ['-fopenmp']}
+
 cmdclass = {}
 ext_modules = []
 
@@ -38,7 +51,9 @@ if use_cython:  # Cython is available, compile .pyx -> .c
         Extension("pyspike.cython.cython_profiles",
                   ["pyspike/cython/cython_profiles.pyx"]),
         Extension("pyspike.cython.cython_distances",
-                  ["pyspike/cython/cython_distances.pyx"])
+                  ["pyspike/cython/cython_distances.pyx"], **openmp_args),
+        Extension("pyspike.cython.cython_directionality",
+                  ["pyspike/cython/cython_directionality.pyx"])
     ]
     cmdclass.update({'build_ext': build_ext})
 elif use_c:  # c files are there, compile to binaries
@@ -48,7 +63,9 @@ elif use_c:  # c files are there, compile to binaries
         Extension("pyspike.cython.cython_profiles",
                   ["pyspike/cython/cython_profiles.c"]),
         Extension("pyspike.cython.cython_distances",
-                  ["pyspike/cython/cython_distances.c"])
+                  ["pyspike/cython/cython_distances.c"], **openmp_args),
+        Extension("pyspike.cython.cython_directionality",
+                  ["pyspike/cython/cython_directionality.c"])
     ]
 # neither cython nor c files available -> automatic fall-back to python backend
 
@@ -66,6 +83,7 @@ train similarity',
     license='BSD',
     url='https://github.com/mariomulansky/PySpike',
     install_requires=['numpy'],
+    extras_require={'numba': ['numba']},
     keywords=['data analysis', 'spike', 'neuroscience'],  # arbitrary keywords
     classifiers=[
         # How mature is this project? Common values are
@@ -0,0 +1,187 @@
+""" test_backends.py
+
+Tests the selection and registration of computational backends
+
+Copyright 2015, Mario Mulansky <mario.mulansky@gmx.net>
+
+Distributed under the BSD License
+
+"""
+
+from __future__ import print_function
+import numpy as np
+from numpy.testing import assert_equal, assert_almost_equal, \
+    assert_array_almost_equal
+
+import pyspike as spk
+from pyspike import SpikeTrain
+from pyspike.backends import get_kernel, available_backends
+
+
+def get_spike_trains():
+    np.random.seed(42)
+    return [SpikeTrain(np.sort(np.random.uniform(0.0, 100.0, n)),
+                       edges=(0.0, 100.0))
+            for n in (40, 60, 50, 0)]
+
+
+def test_set_backend():
+    spike_trains = get_spike_trains()
+    # degenerate case: both spikes at the end time, i.e. zero length
+    # interspike intervals at the edge
+    degenerate = [SpikeTrain([10.0], (0.0, 10.0)),
+                  SpikeTrain([10.0], (0.0, 10.0))]
+    default = spk.get_backend()
+    assert default in ("cython", "numba", "numpy", "python")
+    names = available_backends()
+    assert "numpy" in names and "python" in names
+
+    values = {}
+    try:
+        for name in names:
+            spk.set_backend(name)
+            assert_equal(spk.get_backend(), name)
+            values[name] = (
+                spk.isi_distance_matrix(spike_trains),
+                spk.spike_distance_matrix(spike_trains),
+                spk.spike_sync_matrix(spike_trains),
+                spk.isi_distance(spike_trains[0], spike_trains[1],
+                                 interval=(10.0, 60.0)),
+                spk.spike_profile(spike_trains).avrg(),
+                spk.directionality.spike_directionality_matrix(spike_trains),
+                spk.isi_distance(*degenerate),
+                spk.isi_profile(*degenerate).avrg(),
+                spk.isi_profile_multi(degenerate).avrg(),
+                spk.spike_distance(*degenerate),
+                spk.spike_profile(*degenerate).avrg(),
+                spk.isi_distance_matrix(degenerate, condensed=True),
+                spk.spike_distance_matrix(degenerate, condensed=True))
+            assert_equal(values[name][6:], [0.0]*5 + [[0.0]]*2)
+        spk.set_backend(None)
+        assert_equal(spk.get_backend(), default)
+
+        for name in names:
+            for v1, v2 in zip(values[default], values[name]):
+                assert_array_almost_equal(v1, v2, decimal=12)
+
+        # the python backend does not provide the direct distance kernels
+        spk.set_backend("python")
+        assert get_kernel("isi_distance") is None
+        assert get_kernel("isi_profile") is not None
+    finally:
+        spk.set_backend(None)
+
+    try:
+        spk.set_backend("unknown")
+    except ValueError:
+        pass
+    else:
+        assert False, "ValueError expected for unknown backend"
+    assert_equal(spk.get_backend(), default)
+
+
+def test_numpy_backend():
+    # compare the numpy kernels with the python kernels, including spikes at
+    # the edges and coinciding spikes
+    from pyspike.cython import numpy_backend, python_backend
+    np.random.seed(7)
+    for n in range(50):
+        s1 = np.sort(np.random.uniform(0.0, 10.0, np.random.randint(1, 12)))
+        s2 = np.sort(np.random.uniform(0.0, 10.0, np.random.randint(1, 12)))
+        if n % 3 == 1:
+            s1 = np.unique(np.round(s1))
+            s2 = np.unique(np.round(s2))
+        elif n % 3 == 2:
+            s1[0] = 0.0
+            s2[-1] = 10.0
+        for f_numpy, f_python in [
+                (numpy_backend.isi_profile_numpy,
+                 python_backend.isi_distance_python),
+                (numpy_backend.spike_profile_numpy,
+                 python_backend.spike_distance_python)]:
+            for v1, v2 in zip(f_numpy(s1, s2, 0.0, 10.0),
+                              f_python(s1, s2, 0.0, 10.0)):
+                assert_array_almost_equal(v1, v2, decimal=12)
+        for max_tau in (0.0, 0.2):
+            for v1, v2 in zip(
+                    numpy_backend.coincidence_profile_numpy(
+                        s1, s2, 0.0, 10.0, max_tau),
+                    python_backend.coincidence_python(
+                        s1, s2, 0.0, 10.0, max_tau)):
+                assert_array_almost_equal(v1, v2, decimal=12)
+
+        x1, y1 = python_backend.isi_distance_python(s1, s2, 0.0, 10.0)
+        x2, y2 = python_backend.isi_distance_python(s2, s1[:1], 0.0, 10.0)
+        for v1, v2 in zip(
+                numpy_backend.add_piece_wise_const_numpy(x1, y1, x2, y2),
+                python_backend.add_piece_wise_const_python(x1, y1, x2, y2)):
+            assert_array_almost_equal(v1, v2, decimal=12)
+        x1, a1, b1 = python_backend.spike_distance_python(s1, s2, 0.0, 10.0)
+        x2, a2, b2 = python_backend.spike_distance_python(s2, s1[:1],
+                                                          0.0, 10.0)
+        for v1, v2 in zip(
+                numpy_backend.add_piece_wise_lin_numpy(x1, a1, b1,
+                                                       x2, a2, b2),
+                python_backend.add_piece_wise_lin_python(x1, a1, b1,
+                                                         x2, a2, b2)):
+            assert_array_almost_equal(v1, v2, decimal=12)
+        x1, c1, m1 = python_backend.coincidence_python(s1, s2, 0.0, 10.0, 0.0)
+        x2, c2, m2 = python_backend.coincidence_python(s2, s1[:1],
+                                                       0.0, 10.0, 0.0)
+        for v1, v2 in zip(
+                numpy_backend.add_discrete_function_numpy(x1, c1, m1,
+                                                          x2, c2, m2),
+                python_backend.add_discrete_function_python(x1, c1, m1,
+                                                            x2, c2, m2)):
+            assert_array_almost_equal(v1, v2, decimal=12)
+
+
+def test_register_backend():
+    spike_trains = get_spike_trains()
+    calls = []
+
+    def isi_distance_counting(*args):
+        calls.append(args)
+        return -1.0
+
+    spk.register_backend("counting", {"isi_distance": isi_distance_counting})
+    spk.set_backend("counting")
+    try:
+        assert_equal(spk.get_backend(), "counting")
+        assert_equal(spk.isi_distance(spike_trains[0], spike_trains[1]),
+                     -1.0)
+        assert_equal(len(calls), 1)
+        # kernels not provided by the backend are taken from the built-in
+        # backends
+        d = spk.spike_distance(spike_trains[0], spike_trains[1])
+        spk.set_backend(None)
+        assert_almost_equal(d, spk.spike_distance(spike_trains[0],
+                                                  spike_trains[1]),
+                            decimal=12)
+        spk.set_backend("counting")
+    finally:
+        # removing the selected backend selects the default again
+        spk.unregister_backend("counting")
+    assert spk.get_backend() != "counting"
+    assert "counting" not in available_backends()
+
+    # backends that are not available can not be selected
+    def load_unavailable():
+        raise ImportError
+
+    spk.register_backend("unavailable", load_unavailable)
+    try:
+        spk.set_backend("unavailable")
+    except ImportError:
+        pass
+    else:
+        assert False, "ImportError expected for unavailable backend"
+    finally:
+        spk.unregister_backend("unavailable")
+        spk.set_backend(None)
+
+
+if __name__ == "__main__":
+    test_set_backend()
+    test_numpy_backend()
+    test_register_backend()
@@ -0,0 +1,200 @@
+""" test_directionality.py
+
+Tests the spike directionality and the spike train order
+
+Copyright 2015, Mario Mulansky <mario.mulansky@gmx.net>
+
+Distributed under the BSD License
+
+"""
+
+from __future__ import print_function
+import itertools
+import numpy as np
+from numpy.testing import assert_equal, assert_almost_equal, \
+    assert_array_almost_equal
+
+import pyspike as spk
+from pyspike import SpikeTrain
+from pyspike.backends import get_kernel
+from pyspike.cython import python_backend
+from pyspike.directionality import spike_directionality, \
+    spike_directionality_values, spike_directionality_matrix, \
+    spike_train_order_profile, spike_train_order, \
+    optimal_spike_train_sorting, permutate_matrix
+from pyspike.directionality.spike_directionality import \
+    _optimal_order_from_matrix
+
+
+def get_spike_trains(seed=17):
+    np.random.seed(seed)
+    # include coinciding spikes and spikes at the edges
+    spikes = [np.sort(np.random.uniform(0.0, 100.0, n)) for n in (30, 45, 20)]
+    spikes[1][:5] = spikes[0][:5]
+    spikes[2][0] = 0.0
+    spikes.append(np.array([]))
+    return [SpikeTrain(np.sort(s), edges=(0.0, 100.0)) for s in spikes]
+
+
+def test_directionality_kernels():
+    spike_trains = get_spike_trains()
+    for max_tau in (0.0, 0.5):
+        for st1 in spike_trains:
+            for st2 in spike_trains:
+                args = (st1.spikes, st2.spikes, 0.0, 100.0, max_tau)
+                for kernel in ("spike_directionality_profiles",
+                               "spike_train_order_profile"):
+                    python_kernel = getattr(python_backend,
+                                            kernel + "_python")
+                    for v1, v2 in zip(get_kernel(kernel)(*args),
+                                      python_kernel(*args)):
+                        assert_array_almost_equal(v1, v2, decimal=14)
+
+
+def test_spike_directionality():
+    st1 = SpikeTrain([100, 200, 300], [0, 1000])
+    st2 = SpikeTrain([105, 205, 300, 500], [0, 1000])
+    # st1 leads twice, the spikes at 300 are simultaneous
+    assert_almost_equal(spike_directionality(st1, st2), 2.0/3)
+    assert_almost_equal(spike_directionality(st2, st1), -2.0/4)
+    assert_equal(spike_directionality(st1, st2, normalize=False), 2)
+    assert_almost_equal(spike_directionality(st1, st2, interval=(150, 1000)),
+                        1.0/2)
+    values = spike_directionality_values([st1, st2])
+    assert_array_almost_equal(values[0], [1, 1, 0])
+    assert_array_almost_equal(values[1], [-1, -1, 0, 0])
+
+    f = spike_train_order_profile(st1, st2)
+    assert_array_almost_equal(f.x, [0, 100, 105, 200, 205, 300, 500, 1000])
+    assert_array_almost_equal(f.y, [1, 1, 1, 1, 1, 0, 0, 0])
+    assert_array_almost_equal(f.mp, [1, 1, 1, 1, 1, 2, 1, 1])
+    # 4 of 7 spikes are ordered
+    assert_almost_equal(spike_train_order(st1, st2), 4.0/7)
+    assert_almost_equal(spike_train_order(st2, st1), -4.0/7)
+    assert_almost_equal(spike_train_order(st1, st2, normalize=False), 4.0)
+    assert_almost_equal(spike_train_order(st1, st2, interval=(0, 150)), 1.0)
+
+
+def test_spike_directionality_matrix():
+    spike_trains = get_spike_trains()
+    N = len(spike_trains)
+    for max_tau in (None, 0.5):
+        D = spike_directionality_matrix(spike_trains, normalize=False,
+                                        max_tau=max_tau)
+        assert_array_almost_equal(D, -D.T, decimal=14)
+        for i in range(N):
+            for j in range(N):
+                if i != j:
+                    assert_almost_equal(
+                        D[i, j], spike_directionality(spike_trains[i],
+                                                      spike_trains[j],
+                                                      normalize=False,
+                                                      max_tau=max_tau),
+                        decimal=14)
+        # the pair wise computation used for intervals gives the same result
+        D_interval = spike_directionality_matrix(spike_trains,
+                                                 normalize=False,
+                                                 interval=(0.0, 100.0),
+                                                 max_tau=max_tau)
+        assert_array_almost_equal(D, D_interval, decimal=14)
+
+        # the multivariate synfire indicator from the matrix and from the
+        # profiles
+        assert_almost_equal(spike_train_order(spike_trains, max_tau=max_tau),
+                            spike_train_order(spike_trains, max_tau=max_tau,
+                                              interval=(0.0, 100.0)),
+                            decimal=14)
+        f = spike_train_order_profile(spike_trains, max_tau=max_tau)
+        assert_almost_equal(spike_train_order(spike_trains, max_tau=max_tau),
+                            np.sum(f.y[1:-1]) / np.sum(f.mp[1:-1]),
+                            decimal=14)
+
+    D = spike_directionality_matrix(spike_trains)
+    assert_array_almost_equal(D[0], spike_directionality_matrix(
+        spike_trains, normalize=False)[0] / len(spike_trains[0].spikes))
+    assert_array_almost_equal(D[3], 0.0)
+
+
+def get_synfire_chain(N, seed):
+    # a synfire chain with a shuffled order of the spike trains
+    np.random.seed(seed)
+    events = np.arange(5.0, 100.0, 5.0)
+    true_order = np.random.permutation(N)
+    spike_trains = [None] * N
+    for rank, n in enumerate(true_order):
+        spikes = events + 0.1*rank + np.random.uniform(-0.01, 0.01,
+                                                       len(events))
+        spike_trains[n] = SpikeTrain(spikes, edges=(0.0, 100.0))
+    return spike_trains, true_order
+
+
+def test_optimal_spike_train_sorting():
+    spike_trains, true_order = get_synfire_chain(8, 3)
+    N = len(spike_trains)
+
+    assert spike_train_order(spike_trains) < 1.0
+    p, F, iterations = optimal_spike_train_sorting(spike_trains,
+                                                   full_output=True, rng=1)
+    assert_equal(p, true_order)
+    assert_almost_equal(F, 1.0)
+    # the order of few spike trains is found exactly
+    assert_equal(iterations, 0)
+    sorted_trains = [spike_trains[n] for n in p]
+    assert_almost_equal(spike_train_order(sorted_trains), 1.0)
+
+    D = spike_directionality_matrix(spike_trains)
+    D_sorted = permutate_matrix(D, p)
+    assert_array_almost_equal(D_sorted,
+                              spike_directionality_matrix(sorted_trains))
+    assert np.all(np.triu(D_sorted, 1) >= 0.0)
+
+    # the python implementation of the simulated annealing
+    D = spike_directionality_matrix(spike_trains, normalize=False)
+    p_python, A, iterations = python_backend.simulated_annealing_python(
+        D, np.arange(N), 2*np.max(np.abs(D)), 1E-3, 0.9,
+        np.random.default_rng(5))
+    assert_equal(p_python, true_order)
+    assert_almost_equal(A, np.sum(np.triu(permutate_matrix(D, p), 1)))
+
+    # more spike trains are sorted by the simulated annealing
+    spike_trains, true_order = get_synfire_chain(16, 4)
+    p, F, iterations = optimal_spike_train_sorting(spike_trains,
+                                                   full_output=True, rng=1)
+    assert_equal(p, true_order)
+    assert_almost_equal(F, 1.0)
+    assert iterations > 0
+
+
+def test_optimal_spike_train_sorting_brute_force():
+    # compare with all permutations of random spike trains, for the exact
+    # search and for the simulated annealing
+    np.random.seed(11)
+    for n in range(30):
+        N = np.random.randint(3, 8)
+        spike_trains = [SpikeTrain(np.sort(np.random.uniform(0, 100, 10)),
+                                   edges=(0.0, 100.0)) for _ in range(N)]
+        D = spike_directionality_matrix(spike_trains, normalize=False)
+        A_opt = max(np.sum(np.triu(permutate_matrix(D, list(q)), 1))
+                    for q in itertools.permutations(range(N)))
+        p, F = optimal_spike_train_sorting(spike_trains, full_output=True,
+                                           rng=n)[:2]
+        assert_almost_equal(np.sum(np.triu(permutate_matrix(D, p), 1)),
+                            A_opt)
+        p, A, iterations = _optimal_order_from_matrix(
+            D, np.random.default_rng(n), exact_max=0)
+        assert iterations > 0
+        assert_almost_equal(np.sum(np.triu(permutate_matrix(D, p), 1)), A)
+        assert A <= A_opt + 1E-9
+
+
+def test_directionality_import():
+    assert spk.directionality.spike_train_order is spike_train_order
+
+
+if __name__ == "__main__":
+    test_directionality_kernels()
+    test_spike_directionality()
+    test_spike_directionality_matrix()
+    test_optimal_spike_train_sorting()
+    test_optimal_spike_train_sorting_brute_force()
+    test_directionality_import()
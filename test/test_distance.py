@@ -16,8 +16,11 @@ from numpy.testing import assert_equal, assert_almost_equal, \
 
 import pyspike as spk
 from pyspike import SpikeTrain
+from pyspike.spike_sync import spike_sync_profile_bi
 
 import os
+import subprocess
+import sys
 TEST_PATH = os.path.dirname(os.path.realpath(__file__))
 
 
@@ -272,6 +275,42 @@ def test_multi_spike():
                         spk.spike_distance_multi)
 
 
+def check_multi_profile_random(profile_func, profile_func_multi):
+    # compare the merged multivariate profile with the sum of all pair
+    # profiles for random spike trains with spikes at the edges
+    np.random.seed(42)
+    spike_trains = []
+    for n in range(8):
+        spikes = np.unique(np.round(np.random.uniform(0, 100, 20), 1))
+        if n % 3 == 0:
+            spikes[0] = 0.0
+        if n % 4 == 0:
+            spikes[-1] = 100.0
+        spike_trains.append(SpikeTrain(spikes, 100.0))
+
+    f = profile_func(spike_trains[0], spike_trains[1])
+    for i in range(len(spike_trains)):
+        for j in range(i+1, len(spike_trains)):
+            if (i, j) != (0, 1):
+                f.add(profile_func(spike_trains[i], spike_trains[j]))
+    f.mul_scalar(1.0/28)
+    f_multi = profile_func_multi(spike_trains)
+
+    assert_array_almost_equal(np.unique(f.x), f_multi.x, decimal=14)
+    t = 0.5*(f_multi.x[1:]+f_multi.x[:-1])
+    assert_array_almost_equal([f_multi(s) for s in t], [f(s) for s in t],
+                              decimal=14)
+    assert_almost_equal(f_multi.avrg(), f.avrg(), decimal=14)
+
+
+def test_multi_isi_random():
+    check_multi_profile_random(spk.isi_profile, spk.isi_profile_multi)
+
+
+def test_multi_spike_random():
+    check_multi_profile_random(spk.spike_profile, spk.spike_profile_multi)
+
+
 def test_multi_spike_sync():
     # some basic multivariate check
     spikes1 = SpikeTrain([100, 300, 400, 405, 410, 500, 700, 800,
@@ -344,6 +383,34 @@ def check_dist_matrix(dist_func, dist_matrix_func):
     assert_equal(f34, f_matrix[3, 2])
 
 
+def test_multi_approx():
+    np.random.seed(31)
+    spike_trains = spk.generate_poisson_spike_trains(2.0, 20.0, 50, rng=31)
+    for dist_func in [spk.isi_distance, spk.spike_distance, spk.spike_sync]:
+        for interval in (None, (2.0, 15.0)):
+            value = dist_func(spike_trains, interval=interval)
+            estimate, (lower, upper) = dist_func(spike_trains,
+                                                 interval=interval,
+                                                 approx=True, n_samples=400,
+                                                 rng=1)
+            assert lower < estimate < upper
+            assert lower < value < upper
+            assert upper - lower < 0.1
+            # sampling until the standard error is reached
+            estimate, (lower, upper) = dist_func(spike_trains,
+                                                 interval=interval,
+                                                 approx=True, n_samples=100,
+                                                 target_se=0.004, rng=2)
+            assert upper - lower <= 2*1.96*0.004 + 1E-12
+            assert_almost_equal(estimate, value, decimal=2)
+        # fewer pairs than samples: exact value
+        estimate, ci = dist_func(spike_trains, indices=np.arange(10),
+                                 approx=True, n_samples=45)
+        value = dist_func(spike_trains, indices=np.arange(10))
+        assert_almost_equal(estimate, value, decimal=14)
+        assert_almost_equal(ci, (value, value), decimal=14)
+
+
 def test_isi_matrix():
     check_dist_matrix(spk.isi_distance, spk.isi_distance_matrix)
 
@@ -355,6 +422,425 @@ def test_spike_matrix():
 def test_spike_sync_matrix():
     check_dist_matrix(spk.spike_sync, spk.spike_sync_matrix)
 
+    # coinciding spikes, empty spike trains and max_tau, compared with the
+    # pair-wise computation
+    np.random.seed(13)
+    spike_trains = [SpikeTrain(np.unique(np.round(
+        np.random.uniform(0.0, 20.0, n))), 20.0) for n in (15, 10, 0, 20, 1)]
+    spike_trains.append(SpikeTrain([], 20.0))
+    for max_tau in (None, 0.4):
+        f_matrix = spk.spike_sync_matrix(spike_trains, max_tau=max_tau)
+        for i in range(len(spike_trains)):
+            for j in range(i+1, len(spike_trains)):
+                assert_almost_equal(f_matrix[i, j],
+                                    spk.spike_sync(spike_trains[i],
+                                                   spike_trains[j],
+                                                   max_tau=max_tau),
+                                    decimal=12)
+
+
+def test_dist_matrix_parallel():
+    spike_trains = spk.load_spike_trains_from_txt(
+        os.path.join(TEST_PATH, "PySpike_testdata.txt"), (0.0, 4000.0))
+    indices = [0, 3, 4, 7, 11, 17, 21, 39]
+    for dist_matrix_func in [spk.isi_distance_matrix,
+                             spk.spike_distance_matrix,
+                             spk.spike_sync_matrix]:
+        # the parallel result has to be identical to the serial one
+        f_matrix = dist_matrix_func(spike_trains)
+        f_matrix_par = dist_matrix_func(spike_trains, n_jobs=2)
+        assert_equal(f_matrix, f_matrix_par)
+
+        f_matrix = dist_matrix_func(spike_trains, indices,
+                                    interval=[1000.0, 3000.0])
+        f_matrix_par = dist_matrix_func(spike_trains, indices,
+                                        interval=[1000.0, 3000.0], n_jobs=3)
+        assert_equal(f_matrix, f_matrix_par)
+
+
+def test_dist_matrix_parallel_after_threads():
+    # the worker processes of the interval path are started after a parallel
+    # kernel, which must not deadlock the process at exit. This runs in a
+    # separate process, such that a deadlock shows up as a timeout.
+    script = "\n".join([
+        "import numpy as np",
+        "import pyspike as spk",
+        "if 'numba' in spk.backends.available_backends():",
+        "    spk.set_backend('numba')",
+        "st = [spk.SpikeTrain(np.sort(np.random.uniform(0, 50, 20)), 50.0)",
+        "      for _ in range(6)]",
+        "d1 = spk.isi_distance_matrix(st, n_jobs=2)",
+        "d2 = spk.isi_distance_matrix(st, interval=(5, 40), n_jobs=2)",
+        "d3 = spk.spike_distance_cross(st, st, interval=(5, 40), n_jobs=2)",
+        "assert np.all(np.isfinite(d2)) and np.all(np.isfinite(d3))"])
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [os.path.dirname(TEST_PATH)] +
+        [p for p in [env.get("PYTHONPATH")] if p])
+    result = subprocess.run([sys.executable, "-c", script], env=env,
+                            timeout=300)
+    assert_equal(result.returncode, 0)
+
+
+def test_dist_matrix_condensed():
+    spike_trains = spk.load_spike_trains_from_txt(
+        os.path.join(TEST_PATH, "PySpike_testdata.txt"), (0.0, 4000.0))
+    spike_trains.append(SpikeTrain([], (0.0, 4000.0)))
+    indices = [0, 3, 4, 7, 11, 17, 21, 39, 40]
+    for dist_matrix_func in [spk.isi_distance_matrix,
+                             spk.spike_distance_matrix,
+                             spk.spike_sync_matrix]:
+        for interval in (None, [1000.0, 3000.0]):
+            f_matrix = dist_matrix_func(spike_trains, indices,
+                                        interval=interval)
+            # the upper triangle row by row, as in scipy's pdist
+            expected = f_matrix[np.triu_indices(len(indices), 1)]
+            f_condensed = dist_matrix_func(spike_trains, indices,
+                                           interval=interval, condensed=True)
+            assert_equal(f_condensed.shape, expected.shape)
+            assert_equal(f_condensed.dtype, np.float64)
+            assert_array_almost_equal(f_condensed, expected, decimal=14)
+            f_condensed = dist_matrix_func(spike_trains, indices,
+                                           interval=interval, condensed=True,
+                                           n_jobs=2, dtype=np.float32)
+            assert_equal(f_condensed.dtype, np.float32)
+            assert_array_almost_equal(f_condensed, expected, decimal=6)
+            f_matrix = dist_matrix_func(spike_trains, indices,
+                                        interval=interval, dtype=np.float32)
+            assert_equal(f_matrix.dtype, np.float32)
+            assert_equal(f_matrix.shape, (len(indices), len(indices)))
+        assert_equal(len(dist_matrix_func(spike_trains[:1], condensed=True)),
+                     0)
+
+
+def test_dist_cross():
+    np.random.seed(5)
+    spike_trains = [SpikeTrain(np.sort(np.random.uniform(0, 50, n)), 50.0)
+                    for n in (25, 30, 0, 2, 40, 12, 18)]
+    # a spike train sharing spikes with another one
+    spike_trains.append(SpikeTrain(spike_trains[0].spikes[::2], 50.0))
+    a = [0, 2, 5]
+    b = [1, 3, 4, 6, 7, 2]
+    for dist_matrix_func, dist_cross_func in [
+            (spk.isi_distance_matrix, spk.isi_distance_cross),
+            (spk.spike_distance_matrix, spk.spike_distance_cross),
+            (spk.spike_sync_matrix, spk.spike_sync_cross)]:
+        for interval in (None, (5.0, 40.0)):
+            f_matrix = dist_matrix_func(spike_trains, interval=interval)
+            f_cross = dist_cross_func([spike_trains[i] for i in a],
+                                      [spike_trains[i] for i in b],
+                                      interval=interval)
+            assert_equal(f_cross.shape, (len(a), len(b)))
+            expected = f_matrix[np.ix_(a, b)]
+            # the matrix functions set the diagonal to zero
+            expected[1, 5] = dist_cross_func([spike_trains[2]],
+                                             [spike_trains[2]],
+                                             interval=interval)[0, 0]
+            assert_array_almost_equal(f_cross, expected, decimal=14)
+            f_cross_par = dist_cross_func([spike_trains[i] for i in a],
+                                          [spike_trains[i] for i in b],
+                                          interval=interval, n_jobs=2)
+            assert_equal(f_cross, f_cross_par)
+    assert_almost_equal(spk.spike_sync_cross([spike_trains[7]],
+                                             [spike_trains[0]],
+                                             max_tau=0.1)[0, 0],
+                        spk.spike_sync(spike_trains[7], spike_trains[0],
+                                       max_tau=0.1), decimal=14)
+
+
+def test_distance_matrix_builder():
+    np.random.seed(21)
+    spike_trains = [SpikeTrain(np.sort(np.random.uniform(0, 50, n)), 50.0)
+                    for n in (25, 30, 0, 2, 40, 12, 18)]
+
+    def isi_func(st1, st2, interval):
+        return spk.isi_distance(st1, st2, interval=interval)
+
+    for metric, dist_matrix_func in [
+            ("isi", spk.isi_distance_matrix),
+            ("spike", spk.spike_distance_matrix),
+            ("spike_sync", spk.spike_sync_matrix),
+            (isi_func, spk.isi_distance_matrix)]:
+        for interval in (None, (5.0, 40.0)):
+            builder = spk.DistanceMatrixBuilder(metric, spike_trains[:2],
+                                                interval=interval)
+            # add single spike trains and a block
+            for st in spike_trains[2:4]:
+                builder.add([st])
+            rows = builder.add(spike_trains[4:])
+            assert_equal(rows, [4, 5, 6])
+            assert_equal(len(builder), len(spike_trains))
+            assert builder._data.shape[0] >= len(spike_trains)
+            f_matrix = dist_matrix_func(spike_trains, interval=interval)
+            assert_array_almost_equal(builder.matrix, f_matrix, decimal=14)
+
+            builder.remove([1, 4])
+            keep = [0, 2, 3, 5, 6]
+            assert_array_almost_equal(builder.matrix,
+                                      f_matrix[np.ix_(keep, keep)],
+                                      decimal=14)
+            assert builder.spike_trains[3] is spike_trains[5]
+            builder.add([spike_trains[1]])
+            keep.append(1)
+            assert_array_almost_equal(builder.matrix,
+                                      f_matrix[np.ix_(keep, keep)],
+                                      decimal=14)
+
+    try:
+        spk.DistanceMatrixBuilder("unknown")
+    except ValueError:
+        pass
+    else:
+        assert False, "ValueError expected for unknown metric"
+
+
+def test_distance_matrix_memmap():
+    import shutil
+    import tempfile
+    np.random.seed(23)
+    spike_trains = [SpikeTrain(np.sort(np.random.uniform(0, 50, n)), 50.0)
+                    for n in np.random.randint(0, 30, 11)]
+    path = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(path, "matrix.dat")
+        for metric, dist_matrix_func in [
+                ("isi", spk.isi_distance_matrix),
+                ("spike", spk.spike_distance_matrix),
+                ("spike_sync", spk.spike_sync_matrix)]:
+            f_matrix = spk.distance_matrix_memmap(spike_trains, filename,
+                                                  metric, tile_size=4,
+                                                  resume=False)
+            assert isinstance(f_matrix, np.memmap)
+            assert_array_almost_equal(f_matrix, dist_matrix_func(spike_trains),
+                                      decimal=14)
+            del f_matrix
+
+        # interrupt the computation after a few tiles
+        calls = [0]
+        max_calls = [30]
+
+        def isi_func(st1, st2, interval):
+            if calls[0] == max_calls[0]:
+                raise RuntimeError("interrupted")
+            calls[0] += 1
+            return spk.isi_distance(st1, st2, interval=interval)
+
+        filename = os.path.join(path, "isi.dat")
+        try:
+            spk.distance_matrix_memmap(spike_trains, filename, isi_func,
+                                       tile_size=4, interval=(0.0, 40.0),
+                                       dtype=np.float32)
+        except RuntimeError:
+            pass
+        else:
+            assert False, "RuntimeError expected"
+        try:
+            spk.load_distance_matrix(filename)
+        except ValueError:
+            pass
+        else:
+            assert False, "ValueError expected for incomplete matrix"
+
+        # the completed tiles are not computed again
+        calls[0] = 0
+        max_calls[0] = None
+        f_matrix = spk.distance_matrix_memmap(spike_trains, filename,
+                                              isi_func, tile_size=4,
+                                              interval=(0.0, 40.0),
+                                              dtype=np.float32)
+        # the tiles (0, 0) and (0, 1) with 6 and 16 pairs were completed
+        assert_equal(calls[0], 11*10//2 - 6 - 16)
+        assert_equal(f_matrix.dtype, np.float32)
+        assert_array_almost_equal(f_matrix, spk.isi_distance_matrix(
+            spike_trains, interval=(0.0, 40.0)), decimal=6)
+        assert_array_almost_equal(spk.load_distance_matrix(filename),
+                                  f_matrix)
+        del f_matrix
+
+        try:
+            spk.distance_matrix_memmap(spike_trains, filename, isi_func,
+                                       tile_size=5, interval=(0.0, 40.0),
+                                       dtype=np.float32)
+        except ValueError:
+            pass
+        else:
+            assert False, "ValueError expected for different parameters"
+    finally:
+        shutil.rmtree(path)
+
+
+def test_sparse_distance_matrix():
+    np.random.seed(29)
+    # populations with very different rates, such that the prefilter skips
+    # tiles
+    spike_trains = [SpikeTrain(np.sort(np.random.uniform(0, 50, n)), 50.0)
+                    for n in np.random.choice([0, 1, 5, 6, 40, 45, 200],
+                                              23)]
+    N = len(spike_trains)
+    for metric, dist_matrix_func in [
+            ("isi", spk.isi_distance_matrix),
+            ("spike", spk.spike_distance_matrix),
+            ("spike_sync", spk.spike_sync_matrix)]:
+        for interval in (None, (5.0, 40.0)):
+            f_matrix = dist_matrix_func(spike_trains, interval=interval)
+            np.fill_diagonal(f_matrix, np.nan)
+            if metric == "spike_sync":
+                threshold = 0.3
+                within = f_matrix >= threshold
+                # the closest pairs have the largest values
+                keys = -f_matrix
+            else:
+                threshold = 0.4
+                within = f_matrix <= threshold
+                keys = f_matrix
+            rows, cols, values = spk.sparse_distance_matrix(
+                spike_trains, metric, threshold=threshold, tile_size=4,
+                interval=interval)
+            i, j = np.nonzero(within)
+            assert_equal(rows, i)
+            assert_equal(cols, j)
+            assert_array_almost_equal(values, f_matrix[i, j], decimal=14)
+
+            k = 3
+            values, cols, indptr = spk.sparse_distance_matrix(
+                spike_trains, metric, k=k, tile_size=5, interval=interval,
+                format="csr")
+            assert_equal(indptr, k*np.arange(N+1))
+            keys[np.isnan(keys)] = np.inf
+            for n in range(N):
+                row = slice(indptr[n], indptr[n+1])
+                assert_array_almost_equal(
+                    np.sort(keys[n, cols[row]]), np.sort(keys[n])[:k],
+                    decimal=14)
+                assert_array_almost_equal(values[row],
+                                          f_matrix[n, cols[row]],
+                                          decimal=14)
+
+            # nearest neighbors within the threshold
+            rows, cols, values = spk.sparse_distance_matrix(
+                spike_trains, metric, k=k, threshold=threshold, tile_size=7,
+                interval=interval)
+            assert np.all(within[rows, cols])
+            assert_equal(np.bincount(rows, minlength=N),
+                         np.minimum(np.sum(within, axis=1), k))
+
+    # the prefilter does not change the result
+    result = spk.sparse_distance_matrix(spike_trains, threshold=0.5,
+                                        tile_size=3, max_tau=1.0)
+    result_all = spk.sparse_distance_matrix(spike_trains, threshold=0.5,
+                                            tile_size=3, max_tau=1.0,
+                                            prefilter=False)
+    for v1, v2 in zip(result, result_all):
+        assert_equal(v1, v2)
+
+
+def test_online_distance():
+    # the online distances agree with the batch distances of the complete
+    # spike trains in the windows up to t_final
+    np.random.seed(13)
+    T = 200.0
+    spikes = [np.sort(np.random.uniform(0, T, n)) for n in (150, 20, 300)]
+    # a long first interspike interval in channel 1
+    spikes[1] = np.append([25.2, 70.6], np.sort(np.random.uniform(75, T, 18)))
+    spike_trains = [SpikeTrain(s, T) for s in spikes]
+    events = sorted((t, c) for c, s in enumerate(spikes) for t in s)
+
+    online = spk.OnlineDistance(3, 0.0, max_window=20.0)
+    assert_equal(online.value(10.0), np.zeros((3, 3)))
+    for k, (t, c) in enumerate(events):
+        online.push(c, t)
+        # check every window near the start, where the edge correction
+        # depends on the second spike of each channel
+        if (k < 100 or k % 25 == 0) and online.t_final > 0.0:
+            t_final = online.t_final
+            for metric, dist_func in (("spike", spk.spike_distance),
+                                      ("isi", spk.isi_distance)):
+                D = online.value(10.0, metric)
+                for i, j in ((0, 1), (0, 2), (1, 2)):
+                    d = dist_func(spike_trains[i], spike_trains[j],
+                                  interval=(max(0.0, t_final-10.0),
+                                            t_final))
+                    assert_almost_equal(D[i, j], d, decimal=12)
+                    assert_almost_equal(D[j, i], d, decimal=12)
+    # only the spikes of the recent window are kept
+    assert len(online.spike_trains()[2]) < 150
+
+    online.close(T)
+    assert_equal(online.t_final, T)
+    D = online.value(20.0)
+    assert_almost_equal(D[0, 2], spk.spike_distance(spike_trains[0],
+                                                    spike_trains[2],
+                                                    interval=(T-20.0, T)),
+                        decimal=12)
+
+    # without max_window, the complete spike trains are kept
+    online = spk.OnlineDistance(3, 0.0)
+    for t, c in events:
+        online.push(c, t)
+    online.close(T)
+    assert_almost_equal(online.value(metric="isi"),
+                        spk.isi_distance_matrix(spike_trains), decimal=12)
+    assert_almost_equal(online.value(),
+                        spk.spike_distance_matrix(spike_trains), decimal=12)
+
+
+def test_interval_values():
+    # distances restricted to intervals have to match the profile averages,
+    # also for intervals starting or ending at spike times
+    t1 = SpikeTrain([0.0, 0.2, 0.4, 0.6, 0.7, 1.0], 1.0)
+    t2 = SpikeTrain([0.3, 0.45, 0.8, 0.9, 0.95], 1.0)
+    t3 = SpikeTrain([0.5], 1.0)
+    t4 = SpikeTrain([], 1.0)
+    intervals = [(0.0, 1.0), (0.2, 0.45), (0.21, 0.29), (0.1, 0.8),
+                 (0.7, 1.0), [(0.0, 0.3), (0.6, 0.95)]]
+    for st1, st2 in [(t1, t2), (t2, t1), (t1, t3), (t3, t2), (t4, t1)]:
+        for interval in intervals:
+            assert_almost_equal(spk.isi_distance(st1, st2, interval=interval),
+                                spk.isi_profile(st1, st2).avrg(interval),
+                                decimal=14)
+            assert_almost_equal(spk.spike_distance(st1, st2,
+                                                   interval=interval),
+                                spk.spike_profile(st1, st2).avrg(interval),
+                                decimal=14)
+            for max_tau in (None, 0.05):
+                f = spike_sync_profile_bi(st1, st2, max_tau=max_tau)
+                assert_almost_equal(spk.spike_sync(st1, st2,
+                                                   interval=interval,
+                                                   max_tau=max_tau),
+                                    f.avrg(interval), decimal=14)
+
+
+def test_distance_series():
+    np.random.seed(7)
+    spike_trains = [SpikeTrain(np.sort(np.random.uniform(0, 20, n)), 20.0)
+                    for n in (25, 30, 0, 2, 40)]
+    window = 2.0
+    step = 0.7
+    windows = [(t, t+window) for t in np.arange(0.0, 18.0+1E-9, step)]
+
+    for name in ("isi_distance", "spike_distance", "spike_sync"):
+        dist_func = getattr(spk, name)
+        series_func = getattr(spk, name + "_series")
+        expected = [dist_func(spike_trains[0], spike_trains[1], interval=w)
+                    for w in windows]
+        assert_array_almost_equal(series_func(spike_trains[0],
+                                              spike_trains[1],
+                                              window=window, step=step),
+                                  expected, decimal=14)
+        expected = [dist_func(spike_trains, interval=w) for w in windows]
+        assert_array_almost_equal(series_func(spike_trains, window=window,
+                                              step=step),
+                                  expected, decimal=14)
+        expected = [getattr(spk, name + "_matrix")(spike_trains, interval=w)
+                    for w in windows]
+        matrices = getattr(spk, name + "_matrix_series")(spike_trains,
+                                                         window=window,
+                                                         step=step)
+        assert_array_almost_equal(matrices, expected, decimal=14)
+
+    # non-overlapping windows by default
+    assert_equal(len(spk.isi_distance_series(spike_trains, window=2.0)), 10)
+
 
 def test_regression_spiky():
     # standard example
@@ -436,9 +922,22 @@ if __name__ == "__main__":
     test_spike_sync()
     test_multi_isi()
     test_multi_spike()
+    test_multi_isi_random()
+    test_multi_spike_random()
     test_multi_spike_sync()
+    test_multi_approx()
     test_isi_matrix()
     test_spike_matrix()
     test_spike_sync_matrix()
+    test_dist_matrix_parallel()
+    test_dist_matrix_parallel_after_threads()
+    test_dist_matrix_condensed()
+    test_dist_cross()
+    test_distance_matrix_builder()
+    test_distance_matrix_memmap()
+    test_sparse_distance_matrix()
+    test_online_distance()
+    test_interval_values()
+    test_distance_series()
     test_regression_spiky()
     test_multi_variate_subsets()
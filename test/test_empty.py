@@ -156,8 +156,26 @@ def test_spike_sync_empty():
     assert_array_equal(sync_matrix, np.ones((3, 3)) - np.diag(np.ones(3)))
 
 
+def test_matrix_empty():
+    spike_trains = [SpikeTrain([], edges=(0.0, 1.0)),
+                    SpikeTrain([0.4, ], edges=(0.0, 1.0)),
+                    SpikeTrain([], edges=(0.0, 1.0)),
+                    SpikeTrain([0.2, 0.4, 0.9], edges=(0.0, 1.0))]
+    for dist_func, dist_matrix_func in [
+            (spk.isi_distance, spk.isi_distance_matrix),
+            (spk.spike_distance, spk.spike_distance_matrix),
+            (spk.spike_sync, spk.spike_sync_matrix)]:
+        f_matrix = dist_matrix_func(spike_trains)
+        for i in range(4):
+            for j in range(i+1, 4):
+                d = dist_func(spike_trains[i], spike_trains[j])
+                assert_equal(f_matrix[i, j], d)
+                assert_equal(f_matrix[j, i], d)
+
+
 if __name__ == "__main__":
     test_get_non_empty()
     test_isi_empty()
     test_spike_empty()
     test_spike_sync_empty()
+    test_matrix_empty()
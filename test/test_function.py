@@ -121,6 +121,24 @@ def test_pwc_avrg():
     assert_array_almost_equal(f1.y, y_expected, decimal=16)
 
 
+def test_pwc_avrg_many():
+    x = [0.0, 1.0, 2.0, 2.5, 4.0]
+    y = [1.0, -0.5, 1.5, 0.75]
+    f = spk.PieceWiseConstFunc(x, y)
+
+    intervals = [(0.5, 1.5), (1.5, 3.5), (0.2, 0.7), (2.0, 4.0)]
+    expected = np.array([0.25, 0.625, 1.0, 0.9375])
+    assert_array_almost_equal(f.avrg_many(intervals), expected, decimal=15)
+    for ival, a in zip(intervals, expected):
+        assert_almost_equal(f.avrg(ival), a, decimal=15)
+
+    # the cumulative integral has to be updated when the function changes
+    f.mul_scalar(2.0)
+    assert_array_almost_equal(f.avrg_many(intervals), 2*expected, decimal=15)
+    f.add(spk.PieceWiseConstFunc(x, y))
+    assert_array_almost_equal(f.avrg_many(intervals), 3*expected, decimal=15)
+
+
 def test_pwl():
     x = [0.0, 1.0, 2.0, 2.5, 4.0]
     y1 = [1.0, -0.5, 1.5, 0.75]
@@ -240,6 +258,25 @@ def test_pwl_avrg():
     assert_array_almost_equal(f1.y2, y2_expected, decimal=16)
 
 
+def test_pwl_avrg_many():
+    x = [0.0, 1.0, 2.0, 2.5, 4.0]
+    y1 = [1.0, -0.5, 1.5, 0.75]
+    y2 = [1.5, -0.4, 1.5, 0.25]
+    f = spk.PieceWiseLinFunc(x, y1, y2)
+
+    intervals = np.array([[0.5, 1.5], [0.25, 0.75], [2.0, 4.0]])
+    expected = np.array([0.45, 1.25, 0.75])
+    assert_array_almost_equal(f.avrg_many(intervals), expected, decimal=15)
+    for ival, a in zip(intervals, expected):
+        assert_almost_equal(f.avrg(list(ival)), a, decimal=15)
+
+    # the cumulative integral has to be updated when the function changes
+    f.mul_scalar(2.0)
+    assert_array_almost_equal(f.avrg_many(intervals), 2*expected, decimal=15)
+    f.add(spk.PieceWiseLinFunc(x, y1, y2))
+    assert_array_almost_equal(f.avrg_many(intervals), 3*expected, decimal=15)
+
+
 def test_df():
     # testing discrete function
     x = [0.0, 1.0, 2.0, 2.5, 4.0]
@@ -275,8 +312,10 @@ if __name__ == "__main__":
     test_pwc_add()
     test_pwc_mul()
     test_pwc_avrg()
+    test_pwc_avrg_many()
     test_pwl()
     test_pwl_add()
     test_pwl_mul()
     test_pwl_avrg()
+    test_pwl_avrg_many()
     test_df()
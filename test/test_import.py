@@ -0,0 +1,103 @@
+""" test_import.py
+
+Tests that importing pyspike is cheap and loads the submodules lazily
+
+Copyright 2015, Mario Mulansky <mario.mulansky@gmx.net>
+
+Distributed under the BSD License
+
+"""
+
+from __future__ import print_function
+import os
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import pyspike as spk
+
+# the import of pyspike, excluding the interpreter startup, should take only
+# a few milliseconds, this limit leaves plenty of room for slow machines
+MAX_IMPORT_TIME = 0.5
+
+
+def run_python(code):
+    """ Runs the given code in a fresh interpreter and returns its output.
+    """
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(spk.__file__)))
+    env["PYTHONPATH"] = os.pathsep.join([root, env.get("PYTHONPATH", "")])
+    return subprocess.check_output([sys.executable, "-c", code],
+                                   env=env).decode().strip()
+
+
+def test_import_time():
+    output = run_python("""
+import sys, time
+t = time.time()
+import pyspike
+print(time.time() - t)
+print([name for name in ('numpy', 'pkg_resources', 'multiprocessing',
+                         'pyspike.generic', 'pyspike.cython')
+       if name in sys.modules])
+""")
+    import_time, loaded = output.split("\n")
+    print("import pyspike: %.3f ms" % (1000*float(import_time)))
+    assert float(import_time) < MAX_IMPORT_TIME
+    assert loaded == "[]", "eagerly imported modules: " + loaded
+
+
+def test_lazy_attributes():
+    output = run_python("""
+import sys
+import pyspike
+assert 'pyspike.isi_distance' not in sys.modules
+# importing the submodule must not shadow the function of the same name
+import pyspike.isi_distance
+print(callable(pyspike.isi_distance))
+print(pyspike.SpikeTrain.__name__)
+print(pyspike.spikes.__name__)
+print('spike_sync_matrix' in dir(pyspike))
+""")
+    assert output.split("\n") == ["True", "SpikeTrain", "pyspike.spikes",
+                                  "True"]
+    assert spk.__version__
+    try:
+        spk.no_such_attribute
+    except AttributeError:
+        pass
+    else:
+        assert False, "AttributeError expected"
+
+
+def test_version():
+    # the version of an installed pyspike is only reported if it is this copy
+    root = os.path.dirname(os.path.dirname(os.path.abspath(spk.__file__)))
+    site = tempfile.mkdtemp()
+    try:
+        dist_info = os.path.join(site, "pyspike-9.9.9.dist-info")
+        os.mkdir(dist_info)
+        with open(os.path.join(dist_info, "METADATA"), "w") as f:
+            f.write("Metadata-Version: 2.1\nName: pyspike\nVersion: 9.9.9\n")
+        code = """
+import sys
+sys.path.append(%r)
+import pyspike
+print(pyspike.__version__)
+""" % site
+        assert run_python(code) == "Please install this project with setup.py"
+        # an editable install of this source directory
+        with open(os.path.join(dist_info, "direct_url.json"), "w") as f:
+            json.dump({"url": "file://" + root.replace(os.sep, "/"),
+                       "dir_info": {"editable": True}}, f)
+        assert run_python(code) == "9.9.9"
+    finally:
+        shutil.rmtree(site)
+
+
+if __name__ == "__main__":
+    test_import_time()
+    test_lazy_attributes()
+    test_version()
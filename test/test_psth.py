@@ -0,0 +1,85 @@
+""" test_psth.py
+
+Tests the PSTH and the kernel smoothed rate
+
+Copyright 2015, Mario Mulansky <mario.mulansky@gmx.net>
+
+Distributed under the BSD License
+
+"""
+
+from __future__ import print_function
+import numpy as np
+from numpy.testing import assert_equal, assert_almost_equal, \
+    assert_array_almost_equal
+
+import pyspike as spk
+from pyspike import SpikeTrain
+
+import os
+TEST_PATH = os.path.dirname(os.path.realpath(__file__))
+TEST_DATA = os.path.join(TEST_PATH, "PySpike_testdata.txt")
+
+
+def test_psth():
+    spike_trains = spk.load_spike_trains_from_txt(TEST_DATA, edges=(0, 4000))
+    all_spikes = np.concatenate([st.spikes for st in spike_trains])
+
+    bin_sizes = [100.0, 30.0, 7.0, 4000.0]
+    psths = spk.psth(spike_trains, bin_sizes)
+    assert_equal(len(psths), len(bin_sizes))
+    for bin_size, f in zip(bin_sizes, psths):
+        bin_count = int(4000.0 / bin_size)
+        vals, edges = np.histogram(all_spikes,
+                                   np.linspace(0.0, 4000.0, bin_count+1))
+        assert_equal(f.x, edges)
+        assert_equal(f.y, vals)
+        f_single = spk.psth(spike_trains, bin_size)
+        assert_equal(f_single.y, f.y)
+
+    # spikes at the edges are counted in the first and last bin
+    f = spk.psth([SpikeTrain([0.0, 0.5, 1.0], 1.0),
+                  SpikeTrain([0.25, 1.0], 1.0)], 0.25)
+    assert_equal(f.y, [1, 1, 1, 2])
+
+
+def test_psth_smoothed():
+    np.random.seed(11)
+    spike_trains = [SpikeTrain(np.sort(np.random.uniform(0.0, 100.0, 30)),
+                               100.0) for _ in range(5)]
+    all_spikes = np.concatenate([st.spikes for st in spike_trains])
+    resolution = 0.1
+    bandwidth = 2.0
+
+    f = spk.psth_smoothed(spike_trains, bandwidth, resolution=resolution)
+    # compare with the direct sum over the binned spikes
+    centers = 0.5*(f.x[1:]+f.x[:-1])
+    spikes = (np.floor(all_spikes/resolution)+0.5) * resolution
+    spikes = np.minimum(spikes, centers[-1])
+    lags = centers[:, None] - spikes[None, :]
+    rate = np.sum(np.exp(-0.5*(lags/bandwidth)**2), axis=1) / \
+        (np.sqrt(2*np.pi)*bandwidth*len(spike_trains))
+    assert_array_almost_equal(f.y, rate, decimal=2)
+    # away from the edges no spikes are lost
+    assert_almost_equal(f.integral((20.0, 80.0)),
+                        np.sum((all_spikes > 20.0) & (all_spikes < 80.0)) /
+                        len(spike_trains), decimal=0)
+
+    f = spk.psth_smoothed([SpikeTrain([10.0], 100.0)], 1.0,
+                          kernel="exponential", resolution=0.5)
+    # the causal kernel is zero before the spike
+    assert_array_almost_equal(f.y[f.x[:-1] < 10.0], 0.0, decimal=12)
+    assert_almost_equal(f.integral(), 1.0)
+    assert f.y[20] > f.y[22] > f.y[24] > 0.0
+
+    try:
+        spk.psth_smoothed(spike_trains, bandwidth, kernel="box")
+    except ValueError:
+        pass
+    else:
+        assert False, "ValueError expected for unknown kernel"
+
+
+if __name__ == "__main__":
+    test_psth()
+    test_psth_smoothed()
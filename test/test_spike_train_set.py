@@ -0,0 +1,108 @@
+""" test_spike_train_set.py
+
+Tests the SpikeTrainSet class and its use in the multivariate functions
+
+Copyright 2016, Mario Mulansky <mario.mulansky@gmx.net>
+
+Distributed under the BSD License
+
+"""
+
+from __future__ import print_function
+import numpy as np
+from numpy.testing import assert_equal, assert_almost_equal
+
+import pyspike as spk
+from pyspike import SpikeTrain, SpikeTrainSet
+from pyspike.generic import _flatten_spike_trains
+
+import os
+TEST_PATH = os.path.dirname(os.path.realpath(__file__))
+TEST_DATA = os.path.join(TEST_PATH, "PySpike_testdata.txt")
+
+
+def test_construction():
+    t1 = SpikeTrain([0.2, 0.4, 0.6, 0.7], 1.0)
+    t2 = SpikeTrain([], 1.0)
+    t3 = SpikeTrain([0.1, 0.4, 0.5, 0.6], 1.0)
+
+    sts = SpikeTrainSet([t1, t2, t3], 1.0)
+    assert_equal(len(sts), 3)
+    assert_equal(sts.offsets, [0, 4, 4, 8])
+    assert_equal(sts.get_spike_counts(), [4, 0, 4])
+    assert_equal(sts[0].spikes, t1.spikes)
+    assert_equal(sts[1].spikes, [])
+    assert_equal(sts[-1].spikes, t3.spikes)
+    assert_equal(sts[2].t_start, 0.0)
+    assert_equal(sts[2].t_end, 1.0)
+    assert_equal([len(st) for st in sts], [4, 0, 4])
+
+    # spike trains are views into the common array
+    assert np.shares_memory(sts[2].spikes, sts.spikes)
+    sts[2].spikes[0] = 0.05
+    assert_equal(sts.spikes[4], 0.05)
+
+    # construction from flat array and offsets, unsorted spike times
+    sts2 = SpikeTrainSet([0.6, 0.2, 0.7, 0.4, 0.5, 0.1, 0.6, 0.4],
+                         (0.0, 1.0), offsets=[0, 4, 4, 8], is_sorted=False)
+    assert_equal(sts2[0].spikes, t1.spikes)
+    assert_equal(sts2[2].spikes, t3.spikes)
+
+    # auxiliary spikes for the empty spike train
+    spikes, offsets = sts2.get_spikes_non_empty()
+    assert_equal(offsets, [0, 4, 6, 10])
+    assert_equal(spikes[4:6], [0.0, 1.0])
+    for n in range(3):
+        assert_equal(spikes[offsets[n]:offsets[n+1]],
+                     sts2[n].get_spikes_non_empty())
+
+    st_list = sts2.to_list()
+    assert not np.shares_memory(st_list[0].spikes, sts2.spikes)
+    assert_equal(st_list[2].spikes, t3.spikes)
+
+
+def test_multivariate():
+    spike_trains = spk.load_spike_trains_from_txt(TEST_DATA, (0.0, 4000.0))
+    sts = SpikeTrainSet(spike_trains, (0.0, 4000.0))
+    indices = [1, 3, 5, 7]
+
+    for dist_func in [spk.isi_distance_multi, spk.spike_distance_multi,
+                      spk.spike_sync_multi]:
+        assert_equal(dist_func(sts), dist_func(spike_trains))
+        assert_equal(dist_func(sts, indices), dist_func(spike_trains, indices))
+
+    for prof_func in [spk.isi_profile_multi, spk.spike_profile_multi,
+                      spk.spike_sync_profile_multi]:
+        assert prof_func(sts, indices).almost_equal(
+            prof_func(spike_trains, indices))
+
+    for matrix_func in [spk.isi_distance_matrix, spk.spike_distance_matrix,
+                        spk.spike_sync_matrix]:
+        assert_equal(matrix_func(sts), matrix_func(spike_trains))
+        assert_equal(matrix_func(sts, indices),
+                     matrix_func(spike_trains, indices))
+
+    # only the selected spike trains are flattened, invalid indices fail
+    for non_empty in (True, False):
+        spikes, offsets = _flatten_spike_trains(sts, indices, non_empty)
+        spikes_l, offsets_l = _flatten_spike_trains(spike_trains, indices,
+                                                    non_empty)
+        assert_equal(spikes, spikes_l)
+        assert_equal(offsets, offsets_l)
+    try:
+        _flatten_spike_trains(sts, [0, len(sts)])
+    except AssertionError:
+        pass
+    else:
+        assert False, "AssertionError expected for an invalid index"
+
+    f1 = spk.psth(sts, 100.0)
+    f2 = spk.psth(spike_trains, 100.0)
+    assert_equal(f1.x, f2.x)
+    assert_equal(f1.y, f2.y)
+    assert_almost_equal(np.sum(f1.y), len(sts.spikes))
+
+
+if __name__ == "__main__":
+    test_construction()
+    test_multivariate()
@@ -12,6 +12,7 @@ import numpy as np
 from numpy.testing import assert_equal
 
 import pyspike as spk
+from pyspike import SpikeTrain
 
 import os
 TEST_PATH = os.path.dirname(os.path.realpath(__file__))
@@ -67,6 +68,73 @@ def test_merge_spike_trains():
                         [st.spikes for st in spike_trains])
 
 
+def test_merge_spike_trains_indices():
+    spike_trains = [SpikeTrain([1.0, 3.0, 5.0], 10.0),
+                    SpikeTrain([], 10.0),
+                    SpikeTrain([0.5, 3.0, 7.0], 10.0)]
+    merged, indices = spk.merge_spike_trains(spike_trains,
+                                             return_indices=True)
+    assert_equal(merged.spikes, [0.5, 1.0, 3.0, 3.0, 5.0, 7.0])
+    # coinciding spikes are ordered by the index of the spike train
+    assert_equal(indices, [2, 0, 0, 2, 0, 2])
+    assert_equal(merged.t_end, 10.0)
+
+    spike_train_set = spk.SpikeTrainSet(spike_trains, 10.0)
+    merged_set, indices_set = spk.merge_spike_trains(spike_train_set,
+                                                     return_indices=True)
+    assert_equal(merged_set.spikes, merged.spikes)
+    assert_equal(indices_set, indices)
+
+    for n in range(len(spike_trains)):
+        assert_equal(merged.spikes[indices == n], spike_trains[n].spikes)
+
+
+def test_generate_poisson_spike_trains():
+    rng = np.random.default_rng(17)
+    sts = spk.generate_poisson_spike_trains(10.0, (5.0, 105.0), 200, rng=rng,
+                                            as_set=True)
+    assert isinstance(sts, spk.SpikeTrainSet)
+    assert_equal(len(sts), 200)
+    assert_equal((sts.t_start, sts.t_end), (5.0, 105.0))
+    counts = sts.get_spike_counts()
+    assert abs(np.mean(counts) - 1000.0) < 10.0
+    assert np.all(sts.spikes >= 5.0) and np.all(sts.spikes < 105.0)
+    for n in range(len(sts)):
+        assert np.all(np.diff(sts.get_spikes(n)) >= 0.0)
+    # exponentially distributed intervals
+    isis = np.concatenate([np.diff(st.spikes) for st in sts])
+    assert abs(np.std(isis)/np.mean(isis) - 1.0) < 0.02
+
+    # reproducible with a seed
+    sts1 = spk.generate_poisson_spike_trains(2.0, 50.0, 5, rng=3)
+    sts2 = spk.generate_poisson_spike_trains(2.0, 50.0, 5, rng=3)
+    assert_equal(len(sts1), 5)
+    for st1, st2 in zip(sts1, sts2):
+        assert_equal(st1.spikes, st2.spikes)
+        assert_equal(st1.t_end, 50.0)
+
+    # gamma process: the coefficient of variation is 1/sqrt(shape)
+    sts = spk.generate_poisson_spike_trains(5.0, 100.0, 100, shape=4.0,
+                                            rng=rng)
+    isis = np.concatenate([np.diff(st.spikes) for st in sts])
+    assert abs(np.mean(isis) - 0.2) < 0.005
+    assert abs(np.std(isis)/np.mean(isis) - 0.5) < 0.02
+
+    # inhomogeneous rate: no spikes in the second half
+    def rate(t):
+        return np.where(t < 50.0, 8.0, 0.0)
+    sts = spk.generate_poisson_spike_trains(rate, 100.0, 100, max_rate=8.0,
+                                            rng=rng, as_set=True)
+    assert np.all(sts.spikes < 50.0)
+    assert abs(len(sts.spikes)/100.0 - 400.0) < 10.0
+
+    st = spk.generate_poisson_spikes(5.0, (0.0, 20.0), rng=rng)
+    assert_equal(st.t_end, 20.0)
+    assert np.all(np.diff(st.spikes) >= 0.0)
+
+
 if __name__ == "main":
     test_load_from_txt()
     test_merge_spike_trains()
+    test_merge_spike_trains_indices()
+    test_generate_poisson_spike_trains()
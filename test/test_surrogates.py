@@ -0,0 +1,96 @@
+""" test_surrogates.py
+
+Tests the generation of surrogates and the surrogate significance tests
+
+Copyright 2015, Mario Mulansky <mario.mulansky@gmx.net>
+
+Distributed under the BSD License
+
+"""
+
+from __future__ import print_function
+import numpy as np
+from numpy.testing import assert_equal, assert_array_almost_equal
+
+import pyspike as spk
+from pyspike import SpikeTrain
+
+
+def test_generate_surrogates():
+    spike_trains = [SpikeTrain([1.0, 2.5, 3.0, 7.0], 10.0),
+                    SpikeTrain([], 10.0),
+                    SpikeTrain([0.1, 9.9], 10.0),
+                    SpikeTrain([5.0], 10.0)]
+
+    surrogates = spk.generate_surrogates(spike_trains, 20, dither=0.5,
+                                         rng=1)
+    assert_equal(len(surrogates), 20)
+    for sts in surrogates:
+        assert_equal(len(sts), len(spike_trains))
+        for st, surrogate in zip(spike_trains, sts):
+            s = surrogate.spikes
+            assert_equal(len(s), len(st.spikes))
+            assert np.all(np.diff(s) >= 0.0)
+            assert np.all((s >= 0.0) & (s <= 10.0))
+            # the spikes are sorted, so they can be compared one by one as
+            # long as no two spikes are closer than twice the dither
+            if len(s) > 0 and np.all(np.diff(st.spikes) > 1.0):
+                assert np.all(np.abs(s - st.spikes) <= 0.5)
+
+    # a dither larger than the interval reflects the spikes several times
+    surrogates = spk.generate_surrogates(spike_trains, 20, dither=35.0,
+                                         rng=3)
+    for sts in surrogates:
+        for st, surrogate in zip(spike_trains, sts):
+            s = surrogate.spikes
+            assert_equal(len(s), len(st.spikes))
+            assert np.all((s >= 0.0) & (s <= 10.0))
+
+    surrogates = spk.generate_surrogates(spike_trains, 20, method="shuffle",
+                                         rng=np.random.default_rng(2))
+    for sts in surrogates:
+        for st, surrogate in zip(spike_trains, sts):
+            s = surrogate.spikes
+            assert_array_almost_equal(np.sort(np.diff(s)),
+                                      np.sort(np.diff(st.spikes)),
+                                      decimal=12)
+            if len(s) > 0:
+                assert_equal(s[0], st.spikes[0])
+
+    try:
+        spk.generate_surrogates(spike_trains, 5)
+    except ValueError:
+        pass
+    else:
+        assert False, "ValueError expected without dither"
+
+
+def test_significance():
+    rng = np.random.default_rng(5)
+    # two strongly synchronized spike trains and an independent one
+    st1 = np.sort(rng.uniform(0.0, 100.0, 50))
+    spike_trains = [SpikeTrain(st1, 100.0),
+                    SpikeTrain(np.sort(st1 + rng.uniform(-0.01, 0.01, 50)),
+                               100.0),
+                    SpikeTrain(np.sort(rng.uniform(0.0, 100.0, 50)), 100.0)]
+
+    sync, p = spk.spike_sync_significance(spike_trains, n_surrogates=19,
+                                          dither=1.0, rng=rng, batch_size=7)
+    assert_array_almost_equal(sync, spk.spike_sync_matrix(spike_trains),
+                              decimal=12)
+    assert_equal(p.shape, (3, 3))
+    assert np.all((p > 0.0) & (p <= 1.0))
+    assert_equal(p[0, 1], 0.05)
+    assert p[0, 2] > 0.05 and p[1, 2] > 0.05
+    assert_equal(p, p.T)
+
+    dist, p = spk.spike_distance_significance(spike_trains, n_surrogates=19,
+                                              method="shuffle", rng=rng)
+    assert_array_almost_equal(dist, spk.spike_distance_matrix(spike_trains),
+                              decimal=12)
+    assert_equal(p[0, 1], 0.05)
+
+
+if __name__ == "__main__":
+    test_generate_surrogates()
+    test_significance()